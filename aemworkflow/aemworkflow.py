@@ -5,8 +5,10 @@ import click
 from .conversion import main as conversion
 from .exports import main as exports
 from .interpretation import main as interpretation
+from .interpretation import watch as interpretation_watch
 from .pre_interpretation import main as pre_interpretation
 from .validation import main as validation
+from .web_map import main as web_map
 
 
 @click.group()
@@ -22,9 +24,20 @@ def cli():
 @click.option("--gis", default="esri_arcmap_0.5", help="GIS format (default: esri_arcmap_0.5)")
 @click.option("--lines", default=10, help="Number of depth lines (default: 10)")
 @click.option("--lines_increment", default=30, help="Depth lines increment (default: 30)")
-def pre_interpret(input_directory, output_directory, crs, gis="esri_arcmap_0.5", lines=10, lines_increment=30):
+@click.option("--jobs", default=1, type=click.IntRange(min=1),
+              help="Number of worker processes for the box profiles (default: 1)")
+@click.option("--emit-gmt", "emit_gmt", is_flag=True, help="Also write the *.box.gmt text files", default=False)
+@click.option("--flatgeobuf", is_flag=True, default=False,
+              help="Also write the EPSG:4326 map layer as spatially indexed FlatGeobuf")
+@click.option("--incremental", is_flag=True, default=False,
+              help="Only rebuild the outputs of path/extent files changed since the last run")
+@click.option("--no-map", "no_map", is_flag=True, default=False,
+              help="Skip rendering map.html, leaving it to the map command")
+def pre_interpret(input_directory, output_directory, crs, gis="esri_arcmap_0.5", lines=10, lines_increment=30,
+                  jobs=1, emit_gmt=False, flatgeobuf=False, incremental=False, no_map=False):
     try:
-        pre_interpretation(input_directory, output_directory, crs, gis, lines, lines_increment)
+        pre_interpretation(input_directory, output_directory, crs, gis, lines, lines_increment, jobs, emit_gmt,
+                           flatgeobuf, incremental, not no_map)
         click.echo("Completed pre-interpretation")
     except Exception as e:
         click.echo(f"Error: {e}", err=True)
@@ -38,15 +51,50 @@ def pre_interpret(input_directory, output_directory, crs, gis="esri_arcmap_0.5",
 @click.option("--gis", default="esri_arcmap_0.5", help="GIS format (default: esri_arcmap_0.5)")
 @click.option("--lines", default=10, help="Number of depth lines (default: 10)")
 @click.option("--lines_increment", default=30, help="Depth lines increment (default: 30)")
-def interpret(input_directory, output_directory, crs="28349", gis="esri_arcmap_0.5", lines=10, lines_increment=30):
+@click.option("--flatgeobuf", is_flag=True, default=False,
+              help="Also write the EPSG:4326 map layer as spatially indexed FlatGeobuf")
+@click.option("--emit-gmt", "emit_gmt", is_flag=True, default=False,
+              help="Also write the interp/*_interp.gmt text files")
+@click.option("--jobs", default=1, type=click.IntRange(min=1),
+              help="Number of threads reading the interpretation shapefiles (default: 1)")
+@click.option("--fast-validate", "fast_validate", is_flag=True, default=False,
+              help="Validate the shapefiles from their headers and skip the ones unchanged since the last run")
+@click.option("--incremental", is_flag=True, default=False,
+              help="Only rebuild the outputs of interpretation shapefiles changed since the last run")
+@click.option("--watch", is_flag=True, default=False,
+              help="Keep running and interpret again incrementally whenever the input files are saved")
+@click.option("--no-map", "no_map", is_flag=True, default=False,
+              help="Skip rendering map.html, leaving it to the map command")
+def interpret(input_directory, output_directory, crs="28349", gis="esri_arcmap_0.5", lines=10, lines_increment=30,
+              flatgeobuf=False, emit_gmt=False, jobs=1, fast_validate=False, incremental=False, watch=False,
+              no_map=False):
     try:
-        interpretation(input_directory, output_directory, crs, gis, lines, lines_increment)
+        if watch:
+            interpretation_watch(input_directory, output_directory, crs=crs, gis=gis, lines=lines,
+                                 lines_increment=lines_increment, flatgeobuf=flatgeobuf, emit_gmt=emit_gmt, jobs=jobs,
+                                 fast_validate=fast_validate, build_map=not no_map)
+        else:
+            interpretation(input_directory, output_directory, crs, gis, lines, lines_increment, flatgeobuf, emit_gmt,
+                           jobs, fast_validate, incremental, not no_map)
         click.echo("Completed interpretation")
     except Exception as e:
         click.echo(f"Error: {e}", err=True)
         sys.exit(1)
 
 
+@cli.command(name="map")
+@click.option("--o", "output_directory", type=click.Path(exists=True), required=True)
+@click.option("--fetch-previews", "fetch_previews", is_flag=True, default=False,
+              help="Embed only the coarsest map level and fetch the finer ones, for a map.html served over HTTP")
+def render_map(output_directory, fetch_previews=False):
+    try:
+        web_map(output_directory, fetch_previews=fetch_previews)
+        click.echo("Completed map")
+    except Exception as e:
+        click.echo(f"Error: {e}", err=True)
+        sys.exit(1)
+
+
 @cli.command()
 @click.option("--i", "input_directory", type=click.Path(exists=True), required=True)
 @click.option("--o", "output_directory", type=click.Path(), required=True)
@@ -64,9 +112,13 @@ def validate(input_directory, output_directory, asud_filename):
 @click.option("--i", "input_directory", type=click.Path(exists=True), required=True)
 @click.option("--o", "output_directory", type=click.Path(), required=True)
 @click.option("--crs", default="28349", help="Coordinate Reference System (default: EPSG:28349)")
-def convert(input_directory, output_directory, crs):
+@click.option("--keep-intermediates", "keep_intermediates", is_flag=True, default=False,
+              help="Also write the SORT/*.srt and *_hdr.hdr intermediate files")
+@click.option("--jobs", default=1, type=click.IntRange(min=1),
+              help="Number of worker processes converting the lines (default: 1)")
+def convert(input_directory, output_directory, crs, keep_intermediates=False, jobs=1):
     try:
-        conversion(input_directory, output_directory, crs)
+        conversion(input_directory, output_directory, crs, keep_intermediates, jobs)
         click.echo("Completed conversion")
     except Exception as e:
         click.echo(f"Error: {e}", err=True)
@@ -0,0 +1,138 @@
+"""
+Catalogue of a stage's input directory.
+
+The directory is listed once, with the size and mtime of every file, and the flight line inputs are
+indexed by line ID: the *.path.txt and *.extent.txt files, including their _high/_mid/_low variants,
+and the *_interp*.shp interpretation shapefiles. Stages query the catalogue instead of globbing and
+stat'ing the directory for every lookup, which is slow on network storage.
+"""
+import fnmatch
+import os
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+from loguru import logger
+
+from aemworkflow.utilities import BASE_SUFFIX
+
+GEOMETRY_SUFFIXES = {"path": ".path.txt", "extent": ".extent.txt"}
+
+
+@dataclass(frozen=True)
+class CatalogueEntry:
+    path: Path
+    size: int
+    mtime_ns: int
+
+
+@dataclass
+class FlightLine:
+    """
+    The input files of one flight line, the geometry files keyed by their BASE_SUFFIX variant.
+    """
+    path: Dict[str, CatalogueEntry] = field(default_factory=dict)
+    extent: Dict[str, CatalogueEntry] = field(default_factory=dict)
+    interp: List[CatalogueEntry] = field(default_factory=list)
+
+
+def split_variant(stem: str) -> Tuple[str, str]:
+    """
+    Splits a geometry file stem such as "1001_low" into its line ID and BASE_SUFFIX variant.
+    """
+    for base_suffix in BASE_SUFFIX[1:]:
+        if stem.endswith(base_suffix):
+            return stem[:-len(base_suffix)], base_suffix
+    return stem, ""
+
+
+class InputCatalogue:
+    """
+    One listing of an input directory, and of its sub directories when recursive is set, see the
+    module docstring. Files are keyed by their "/" separated path relative to the input directory.
+    """
+
+    def __init__(self, input_directory, recursive=True, logger_session=logger):
+        self.input_directory = Path(input_directory)
+        self.recursive = recursive
+        self.files: Dict[str, CatalogueEntry] = {}
+        self.lines: Dict[str, FlightLine] = {}
+        self._scan(self.input_directory, "")
+        logger_session.info(f"Catalogued {len(self.files)} files in {self.input_directory}")
+
+        for name in sorted(self.top_level()):
+            if name.startswith("."):
+                continue
+            entry = self.files[name]
+            for geometryfile, required_suffix in GEOMETRY_SUFFIXES.items():
+                if name.endswith(required_suffix):
+                    line_id, base_suffix = split_variant(name[:-len(required_suffix)])
+                    getattr(self.lines.setdefault(line_id, FlightLine()), geometryfile)[base_suffix] = entry
+            if self.matches(name, "*_interp*.shp"):
+                self.lines.setdefault(name.split("_")[0], FlightLine()).interp.append(entry)
+
+    def _scan(self, directory: Path, relative: str) -> None:
+        with os.scandir(directory) as entries:
+            for dir_entry in entries:
+                name = f"{relative}{dir_entry.name}"
+                if dir_entry.is_dir(follow_symlinks=False):
+                    if self.recursive:
+                        self._scan(Path(dir_entry.path), f"{name}/")
+                elif dir_entry.is_file():
+                    stat = dir_entry.stat()
+                    self.files[name] = CatalogueEntry(Path(dir_entry.path), stat.st_size, stat.st_mtime_ns)
+
+    @staticmethod
+    def matches(name: str, pattern: str) -> bool:
+        # same rules as glob: case per platform and hidden files only matched by an explicit dot
+        return not name.startswith(".") and fnmatch.fnmatch(name, pattern)
+
+    def top_level(self) -> List[str]:
+        return [name for name in self.files if "/" not in name]
+
+    def glob(self, pattern: str) -> List[CatalogueEntry]:
+        """
+        Returns the entries of the top level files matching a glob pattern, sorted by name.
+        """
+        return [self.files[name] for name in sorted(self.top_level()) if self.matches(name, pattern)]
+
+    def get(self, relative_path: str) -> Optional[CatalogueEntry]:
+        return self.files.get(Path(relative_path).as_posix())
+
+    def exists(self, relative_path: str) -> bool:
+        return self.get(relative_path) is not None
+
+    def exists_path(self, path) -> bool:
+        """
+        Tells whether a file under the input directory, given by its full path, was catalogued.
+        """
+        try:
+            return self.exists(os.path.relpath(path, self.input_directory))
+        except ValueError:
+            return False
+
+    def line_pairs(self) -> Tuple[List[Tuple[CatalogueEntry, CatalogueEntry]], List[CatalogueEntry]]:
+        """
+        Pairs every *.path.txt file with the *.extent.txt file of the same name. Returns the pairs
+        sorted by path file name and the files left without a partner.
+        """
+        paths = {entry.path.name[:-len(".path.txt")]: entry for entry in self.glob("*.path.txt")}
+        extents = {entry.path.name[:-len(".extent.txt")]: entry for entry in self.glob("*.extent.txt")}
+        pairs = [(paths[stem], extents[stem]) for stem in paths if stem in extents]
+        unmatched = ([entry for stem, entry in paths.items() if stem not in extents]
+                     + [entry for stem, entry in extents.items() if stem not in paths])
+        return pairs, sorted(unmatched, key=lambda entry: entry.path.name)
+
+    def geometry_file(self, prefix: str, geometryfile: str, logger_session=logger) -> Tuple[Path, str]:
+        """
+        Catalogue lookup with the same result as utilities.find_geometry_file().
+        """
+        required_suffix = GEOMETRY_SUFFIXES[geometryfile]
+        for base_suffix in BASE_SUFFIX:
+            entry = self.files.get(f'{prefix}{base_suffix}{required_suffix}')
+            if entry is not None:
+                logger_session.info(f'{geometryfile} file ../{entry.path.name} exists: True')
+                return entry.path, base_suffix
+
+        logger_session.error(f'No {geometryfile} file found for "{prefix}".')
+        raise FileNotFoundError(f'No {geometryfile} file found for "{prefix}"')
@@ -4,14 +4,15 @@ GA AEM interpretation workflow, awk2python script translation
 import argparse
 import glob
 import os
-import re
 from pathlib import Path
-from typing import List, TextIO, Tuple
+from typing import Iterator, List, TextIO, Tuple
 
 import pandas as pd
 from loguru import logger
 
-from aemworkflow.utilities import get_make_srt_dir, get_ogr_path, run_command, validate_file
+from aemworkflow.gmt_records import METADATA, SEGMENT, VERTICES, read_gmt_records
+from aemworkflow.path_files import interpolate_fiducials, read_path_file
+from aemworkflow.utilities import WriterPool, get_make_srt_dir, get_ogr_path, run_command, validate_file
 
 
 def first(shp_dir: str, wrk_dir: str) -> None:
@@ -79,53 +80,8 @@ def interpol(col_1: float, frst: int, last: int, tdf: pd.DataFrame) -> Tuple[flo
         The list of path identifiers read from the first column of the extent file
     """
 
-    i_last = len(tdf)
-    cdp = (tdf["fid"] - 1).tolist()
-    if frst <= col_1 < last:
-        # interpolate
-        for idx in cdp:
-            if cdp[idx] <= col_1 < cdp[idx + 1]:
-                x1 = tdf['coordx'].iloc[idx]
-                y1 = tdf['coordy'].iloc[idx]
-                g1 = tdf['gl'].iloc[idx]
-                x2 = tdf['coordx'].iloc[idx + 1]
-                y2 = tdf['coordy'].iloc[idx + 1]
-                g2 = tdf['gl'].iloc[idx + 1]
-                l1 = cdp[idx + 1] - cdp[idx]
-                l2 = col_1 - cdp[idx]
-                lr = l2 / l1
-                x = x1 + (x2 - x1) * lr
-                y = y1 + (y2 - y1) * lr
-                t = g1 + (g2 - g1) * lr
-    elif int(col_1) <= frst:
-        # extrapolate to the left
-        x1 = tdf['coordx'].iloc[0]
-        y1 = tdf['coordy'].iloc[0]
-        g1 = tdf['gl'].iloc[0]
-        x2 = tdf['coordx'].iloc[1]
-        y2 = tdf['coordy'].iloc[1]
-        g2 = tdf['gl'].iloc[1]
-        l1 = cdp[1] - cdp[0]
-        l2 = col_1 - cdp[0]
-        lr = l2 / l1
-        x = x1 + (x2 - x1) * lr
-        y = y1 + (y2 - y1) * lr
-        t = g1 + (g2 - g1) * lr
-    elif col_1 >= last:
-        # extrapolate to the right
-        x1 = tdf['coordx'].iloc[i_last - 2]
-        y1 = tdf['coordy'].iloc[i_last - 2]
-        g1 = tdf['gl'].iloc[i_last - 2]
-        x2 = tdf['coordx'].iloc[i_last - 1]
-        y2 = tdf['coordy'].iloc[i_last - 1]
-        g2 = tdf['gl'].iloc[i_last - 1]
-        l1 = cdp[i_last - 1] - cdp[i_last - 2]
-        l2 = col_1 - cdp[i_last - 1]
-        lr = l2 / l1
-        x = x2 + (x2 - x1) * lr
-        y = y2 + (y2 - y1) * lr
-        t = g2 + (g2 - g1) * lr
-    return x, y, t
+    x, y, t = interpolate_fiducials([col_1], frst, last, tdf)
+    return float(x[0]), float(y[0]), float(t[0])
 
 
 def zedfix_gmt(wrk_dir: str, path_dir: str, ext_file: str) -> List[int]:
@@ -151,9 +107,6 @@ def zedfix_gmt(wrk_dir: str, path_dir: str, ext_file: str) -> List[int]:
 
     fm1 = "  {:{_f}}" * 7 + " {} {}\n"
     fm2 = " {:{_f}}" * 7 + " {} {}\n"
-    # regex1 = re.compile('\d')   # this fails for negative numbers
-    regex2 = re.compile('[+-]?([0-9]*[.])?[0-9]+')
-
     srt_dir = Path(wrk_dir) / "SORT"
     get_make_srt_dir(srt_dir)
 
@@ -163,7 +116,6 @@ def zedfix_gmt(wrk_dir: str, path_dir: str, ext_file: str) -> List[int]:
     logger.info("Testing GMT for +Z ")
 
     # pdf_list = []
-    pcols = ("nm", "fid", "pix_x", "pix_y", "coordx", "coordy", "col7", "col8", "gl")
     for nm in exdf['nm']:
         ner = 0
         fidd = 0
@@ -171,61 +123,55 @@ def zedfix_gmt(wrk_dir: str, path_dir: str, ext_file: str) -> List[int]:
         y_scale = (row['t_bot'].iloc[0] - row['t_top'].iloc[0]) /\
                   (row['frame_bot'].iloc[0] - row['frame_top'].iloc[0])
         p_file = Path(path_dir) / f"{nm}.path.txt"
-        tdf = pd.read_csv(p_file, sep=r'\s+', names=pcols, header=None, index_col=False)
+        tdf = read_path_file(p_file)
         # pdf_list.append(tdf)
         frst = tdf["fid"].iloc[0] - 1
         last = tdf["fid"].iloc[-1] - 1
 
         gmt = Path(wrk_dir) / f"{nm}_interp.gmt"
 
-        with open(gmt, "r") as fin:
-            lin_lst = fin.readlines()
+        records = list(read_gmt_records(gmt))
 
         logger.info(f"{gmt} successfully read.")
-        lines = lin_lst.copy()
-
-        with open(Path(srt_dir) / f"{nm}zf.gmtf", "w") as fou:
-            while lines:
-                try:
-                    line = lines.pop(0).strip()
-                except IndexError:
-                    logger.info(f"{nm}.gmt processed")
-                    break
-                # if not regex1.match(line[0]) and ("@D" in line):
-                if not regex2.match(line.split()[0]) and ("@D" in line):
-                    with open(srt_dir / "met.bdf", mode="a") as fou1:
-                        fou1.write(f"{gmt.name}|{fidd}|{line}\n")
+        # place all the vertices of the line along the path at once
+        fiducials = [float(line.split()[0]) for record in records if record.kind == VERTICES
+                     for line in record.lines]
+        positions = zip(*(values.tolist() for values in interpolate_fiducials(fiducials, frst, last, tdf)))
+
+        with open(Path(srt_dir) / f"{nm}zf.gmtf", "w") as fou, WriterPool() as writers:
+            for record in records:
+                if record.kind == METADATA:
+                    line = record.line.strip()
+                    writers.write(srt_dir / "met.bdf", f"{gmt.name}|{fidd}|{line}\n")
                     fidd += 1
                     fou.write(f"# {line.split('|')[1]}\n")
                     fou.write(f"{line}\n")
                     srt_file = srt_dir / f"{nm}_{line.split('|')[1]}.srt"
-                    with open(srt_file, mode="a") as fou3:
-                        fou3.write(">\n")
-                        fou3.write(f"{line}\n")
-                # elif not regex1.match(line[0]):
-                elif not regex2.match(line.split()[0]):
+                    writers.write(srt_file, f">\n{line}\n")
+                elif record.kind != VERTICES:
+                    line = record.line.strip()
                     if ">" not in line:
-                        with open(srt_dir / f"{nm}_hdr.hdr", mode="a") as fou2:
-                            fou2.write(f"{line}\n")
+                        writers.write(srt_dir / f"{nm}_hdr.hdr", f"{line}\n")
                     idd = 1
                     fou.write(f"{line}\n")
                 else:
-                    col_1, col_2 = [float(_l) for _l in line.split()[:2]]
-                    x, y, t = interpol(col_1, frst, last, tdf)
-                    dpth = ((col_2 - row['frame_top'].iloc[0]) * y_scale) + row['t_top'].iloc[0]
-
-                    if t <= dpth:
-                        nyp = col_2 + (t - dpth) / y_scale
-                        fou.write(fm1.format(col_1, nyp, x, y, t, t, 0, idd, fidd - 1, _f=".6f"))
-
-                        with open(srt_file, mode="a") as fou3:
-                            fou3.write(fm1.format(col_1, nyp, x, y, t, t, 0, idd, fidd - 1, _f=".6f"))
-                        ner += 1
-                    else:
-                        fou.write(fm2.format(col_1, col_2, x, y, dpth, t, t - dpth, idd, fidd - 1, _f=".6f"))
-                        with open(srt_file, mode="a") as fou3:
-                            fou3.write(fm2.format(col_1, col_2, x, y, dpth, t, t - dpth, idd, fidd - 1, _f=".6f"))
-                    idd += 1
+                    for line in record.lines:
+                        col_1, col_2 = [float(_l) for _l in line.split()[:2]]
+                        x, y, t = next(positions)
+                        dpth = ((col_2 - row['frame_top'].iloc[0]) * y_scale) + row['t_top'].iloc[0]
+
+                        if t <= dpth:
+                            nyp = col_2 + (t - dpth) / y_scale
+                            vertex = fm1.format(col_1, nyp, x, y, t, t, 0, idd, fidd - 1, _f=".6f")
+                            fou.write(vertex)
+                            writers.write(srt_file, vertex)
+                            ner += 1
+                        else:
+                            vertex = fm2.format(col_1, col_2, x, y, dpth, t, t - dpth, idd, fidd - 1, _f=".6f")
+                            fou.write(vertex)
+                            writers.write(srt_file, vertex)
+                        idd += 1
+            logger.info(f"{nm}.gmt processed")
 
             fou.write(">\n")
             logger.info(f"** Error count {ner} **\n")
@@ -279,25 +225,21 @@ def sort_gmtp(wrk_dir: str, nm_lst: List[int]) -> None:
             for hline in hlines:
                 fou.write(f"{hline}\n")
             for i, srt in enumerate(srt_list, 1):
-                lines = Path(srt).read_text().split("\n")
-                while lines:
-                    try:
-                        line = lines.pop(0)
-                    except IndexError:
-                        logger.info(f"{srt} completed")
-                        break
-                    if line.startswith(">"):
+                for record in read_gmt_records(srt):
+                    if record.kind == SEGMENT:
                         seg += 1
-                        fou.write(f"{line}\n")
-                        line = lines.pop(0)
-                        fou.write(f"{line}\n")
+                        fou.write(f"{record.line}\n")
+                    elif record.kind == METADATA:
+                        fou.write(f"{record.line}\n")
                         if fn != i:
                             seg = 1
                             vtx = 1
                             fn += 1
-                    elif line:
-                        fou.write(f"{line} {vtx} {seg}\n")
-                        vtx += 1
+                    else:
+                        for line in record.lines:
+                            fou.write(f"{line} {vtx} {seg}\n")
+                            vtx += 1
+                logger.info(f"{srt} completed")
 
         in_gmtf = Path(srt_dir) / f"{nm}zf.gmtf"
         out_shp = Path(zfshp_dir) / f"{nm}_zf.shp"
@@ -398,8 +340,6 @@ def gmts_2_mdc(wrk_dir: str, colors: str, nm_lst: List[int]) -> None:
     srt_dir = Path(wrk_dir) / "SORT"
     get_make_srt_dir(srt_dir)
 
-    regex2 = re.compile('[+-]?([0-9]*[.])?[0-9]+')
-
     cdf = pd.read_csv(colors, sep=r"\s{2,}", header=0, index_col=False, engine="python")
     cdf.iloc[:, 1:4] /= 256.0
 
@@ -407,21 +347,16 @@ def gmts_2_mdc(wrk_dir: str, colors: str, nm_lst: List[int]) -> None:
         gmts = Path(srt_dir) / f"{nm}.gmts"
         if not gmts.exists():
             continue
-        lines = gmts.read_text().split("\n")
+        records = read_gmt_records(gmts)
         with open(Path(srt_dir) / f"{nm}.mdc", "w") as fou:
-            while lines:
-                try:
-                    line = lines.pop(0)
-                except IndexError as _e:
-                    logger.info(f"{nm}.gmts processed {_e}")
-                    break
-                if "@D" in line:
-                    met = line.split("|")
+            for record in records:
+                if record.kind == METADATA:
+                    met = record.line.split("|")
                     gname = met[1]
                     row = cdf[cdf["Feature classes"] == gname]
                     # row = cdf.query(f"`Feature classes` == @{gname}")
-                    line = lines.pop(0)
-                    segn, frst = line.split()[8: 10]
+                    block = next(records)
+                    segn, frst = block.line.split()[8: 10]
                     frst = int(frst)
                     # segn = int(segn)
 
@@ -435,17 +370,14 @@ def gmts_2_mdc(wrk_dir: str, colors: str, nm_lst: List[int]) -> None:
                                            *met[1:20],
                                            nm))
 
-                    try:
-                        while regex2.match(line.split()[0]):
-                            los = [int(_l) if i == 7 else float(_l) for i, _l in enumerate(line.split())]
-                            fou.write(fmt.format(los[9], los[2], los[3], los[4], los[0], los[1], los[5], los[6]))
-                            last = int(los[9])
-                            line = lines.pop(0)
-                    except IndexError:
-                        pass
+                    for line in block.lines if block.kind == VERTICES else ():
+                        los = [int(_l) if i == 7 else float(_l) for i, _l in enumerate(line.split())]
+                        fou.write(fmt.format(los[9], los[2], los[3], los[4], los[0], los[1], los[5], los[6]))
+                        last = int(los[9])
                     for i in range(frst, last):
                         fou.write(f"seg {i} {i + 1}\n")
                     fou.write("END\n")
+            logger.info(f"{nm}.gmts processed")
 
 
 def gmts_2_egs(wrk_dir: str, alt_colors: str, nm_lst: List[int]) -> None:
@@ -470,8 +402,6 @@ def gmts_2_egs(wrk_dir: str, alt_colors: str, nm_lst: List[int]) -> None:
         "UnderAge,BoundConf,ContactTyp,BasisOfInt,OvrStrtUnt,OvrStratNo,OvrConf,UndStrtUnt," \
         "UndStratNo,UndConf,WithinStrt,WithinStNo,WithinConf,HydStrtType,HydStrConf,BOMNAFUnt," \
         "BOMNAFNo,InterpRef,Comment,Annotation,NewObs,Operator,Date,SURVEY_LINE\n"
-    regex2 = re.compile('[+-]?([0-9]*[.])?[0-9]+')
-
     cdf = pd.read_csv(alt_colors, sep=r"\s{2,}", header=0, index_col=False, engine="python")
     cdf.fillna('', inplace=True)
     seg = 0
@@ -480,18 +410,13 @@ def gmts_2_egs(wrk_dir: str, alt_colors: str, nm_lst: List[int]) -> None:
         gmts = Path(srt_dir) / f"{nm}.gmts"
         if not gmts.exists():
             continue
-        lines = gmts.read_text().split("\n")
+        records = read_gmt_records(gmts)
         with open(Path(srt_dir) / f"{nm}.egs", "w") as fou:
             fou.write(header)
-            while lines:
-                try:
-                    line = lines.pop(0)
-                except IndexError as _e:
-                    logger.info(f"{nm}.gmts processed {_e}")
-                    break
-                if "@D" in line:
+            for record in records:
+                if record.kind == METADATA:
                     seg += 1
-                    m_lst = line.split("|")
+                    m_lst = record.line.split("|")
                     gnm = m_lst[1]
                     row = cdf[cdf["TYPE"] == gnm]
                     # row = cdf.query("TYPE == @gnm")
@@ -499,16 +424,13 @@ def gmts_2_egs(wrk_dir: str, alt_colors: str, nm_lst: List[int]) -> None:
                     f"{row['OVERAGE'].iloc[0]}",
                     f"{row['UNDERAGE'].iloc[0]}",
                     f"{','.join(str(x) for x in m_lst[2:24])}"
-                    line = lines.pop(0)
-                    try:
-                        while regex2.match(line.split()[0]):
-                            los = line.split()
-                            fou.write(f"{los[9]},{los[8]},{los[2]},"
-                                      f"{los[3]},{los[4]},{los[0]},"
-                                      f"{los[1]},{los[5]},{los[6]},{met},{nm}\n")
-                            line = lines.pop(0)
-                    except IndexError:
-                        pass
+                    block = next(records)
+                    for line in block.lines if block.kind == VERTICES else ():
+                        los = line.split()
+                        fou.write(f"{los[9]},{los[8]},{los[2]},"
+                                  f"{los[3]},{los[4]},{los[0]},"
+                                  f"{los[1]},{los[5]},{los[6]},{met},{nm}\n")
+            logger.info(f"{nm}.gmts processed")
 
 
 def second(wrk_dir: str) -> None:
@@ -592,7 +514,7 @@ def third(wrk_dir: str, ext_file: str) -> List[int]:
         The list of path identifiers read from the first column of the extent file
     """
 
-    def doer(n_vert: int, lines: List[str], row: pd.DataFrame, fout: TextIO, i_nxt: int = 0) -> int:
+    def doer(n_vert: int, lines: Iterator[str], row: pd.DataFrame, fout: TextIO, i_nxt: int = 0) -> int:
         """
         A helper function to avoid nested loops.
         It implements the for(x=k+1; x<=k+nv; x++){...} part of the pix_2_depth.awk script
@@ -602,7 +524,7 @@ def third(wrk_dir: str, ext_file: str) -> List[int]:
         y_scale = (row['t_bot'].iloc[0] - row['t_top'].iloc[0]) /\
                   (row['frame_bot'].iloc[0] - row['frame_top'].iloc[0])
         for _ix in range(i_nxt + 1, n_vert + i_nxt + 1):
-            los = [float(_f) for _f in lines.pop(0).split()]
+            los = [float(_f) for _f in next(lines).split()]
             dpth = ((los[1] - row['frame_top'].iloc[0]) * y_scale) + row['t_top'].iloc[0]
             fout.write(f"PVRTX {_ix} {los[0]:.6f} {los[1]:.6f} 0.000000 {los[0]:.6f} {dpth:.6f}\n")
         for _i in range(i_nxt + 1, n_vert + i_nxt):
@@ -644,15 +566,15 @@ def third(wrk_dir: str, ext_file: str) -> List[int]:
                 header = None
 
             for asc in asc_list:
-                lines = Path(asc).read_text().split("\n")
-                while lines:
+                lines = iter(Path(asc).read_text().split("\n"))
+                for line in lines:
                     try:
-                        nname = lines.pop(0).split()[0]
+                        nname = line.split()[0]
                     except IndexError:
                         logger.info(f"{asc} completed")
                         break
-                    meta = lines.pop(0) + "\n"
-                    red, green, blue = (float(_c) / 255 for _c in lines.pop(0).split())
+                    meta = next(lines) + "\n"
+                    red, green, blue = (float(_c) / 255 for _c in next(lines).split())
                     top8 = ("GOCAD PLine 1\n",
                             "HEADER {\n",
                             f"name:{nname}\n",
@@ -667,13 +589,13 @@ def third(wrk_dir: str, ext_file: str) -> List[int]:
                         fout.writelines(top8)
                         i_nxt = 0
                     fout.writelines(("ILINE\n", meta))
-                    n_vert = int(lines.pop(0))
+                    n_vert = int(next(lines))
                     if n_vert < 0:
                         logger.warning(f"WRX:{n_vert}\n{asc}\n")
                     try:
                         i_nxt = doer(n_vert, lines, row, fout, i_nxt)
                     except UnboundLocalError as _e:
-                        logger.error(f"EX: {nm}\n{n_vert}\n{len(lines)}\n{row}\n{_e}")
+                        logger.error(f"EX: {nm}\n{n_vert}\n{row}\n{_e}")
                     oname = nname
             fout.write("END\n")
             fout.write("END_MEMBERS\n")
@@ -703,12 +625,11 @@ def fourth(wrk_dir: str, path_dir: str, nm_lst: List[int]) -> None:
     srt_dir = Path(wrk_dir) / "SORT"
     get_make_srt_dir(srt_dir)
 
-    dcols = ("nm", "fid", "pix_x", "pix_y", "coordx", "coordy", "col8", "col9", "gl")
     fmt = "PVRTX {} {:{_f}} {:{_f}} {:{_f}} {:{_f}} {:{_f}} {:{_f}} {:{_f}}\n"
 
     for nm in nm_lst:
         p_file = Path(path_dir) / f"{nm}.path.txt"
-        tdf = pd.read_csv(p_file, sep=r'\s+', names=dcols, header=None, index_col=False)
+        tdf = read_path_file(p_file)
         i_last = len(tdf)
         frst = tdf["fid"].iloc[0] - 0.5
         last = tdf["fid"].iloc[-1] - 1
@@ -717,12 +638,7 @@ def fourth(wrk_dir: str, path_dir: str, nm_lst: List[int]) -> None:
         lines = s1_file.read_text().split("\n")
 
         with open(Path(srt_dir) / f"{nm}.s2", "w") as fou:
-            while lines:
-                try:
-                    line = lines.pop(0)
-                except IndexError:
-                    logger.info(f"{nm}.s1 processed")
-                    break
+            for line in lines:
                 if "PVRTX" not in line:
                     fou.write(f"{line}\n")
                 else:
@@ -826,42 +742,37 @@ def fifth(wrk_dir: str, colors: str, nm_lst: List[int], revamp: str = "") -> Non
 
     for nm in nm_lst:
         s2_file = Path(srt_dir) / f"{nm}.s2"
-        lines = s2_file.read_text().split("\n")[:-1]  # skip the empty bottom line
+        lines = iter(s2_file.read_text().split("\n")[:-1])  # skip the empty bottom line
         with open(Path(srt_dir) / f"{nm}.{sfx}", "w") as fou:
-            while lines:
-                try:
-                    line = lines.pop(0)
-                except IndexError:
-                    logger.info(f"{nm}.s2 processed")
-                    break
+            for line in lines:
                 if ("GOCAD HomogeneousGroup 1" in line) and (revamp == "2017"):
                     for _ in range(6):
-                        line = lines.pop(0)
+                        line = next(lines)
                 if ("END_MEMBERS" in line) and (revamp == "2017"):
                     logger.info(f"{nm}.s2 reached the EOF")
                     break
                 if "GOCAD PLine 1" in line:
                     fou.write(f"{line}\n")
-                    line = lines.pop(0)
+                    line = next(lines)
                     fou.write(f"{line}\n")
-                    line = lines.pop(0)
+                    line = next(lines)
                     gname = line.split(":")[1].strip()
                     fou.write(f"{line}\n")
                     row = cdf[cdf["Feature classes"] == gname]
                     # row = cdf.query(f"`Feature classes` == @{gname}")
-                    line = lines.pop(0)
+                    line = next(lines)
                     fou.write(f"{line}\n")
                     fou.write(fmt.format(row['Red'].iloc[0],
                                          row['Green'].iloc[0],
                                          row['Blue'].iloc[0],
                                          1,
                                          _f='.6f'))
-                    _ = lines.pop(0)
+                    _ = next(lines)
                     if revamp == "2017":
                         fou.write("use_feature_color: false\n")
-                        line = lines.pop(0)
+                        line = next(lines)
                         fou.write(f"{line}\n")
-                        line = lines.pop(0)
+                        line = next(lines)
                         fou.write(f"{line}\n")
                         fou.write(f17.format(nm))
                 else:
@@ -947,24 +858,19 @@ def fifth_b(wrk_dir: str, colors: str, nm_lst: List[int], revamp: str = "") -> N
     for nm in nm_lst:
         seg = 1
         s2_file = Path(srt_dir) / f"{nm}.s2"
-        lines = s2_file.read_text().split("\n")[:-1]  # skip the empty bottom line
+        lines = iter(s2_file.read_text().split("\n")[:-1])  # skip the empty bottom line
         with open(Path(srt_dir) / f"{nm}.{sfx}", "w") as fou:
-            while lines:
-                try:
-                    line = lines.pop(0)
-                except IndexError:
-                    logger.info(f"{nm}.s2 processed")
-                    break
+            for line in lines:
                 if "GOCAD HomogeneousGroup 1" in line:
                     for _ in range(6):
-                        line = lines.pop(0)
+                        line = next(lines)
                 if line.endswith("END"):
-                    line = lines.pop(0)
+                    line = next(lines)
                 if "GOCAD PLine 1" in line:
                     for _ in range(8):
-                        line = lines.pop(0)
+                        line = next(lines)
                 if "ILINE" in line:
-                    line = lines.pop(0)
+                    line = next(lines)
                     met = line.split("|")
                     met[-1] = met[-1].rstrip()
                     gname = met[1]
@@ -988,10 +894,10 @@ def fifth_b(wrk_dir: str, colors: str, nm_lst: List[int], revamp: str = "") -> N
                     fou.write("ILINE\n")
                 else:
                     if "END_MEMBERS" in line:
-                        line = lines.pop(0)
+                        line = next(lines)
                     else:
                         if line.endswith("END"):
-                            line = lines.pop(0)
+                            line = next(lines)
                         else:
                             fou.write(f"{line}\n")
             fou.write("END")
@@ -1,18 +1,62 @@
 import glob
 import os
-import re
+import shutil
 import warnings
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass, field
 from pathlib import Path
-from typing import List, Tuple
+from typing import Dict, Iterable, List, Optional, TextIO, Tuple
 
 import pandas as pd
 from loguru import logger
-from osgeo import osr
 
-from aemworkflow.utilities import get_make_srt_dir, get_ogr_path, run_command, validate_file
+from aemworkflow.catalogue import InputCatalogue
+from aemworkflow.crs_registry import gmt_headers
+from aemworkflow.gmt_records import METADATA, SEGMENT, VERTICES, read_gmt_records
+from aemworkflow.path_files import interpolate_fiducials, read_path_file
+from aemworkflow.utilities import WriterPool, get_make_srt_dir, get_ogr_path, run_command, validate_file
 
 
-def conversion_zedfix_gmt_to_srt(wrk_dir: str, path_dir: str, ext_file: str, logger_session=logger) -> List[int]:
+def render_interp_gmt(catalogue: InputCatalogue, nm, gmt_file_path: Path, logger_session=logger) -> None:
+    """
+    Converts the interpretation shapefile of a line to the *_interp.gmt text the conversion reads,
+    when the interpretation stage did not emit it or the shapefile was saved after it did, so the
+    geometry always matches the met.bdf rows interpretation rebuilt from the shapefile. When several
+    shapefiles share the line's prefix the last one is used, as it is the one interpretation writes
+    last. A GMT file without a shapefile to render it from is used as it is.
+    """
+    flight_line = catalogue.lines.get(str(nm).split("_")[0])
+    if flight_line is None or not flight_line.interp:
+        if not gmt_file_path.exists():
+            logger_session.error(f"No interpretation shapefile found for {nm}")
+        return
+    shp_entry = flight_line.interp[-1]
+    dbf_entry = catalogue.get(shp_entry.path.with_suffix(".dbf").name)
+    source_mtime_ns = max(shp_entry.mtime_ns, dbf_entry.mtime_ns if dbf_entry else 0)
+    if gmt_file_path.exists():
+        if gmt_file_path.stat().st_mtime_ns >= source_mtime_ns:
+            return
+        logger_session.info(f"{gmt_file_path.name} is older than {shp_entry.path.name}")
+        gmt_file_path.unlink()
+    logger_session.info(f"Writing {gmt_file_path.name} from {shp_entry.path.name}")
+    run_command([get_ogr_path(), "-f", "GMT", str(gmt_file_path), str(shp_entry.path)])
+
+
+@dataclass
+class SortedLine:
+    """
+    The content of the SORT/*_hdr.hdr and *.srt files of a flight line, kept in memory by the fused
+    conversion. header holds the header lines, features the segments of each feature by name, each
+    segment a @D line and the fields of its z-fixed vertices.
+    """
+    header: List[str] = field(default_factory=list)
+    features: Dict[str, List[Tuple[str, List[List[str]]]]] = field(default_factory=dict)
+
+
+def conversion_zedfix_gmt_to_srt(wrk_dir: str, path_dir: str, ext_file: str, logger_session=logger,
+                                 sorted_lines: Optional[Dict[int, SortedLine]] = None,
+                                 keep_intermediates=True, nm_lst: Optional[List[int]] = None,
+                                 bdf_name="met.bdf") -> List[int]:
     """
     Implements the following AWK action:
     awk -f zedfix_gmt.awk nm=$1 frame_top=$3 frame_bot=$5 t_top=$7 t_bot=$9 $1.path.txt $1*.gmt > $1zf.gmtf
@@ -26,93 +70,113 @@ def conversion_zedfix_gmt_to_srt(wrk_dir: str, path_dir: str, ext_file: str, log
         The path to the work folder with *.path.txt files
     ext_file: str
         The path to the combined 'extension' file for all the flight 'paths'
+    sorted_lines: dict
+        When given, the header and z-fixed vertices of each path are also kept in it as a
+        SortedLine, by path identifier, for conversion_sort_gmtp_3d()
+    keep_intermediates: bool
+        Whether to write the SORT/*.srt and *_hdr.hdr files when sorted_lines is given
+    nm_lst: List[int]
+        When given, only these paths of the extent file are converted
+    bdf_name: str
+        The name of the file in SORT the @D lines are appended to
 
     Return:
     -------
     : List[int]
-        The list of path identifiers read from the first column of the extent file
+        The list of unique path identifiers read from the first column of the extent file
     """
     logger_session.info("Running zedfix_gmt_to_srt conversion.")
 
     try:
         fm1 = "  {:{_f}}" * 7 + " {} {}\n"
         fm2 = " {:{_f}}" * 7 + " {} {}\n"
-        # regex1 = re.compile('\d')   # this fails for negative numbers
-        regex2 = re.compile('[+-]?([0-9]*[.])?[0-9]+')
 
         srt_dir = Path(wrk_dir) / "SORT"
         get_make_srt_dir(srt_dir, logger_session=logger)
 
         dcols = ("nm", "frame_l", "frame_top", "frame_r", "frame_bot", "t_l", "t_top", "t_r", "t_bot")
         exdf = pd.read_csv(ext_file, sep=r'\s+', names=dcols, header=None, index_col=False)
+        # interpretation writes a row per *_interp*.shp of a path, its GMT file holds them all
+        exdf = exdf.drop_duplicates('nm')
+        if nm_lst is not None:
+            exdf = exdf[exdf['nm'].isin(nm_lst)]
 
         logger_session.info("Testing GMT for +Z ")
 
         # pdf_list = []
-        pcols = ("nm", "fid", "pix_x", "pix_y", "coordx", "coordy", "col7", "col8", "gl")
+        catalogue = None
         for nm in exdf['nm']:
             ner = 0
             fidd = 0
             row = exdf.query("nm == @nm")
             y_scale = (row['t_bot'].iloc[0] - row['t_top'].iloc[0]) /\
                 (row['frame_bot'].iloc[0] - row['frame_top'].iloc[0])
+            frame_top = row['frame_top'].iloc[0]
+            t_top = row['t_top'].iloc[0]
             p_file = Path(path_dir) / f"{nm}.path.txt"
-            tdf = pd.read_csv(p_file, sep=r'\s+', names=pcols, header=None, index_col=False)
+            tdf = read_path_file(p_file)
             # pdf_list.append(tdf)
             frst = tdf["fid"].iloc[0] - 1
             last = tdf["fid"].iloc[-1] - 1
 
             gmt = Path(wrk_dir) / 'interp' / f"{nm}_interp.gmt"
+            catalogue = catalogue or InputCatalogue(path_dir, recursive=False)
+            render_interp_gmt(catalogue, nm, gmt, logger_session)
 
-            with open(gmt, "r") as fin:
-                lin_lst = fin.readlines()
+            records = list(read_gmt_records(gmt))
             logger_session.info(f"{nm}_interp.gmt successfully read.")
-            lines = lin_lst.copy()
-
-            with open(Path(srt_dir) / f"{nm}zf.gmtf", "w") as fou:
-                while lines:
-                    try:
-                        line = lines.pop(0).strip()
-                    except IndexError:
-                        logger_session.info(f"{nm}.gmt processed")
-                        break
-                    # if not regex1.match(line[0]) and ("@D" in line):
-                    if not regex2.match(line.split()[0]) and ("@D" in line):
-                        with open(srt_dir / "met.bdf", mode="a") as fou1:
-                            fou1.write(f"{gmt.name}|{fidd}|{line}\n")
+            sorted_line = None
+            if sorted_lines is not None:
+                sorted_line = sorted_lines[nm] = SortedLine()
+            write_srt = sorted_line is None or keep_intermediates
+            # place all the vertices of the line along the path at once
+            fiducials = [float(line.split()[0]) for record in records if record.kind == VERTICES
+                         for line in record.lines]
+            positions = zip(*(values.tolist() for values in interpolate_fiducials(fiducials, frst, last, tdf)))
+
+            with open(Path(srt_dir) / f"{nm}zf.gmtf", "w") as fou, WriterPool() as writers:
+                for record in records:
+                    if record.kind == METADATA:
+                        line = record.line.strip()
+                        writers.write(srt_dir / bdf_name, f"{gmt.name}|{fidd}|{line}\n")
                         fidd += 1
                         fou.write(f"# {line.split('|')[1]}\n")
                         fou.write(f"{line}\n")
                         srt_file = srt_dir / f"{nm}_{line.split('|')[1]}.srt"
-                        with open(srt_file, mode="a") as fou3:
-                            fou3.write(">\n")
-                            fou3.write(f"{line}\n")
-                    # elif not regex1.match(line[0]):
-                    elif not regex2.match(line.split()[0]):
+                        if write_srt:
+                            writers.write(srt_file, f">\n{line}\n")
+                        if sorted_line is not None:
+                            vertices = []
+                            sorted_line.features.setdefault(line.split('|')[1], []).append((line, vertices))
+                    elif record.kind != VERTICES:
+                        line = record.line.strip()
                         if ">" not in line:
-                            with open(srt_dir / f"{nm}_hdr.hdr", mode="a") as fou2:
-                                fou2.write(f"{line}\n")
+                            if write_srt:
+                                writers.write(srt_dir / f"{nm}_hdr.hdr", f"{line}\n")
+                            if sorted_line is not None:
+                                sorted_line.header.append(line)
                         idd = 1
                         fou.write(f"{line}\n")
                     else:
-                        col_1, col_2 = [float(_l) for _l in line.split()[:2]]
-                        x, y, t = interpol(col_1, frst, last, tdf)
-                        dpth = ((col_2 - row['frame_top'].iloc[0]) * y_scale) + row['t_top'].iloc[0]
-                        if t <= dpth:
-                            # first_col = t - dpth
-                            nyp = col_2 + (t - dpth) / y_scale
-                            fou.write(fm1.format(col_1, nyp, x, y, t, t, 0, idd, fidd - 1, _f=".6f"))
-                            with open(srt_file, mode="a") as fou3:
-                                fou3.write(fm1.format(col_1, nyp, x, y, t, t, 0, idd, fidd - 1, _f=".6f"))
-                                # fou3.write(fm1.format(col_1, nyp, x, y, t, t, 0, idd, _f=".6f"))
-
-                            ner += 1
-                        else:
-                            fou.write(fm2.format(col_1, col_2, x, y, dpth, t, t - dpth, idd, fidd - 1, _f=".6f"))
-                            with open(srt_file, mode="a") as fou3:
-                                fou3.write(fm2.format(col_1, col_2, x, y, dpth, t, t - dpth, idd, fidd - 1, _f=".6f"))
-                                # fou3.write(fm2.format(col_1, col_2, x, y, dpth, t, t - dpth, idd, _f=".6f"))
-                        idd += 1
+                        for line in record.lines:
+                            col_1, col_2 = [float(_l) for _l in line.split()[:2]]
+                            x, y, t = next(positions)
+                            dpth = ((col_2 - frame_top) * y_scale) + t_top
+                            if t <= dpth:
+                                # first_col = t - dpth
+                                nyp = col_2 + (t - dpth) / y_scale
+                                vertex = fm1.format(col_1, nyp, x, y, t, t, 0, idd, fidd - 1, _f=".6f")
+
+                                ner += 1
+                            else:
+                                vertex = fm2.format(col_1, col_2, x, y, dpth, t, t - dpth, idd, fidd - 1, _f=".6f")
+                            fou.write(vertex)
+                            if write_srt:
+                                writers.write(srt_file, vertex)
+                            if sorted_line is not None:
+                                vertices.append(vertex.split())
+                            idd += 1
+                logger_session.info(f"{nm}.gmt processed")
 
                 fou.write(">\n")
                 logger_session.info(f"** Error count {ner} **\n")
@@ -132,17 +196,61 @@ def conversion_zedfix_gmt_to_srt(wrk_dir: str, path_dir: str, ext_file: str, log
         return []
 
 
-def conversion_sort_gmtp_3d(wrk_dir: str, nm_lst: List[int], crs: str, logger_session=logger) -> None:
+def write_gmtsddd_header(fou: TextIO, hdr_lines: Iterable[str], crs: str, result_proj: str, result_wkt: str) -> None:
+    """
+    Writes the header of a *.gmtsddd file from the lines of the *_hdr.hdr file of its path.
+    """
+    for line in hdr_lines:
+        fields = line.strip().split()
+        if len(fields) > 0:
+            if "@VGMT1" in fields[1]:
+                fou.write(f"{line}")
+            elif "@R" in fields[1]:
+                fou.write(f"{line}")
+                fou.write(f"# @Je{crs}\n")
+                fou.write(f'# @Jp"{result_proj}"\n')
+                fou.write(f'# @Jw"{result_wkt}"\n')
+            elif "@NId" in fields[1]:
+                hd3 = line.split("# @NId")
+                fou.write(f"# @NFID_|Entity{hd3[1]}")
+            elif "@Tinteger" in fields[1]:
+                hd4 = line.split("# @Tinteger")
+                fou.write(f"# @Tdouble|string{hd4[1]}")
+            elif "FEATURE_DATA" in fields[1]:
+                fou.write(f"{line}")
+
+
+def write_sorted_line(fou: TextIO, nm, sorted_line: SortedLine) -> None:
+    """
+    Writes the segments of a path kept in memory by the fused conversion to its *.gmtsddd file, as
+    they are written from its *.srt files: one feature after the other in the order of the file
+    names, without the Annotations.
+    """
+    for feature in sorted(sorted_line.features, key=lambda feature: f"{feature}.srt"):
+        if f"{nm}_{feature}".endswith("Annotations"):
+            continue
+        vtx = 1
+        for seg, (met_line, vertices) in enumerate(sorted_line.features[feature], 1):
+            fou.write(">\n")
+            fou.write(f"# @D0|3DPolyline{met_line.split('# @D0')[1]}\n")
+            for fields in vertices:
+                fou.write(" ".join([fields[2], fields[3], fields[4], fields[0], fields[1], fields[5], fields[6],
+                                    fields[7], fields[8], str(vtx), str(seg)]) + "\n")
+                vtx += 1
+
+
+def conversion_sort_gmtp_3d(wrk_dir: str, nm_lst: List[int], crs: str, logger_session=logger,
+                            sorted_lines: Optional[Dict[int, SortedLine]] = None) -> None:
+    """
+    Writes the *.gmtsddd file of each path from its SORT/*_hdr.hdr and *.srt files, or from its
+    SortedLine in sorted_lines when the conversion is fused, and converts its *zf.gmtf file to a
+    shapefile in ZF_SHP.
+    """
     logger_session.info("Running sort_gmtp_3d conversion.")
     try:
-        proj = osr.SpatialReference()
-        proj.ImportFromEPSG(int(crs))
-        result_wkt = proj.ExportToWkt()
-        result_wkt = result_wkt.replace('"', '\\"')
-        result_proj = proj.ExportToProj4()
-        # print(f'epsg resutl is: {result_wkt}')
-        # print(f'proj string is: {result_proj}')
-        del proj
+        headers = gmt_headers(crs)
+        result_wkt = headers["Jw"]
+        result_proj = headers["Jp"]
 
         srt_dir = Path(wrk_dir) / "SORT"
         get_make_srt_dir(srt_dir, logger_session=logger)
@@ -156,51 +264,40 @@ def conversion_sort_gmtp_3d(wrk_dir: str, nm_lst: List[int], crs: str, logger_se
         for nm in nm_lst:
             ano_list = sorted(glob.glob(os.path.join(srt_dir, "*Annotations.srt")))
             if ano_list:
-                _ = [Path(_f).unlink() for _f in ano_list]
+                _ = [Path(_f).unlink(missing_ok=True) for _f in ano_list]
 
-            srt_list = sorted(glob.glob(os.path.join(srt_dir, f"{nm}*.srt")))
-            hdr = Path(srt_dir / f"{nm}_hdr.hdr")
             with open(Path(srt_dir) / f"{nm}.gmtsddd", "w") as fou:
-                with open(hdr, 'r') as hdr_file:
-                    for line in hdr_file:
-                        fields = line.strip().split()
-                        if len(fields) > 0:
-                            if "@VGMT1" in fields[1]:
-                                fou.write(f"{line}")
-                            elif "@R" in fields[1]:
-                                fou.write(f"{line}")
-                                fou.write(f"# @Je{crs}\n")
-                                fou.write(f'# @Jp"{result_proj}"\n')
-                                fou.write(f'# @Jw"{result_wkt}"\n')
-                            elif "@NId" in fields[1]:
-                                hd3 = line.split("# @NId")
-                                fou.write(f"# @NFID_|Entity{hd3[1]}")
-                            elif "@Tinteger" in fields[1]:
-                                hd4 = line.split("# @Tinteger")
-                                fou.write(f"# @Tdouble|string{hd4[1]}")
-                            elif "FEATURE_DATA" in fields[1]:
-                                fou.write(f"{line}")
-
-                for i, srt in enumerate(srt_list, 1):
-                    vtx = 1
-                    seg = 0
-                    with open(srt, 'r') as srt_file:
-                        for line in srt_file:
-                            fields = line.strip().split()
-                            if len(fields) > 0:
-                                if fields[0] == ">":
-                                    seg += 1
-                                    fou.write(f"{line.strip()}\n")
-                                    next_line = next(srt_file).strip()
-                                    met = next_line.split("# @D0")
-                                    fou.write(f"# @D0|3DPolyline{met[1]}\n")
-                                else:
-                                    # fou.write(fields[2], fields[3], fields[4], fields[0], fields[1], fields[5],
-                                    # fields[6], fields[7], fields[8], vtx, seg)
-                                    fou.write(" ".join([fields[2], fields[3], fields[4], fields[0],
-                                                        fields[1], fields[5], fields[6], fields[7],
-                                                        fields[8], str(vtx), str(seg)]) + "\n")
-                                    vtx += 1
+                if sorted_lines is not None:
+                    sorted_line = sorted_lines[nm]
+                    write_gmtsddd_header(fou, (f"{line}\n" for line in sorted_line.header), crs, result_proj,
+                                         result_wkt)
+                    write_sorted_line(fou, nm, sorted_line)
+                else:
+                    srt_list = sorted(glob.glob(os.path.join(srt_dir, f"{nm}*.srt")))
+                    hdr = Path(srt_dir / f"{nm}_hdr.hdr")
+                    with open(hdr, 'r') as hdr_file:
+                        write_gmtsddd_header(fou, hdr_file, crs, result_proj, result_wkt)
+
+                    for i, srt in enumerate(srt_list, 1):
+                        vtx = 1
+                        seg = 0
+                        with open(srt, 'r') as srt_file:
+                            for line in srt_file:
+                                fields = line.strip().split()
+                                if len(fields) > 0:
+                                    if fields[0] == ">":
+                                        seg += 1
+                                        fou.write(f"{line.strip()}\n")
+                                        next_line = next(srt_file).strip()
+                                        met = next_line.split("# @D0")
+                                        fou.write(f"# @D0|3DPolyline{met[1]}\n")
+                                    else:
+                                        # fou.write(fields[2], fields[3], fields[4], fields[0], fields[1], fields[5],
+                                        # fields[6], fields[7], fields[8], vtx, seg)
+                                        fou.write(" ".join([fields[2], fields[3], fields[4], fields[0],
+                                                            fields[1], fields[5], fields[6], fields[7],
+                                                            fields[8], str(vtx), str(seg)]) + "\n")
+                                        vtx += 1
 
             in_gmtf = Path(srt_dir) / f"{nm}zf.gmtf"
             out_shp = Path(zfshp_dir) / f"{nm}_zf.shp"
@@ -253,7 +350,7 @@ def conversion_sort_gmtp(wrk_dir: str, nm_lst: List[int], logger_session=logger)
             fn = 1
             ano_list = sorted(glob.glob(os.path.join(srt_dir, "*Annotations.srt")))
             if ano_list:
-                _ = [Path(_f).unlink() for _f in ano_list]
+                _ = [Path(_f).unlink(missing_ok=True) for _f in ano_list]
             srt_list = sorted(glob.glob(os.path.join(srt_dir, f"{nm}*.srt")))
             hdr = Path(srt_dir / f"{nm}_hdr.hdr")
             hlines = hdr.read_text().split("\n")[:-1]
@@ -261,25 +358,21 @@ def conversion_sort_gmtp(wrk_dir: str, nm_lst: List[int], logger_session=logger)
                 for hline in hlines:
                     fou.write(f"{hline}\n")
                 for i, srt in enumerate(srt_list, 1):
-                    lines = Path(srt).read_text().split("\n")
-                    while lines:
-                        try:
-                            line = lines.pop(0)
-                        except IndexError:
-                            logger_session.info(f"{srt} completed")
-                            break
-                        if line.startswith(">"):
+                    for record in read_gmt_records(srt):
+                        if record.kind == SEGMENT:
                             seg += 1
-                            fou.write(f"{line}\n")
-                            line = lines.pop(0)
-                            fou.write(f"{line}\n")
+                            fou.write(f"{record.line}\n")
+                        elif record.kind == METADATA:
+                            fou.write(f"{record.line}\n")
                             if fn != i:
                                 seg = 1
                                 vtx = 1
                                 fn += 1
-                        elif line:
-                            fou.write(f"{line} {vtx} {seg}\n")
-                            vtx += 1
+                        else:
+                            for line in record.lines:
+                                fou.write(f"{line} {vtx} {seg}\n")
+                                vtx += 1
+                    logger_session.info(f"{srt} completed")
 
             in_gmtf = Path(srt_dir) / f"{nm}zf.gmtf"
             out_shp = Path(zfshp_dir) / f"{nm}_zf.shp"
@@ -322,68 +415,74 @@ def interpol(col_1: float, frst: int, last: int, tdf: pd.DataFrame) -> Tuple[flo
     """
 
     try:
-        i_last = len(tdf)
-        cdp = (tdf["fid"] - 1).tolist()
-        if frst <= col_1 < last:
-            # interpolate
-            for idx in cdp:
-                if cdp[idx] <= col_1 < cdp[idx + 1]:
-                    x1 = tdf['coordx'].iloc[idx]
-                    y1 = tdf['coordy'].iloc[idx]
-                    g1 = tdf['gl'].iloc[idx]
-                    x2 = tdf['coordx'].iloc[idx + 1]
-                    y2 = tdf['coordy'].iloc[idx + 1]
-                    g2 = tdf['gl'].iloc[idx + 1]
-                    l1 = cdp[idx + 1] - cdp[idx]
-                    l2 = col_1 - cdp[idx]
-                    lr = l2 / l1
-                    x = x1 + (x2 - x1) * lr
-                    y = y1 + (y2 - y1) * lr
-                    t = g1 + (g2 - g1) * lr
-        elif int(col_1) <= frst:
-            # extrapolate to the left
-            x1 = tdf['coordx'].iloc[0]
-            y1 = tdf['coordy'].iloc[0]
-            g1 = tdf['gl'].iloc[0]
-            x2 = tdf['coordx'].iloc[1]
-            y2 = tdf['coordy'].iloc[1]
-            g2 = tdf['gl'].iloc[1]
-            l1 = cdp[1] - cdp[0]
-            l2 = col_1 - cdp[0]
-            lr = l2 / l1
-            x = x1 + (x2 - x1) * lr
-            y = y1 + (y2 - y1) * lr
-            t = g1 + (g2 - g1) * lr
-        elif col_1 >= last:
-            # extrapolate to the right
-            x1 = tdf['coordx'].iloc[i_last - 2]
-            y1 = tdf['coordy'].iloc[i_last - 2]
-            g1 = tdf['gl'].iloc[i_last - 2]
-            x2 = tdf['coordx'].iloc[i_last - 1]
-            y2 = tdf['coordy'].iloc[i_last - 1]
-            g2 = tdf['gl'].iloc[i_last - 1]
-            l1 = cdp[i_last - 1] - cdp[i_last - 2]
-            l2 = col_1 - cdp[i_last - 1]
-            lr = l2 / l1
-            x = x2 + (x2 - x1) * lr
-            y = y2 + (y2 - y1) * lr
-            t = g2 + (g2 - g1) * lr
-        return x, y, t
+        x, y, t = interpolate_fiducials([col_1], frst, last, tdf)
+        return float(x[0]), float(y[0]), float(t[0])
     except Exception as e:
         logger.error(f"Error during interpolation: {e}")
 
 
-def main(input_directory: str, output_directory: str, crs=28349) -> None:
+def convert_line(input_directory: str, output_directory: str, extent_file_path: str, nm, crs,
+                 keep_intermediates=False) -> None:
+    """
+    Converts one path in a worker process. Its met.bdf rows go to its own SORT/{nm}.met.bdf
+    fragment, which main() appends to met.bdf.
+    """
+    with warnings.catch_warnings():
+        warnings.simplefilter("ignore")
+        # the rows are appended, not to a fragment left behind by a failed run
+        (Path(output_directory) / "SORT" / f"{nm}.met.bdf").unlink(missing_ok=True)
+        sorted_lines = {}
+        nm_list = conversion_zedfix_gmt_to_srt(output_directory, input_directory, extent_file_path,
+                                               sorted_lines=sorted_lines, keep_intermediates=keep_intermediates,
+                                               nm_lst=[nm], bdf_name=f"{nm}.met.bdf")
+        conversion_sort_gmtp_3d(output_directory, nm_list, crs, sorted_lines=sorted_lines)
+
+
+def main(input_directory: str, output_directory: str, crs=28349, keep_intermediates=False, jobs=1) -> None:
+    """
+    Runs the conversion fused: the z-fixed vertices of each path are grouped by feature in memory and
+    written to its *.gmtsddd file directly, the SORT/*.srt and *_hdr.hdr files are only written
+    with keep_intermediates. With jobs > 1 the paths are converted by a pool of that many worker
+    processes, and their met.bdf fragments are merged in the order of the extent file.
+    """
     with warnings.catch_warnings():
         warnings.simplefilter("ignore")
         work_dir = output_directory
         path_dir = input_directory
 
         active_extent_out_file_path = os.path.join(output_directory, 'interp', 'active_extent.txt')
-        return_list = conversion_zedfix_gmt_to_srt(work_dir, path_dir, active_extent_out_file_path)
+        if jobs > 1:
+            nm_list = list(dict.fromkeys(pd.read_csv(active_extent_out_file_path, sep=r'\s+', header=None,
+                                                     usecols=[0], index_col=False).iloc[:, 0].tolist()))
+            # made here, the workers would race to make them
+            srt_dir = Path(work_dir) / "SORT"
+            for directory in (srt_dir, Path(work_dir) / "ZF_SHP"):
+                directory.mkdir(parents=True, exist_ok=True)
+            with ProcessPoolExecutor(max_workers=jobs) as executor:
+                futures = [executor.submit(convert_line, path_dir, work_dir, active_extent_out_file_path, nm, crs,
+                                           keep_intermediates)
+                           for nm in nm_list]
+                for nm, future in zip(nm_list, futures):
+                    try:
+                        future.result()
+                    except (Exception, SystemExit) as e:
+                        logger.error(f"Error converting line {nm}: {e!r}")
+
+            with open(srt_dir / "met.bdf", "a") as bdf_file:
+                for nm in nm_list:
+                    fragment = srt_dir / f"{nm}.met.bdf"
+                    if fragment.is_file():
+                        with open(fragment) as fragment_file:
+                            shutil.copyfileobj(fragment_file, bdf_file)
+                        fragment.unlink()
+            return
+
+        sorted_lines = {}
+        return_list = conversion_zedfix_gmt_to_srt(work_dir, path_dir, active_extent_out_file_path,
+                                                   sorted_lines=sorted_lines, keep_intermediates=keep_intermediates)
 
         nm_list = return_list
-        conversion_sort_gmtp_3d(work_dir, nm_list, crs)
+        conversion_sort_gmtp_3d(work_dir, nm_list, crs, sorted_lines=sorted_lines)
 
 
 if __name__ == "__main__":
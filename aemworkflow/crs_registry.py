@@ -0,0 +1,117 @@
+"""
+Process wide cache of the CRS metadata used by the workflow stages.
+
+The GMT header strings (@Je, @Jp, @Jw) and the PROJ pipelines of the transformers to EPSG:4326
+are looked up once per EPSG code, kept in memory for the rest of the run and persisted to a small
+JSON file so later runs skip the PROJ database lookups altogether.
+"""
+import json
+import os
+from pathlib import Path
+
+import numpy as np
+import osgeo
+import pyproj
+import shapely
+from loguru import logger
+from osgeo import osr
+from pyproj import Transformer
+from pyproj.transformer import TransformerGroup
+
+CACHE_FILE = Path(os.environ.get("AEMWORKFLOW_CRS_CACHE",
+                                 Path.home() / ".cache" / "aemworkflow" / "crs_registry.json"))
+
+# the pipelines come from the PROJ and proj-data pyproj ships, not from the GDAL build
+PYPROJ_VERSION = f"{pyproj.__version__}/{pyproj.proj_version_str}"
+
+_registry = None
+_transformers = {}
+
+
+def _load_registry(logger_session=logger) -> dict:
+    global _registry
+    if _registry is None:
+        _registry = {"gdal_version": osgeo.__version__, "pyproj_version": PYPROJ_VERSION,
+                     "gmt_headers": {}, "pipelines": {}}
+        try:
+            with open(CACHE_FILE) as cache_file:
+                cached = json.load(cache_file)
+            # entries written by another GDAL or pyproj build may differ, start those afresh
+            if cached.get("gdal_version") == osgeo.__version__:
+                _registry["gmt_headers"].update(cached.get("gmt_headers", {}))
+            if cached.get("pyproj_version") == PYPROJ_VERSION:
+                _registry["pipelines"].update(cached.get("pipelines", {}))
+        except FileNotFoundError:
+            pass
+        except (OSError, ValueError) as e:
+            logger_session.warning(f"Ignoring unreadable CRS cache {CACHE_FILE}: {e}")
+    return _registry
+
+
+def _save_registry(logger_session=logger) -> None:
+    try:
+        CACHE_FILE.parent.mkdir(parents=True, exist_ok=True)
+        tmp_file = CACHE_FILE.with_name(f"{CACHE_FILE.name}.{os.getpid()}.tmp")
+        with open(tmp_file, "w") as cache_file:
+            json.dump(_registry, cache_file, indent=1)
+        os.replace(tmp_file, CACHE_FILE)
+    except OSError as e:
+        logger_session.warning(f"Could not write CRS cache {CACHE_FILE}: {e}")
+
+
+def gmt_headers(crs, logger_session=logger) -> dict:
+    """
+    Returns the GMT header values for an EPSG code as a dict with the keys "Je", "Jp" and "Jw".
+    The WKT already has its double quotes escaped, ready for a '# @Jw"..."' line.
+    """
+    registry = _load_registry(logger_session)
+    key = str(int(crs))
+    headers = registry["gmt_headers"].get(key)
+    if headers is None:
+        proj = osr.SpatialReference()
+        failed = proj.ImportFromEPSG(int(crs))
+        headers = {
+            "Je": key,
+            "Jp": proj.ExportToProj4(),
+            "Jw": proj.ExportToWkt().replace('"', '\\"'),
+        }
+        del proj
+        if failed:
+            # keep the previous behaviour of writing whatever GDAL returned, but never cache it
+            return headers
+        registry["gmt_headers"][key] = headers
+        _save_registry(logger_session)
+    return headers
+
+
+def transformer(source_crs, target_crs=4326, logger_session=logger) -> Transformer:
+    """
+    Returns an x/y ordered pyproj Transformer between two EPSG codes, built from the cached
+    pipeline of the best available operation when there is one.
+    """
+    key = f"{int(source_crs)}:{int(target_crs)}"
+    if key in _transformers:
+        return _transformers[key]
+
+    registry = _load_registry(logger_session)
+    pipeline = registry["pipelines"].get(key)
+    if pipeline is not None:
+        result = Transformer.from_pipeline(pipeline)
+    else:
+        group = TransformerGroup(f"EPSG:{int(source_crs)}", f"EPSG:{int(target_crs)}", always_xy=True)
+        if group.transformers:
+            result = group.transformers[0]
+            registry["pipelines"][key] = result.definition
+            _save_registry(logger_session)
+        else:
+            result = Transformer.from_crs(f"EPSG:{int(source_crs)}", f"EPSG:{int(target_crs)}", always_xy=True)
+    _transformers[key] = result
+    return result
+
+
+def reproject(geometry, source_crs, target_crs=4326, logger_session=logger):
+    """
+    Reprojects an array of shapely geometries with the cached transformer in one vectorised call.
+    """
+    to_target = transformer(source_crs, target_crs, logger_session)
+    return shapely.transform(geometry, lambda coords: np.column_stack(to_target.transform(coords[:, 0], coords[:, 1])))
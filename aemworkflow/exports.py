@@ -8,6 +8,8 @@ from typing import List
 import pandas as pd
 from loguru import logger
 
+from aemworkflow.gmt_records import METADATA, VERTICES, read_gmt_records
+
 
 def gmtsddd_to_egs(wrk_dir: str, alt_colors: str, nm_list: List[int]) -> None:
     # Initialize dictionaries for over and under age
@@ -294,8 +296,6 @@ def gmts_2_egs(wrk_dir: str, alt_colors: str, nm_lst: List[int]) -> None:
             "" \
             "Date,SURVEY_LINE\n"
 
-        regex2 = re.compile('[+-]?([0-9]*[.])?[0-9]+')
-
         cdf = pd.read_csv(alt_colors, sep=r"\s{2,}", header=0, index_col=False, engine="python")
         cdf.fillna('', inplace=True)
         seg = 0
@@ -304,36 +304,27 @@ def gmts_2_egs(wrk_dir: str, alt_colors: str, nm_lst: List[int]) -> None:
             gmts = Path(srt_dir) / f"{nm}.gmtsddd"
             if not gmts.exists():
                 continue
-            lines = gmts.read_text().split("\n")
+            records = read_gmt_records(gmts)
             with open(Path(srt_dir) / f"{nm}.egs", "w") as fou:
                 fou.write(header)
-                while lines:
-                    try:
-                        line = lines.pop(0)
-                    except IndexError:
-                        logger.info(f"{nm}.gmts processed")
-                        break
-                    if "@D" in line:
+                for record in records:
+                    if record.kind == METADATA:
                         seg += 1
-                        m_lst = line.split("|")
+                        m_lst = record.line.split("|")
                         gnm = m_lst[2]
                         row = cdf[cdf["TYPE"] == gnm]
                         # row = cdf.query("TYPE == @gnm")
                         met = f"{gnm},{row['OVERAGE'].iloc[0]},"
                         f"{row['UNDERAGE'].iloc[0]},"
                         f"{','.join(str(x) for x in m_lst[2:24])}"
-                        line = lines.pop(0)
-
-                        try:
-                            while regex2.match(line.split()[0]):
-                                los = line.split()
-                                fou.write(f"{los[9]},{los[8]},{los[2]},"
-                                          f"{los[3]},{los[4]},{los[0]},"
-                                          f"{los[1]},{los[5]},{los[6]},"
-                                          f"{met},{nm}\n")
-                                line = lines.pop(0)
-                        except IndexError:
-                            pass
+                        block = next(records)
+                        for line in block.lines if block.kind == VERTICES else ():
+                            los = line.split()
+                            fou.write(f"{los[9]},{los[8]},{los[2]},"
+                                      f"{los[3]},{los[4]},{los[0]},"
+                                      f"{los[1]},{los[5]},{los[6]},"
+                                      f"{met},{nm}\n")
+                logger.info(f"{nm}.gmts processed")
     except Exception as e:
         logger.error(f"Error during gmts_2_egs conversion: {e}")
         sys.exit(1)
@@ -403,8 +394,6 @@ def gmts_2_mdc(wrk_dir: str, colors: str, nm_lst: List[int]) -> None:
             logger.error("SORT folder missing")
             sys.exit(0)
 
-        regex2 = re.compile('[+-]?([0-9]*[.])?[0-9]+')
-
         cdf = pd.read_csv(colors, sep=r"\s{2,}", header=0, index_col=False, engine="python")
         cdf.iloc[:, 1:4] /= 256.0
 
@@ -412,21 +401,16 @@ def gmts_2_mdc(wrk_dir: str, colors: str, nm_lst: List[int]) -> None:
             gmts = Path(srt_dir) / f"{nm}.gmtsddd"
             if not gmts.exists():
                 continue
-            lines = gmts.read_text().split("\n")
+            records = read_gmt_records(gmts)
             with open(Path(srt_dir) / f"{nm}.mdc", "w") as fou:
-                while lines:
-                    try:
-                        line = lines.pop(0)
-                    except IndexError:
-                        logger.info(f"{nm}.gmts processed")
-                        break
-                    if "@D" in line:
-                        met = line.split("|")
+                for record in records:
+                    if record.kind == METADATA:
+                        met = record.line.split("|")
                         gname = met[2]
                         row = cdf[cdf["Feature classes"] == gname]
                         # row = cdf.query("`Feature classes` == @gname")
-                        line = lines.pop(0)
-                        segn, frst = line.split()[8: 10]
+                        block = next(records)
+                        segn, frst = block.line.split()[8: 10]
                         frst = int(frst)
                         # segn = int(segn)
                         fou.write(fsctn.format(nm, segn, met[2],
@@ -435,17 +419,14 @@ def gmts_2_mdc(wrk_dir: str, colors: str, nm_lst: List[int]) -> None:
                                   *met[2:21],
                                   nm
                                   ))
-                        try:
-                            while regex2.match(line.split()[0]):
-                                los = [int(_l) if i == 7 else float(_l) for i, _l in enumerate(line.split())]
-                                fou.write(fmt.format(los[9], los[2], los[3], los[4], los[0], los[1], los[5], los[6]))
-                                last = int(los[9])
-                                line = lines.pop(0)
-                        except IndexError:
-                            pass
+                        for line in block.lines if block.kind == VERTICES else ():
+                            los = [int(_l) if i == 7 else float(_l) for i, _l in enumerate(line.split())]
+                            fou.write(fmt.format(los[9], los[2], los[3], los[4], los[0], los[1], los[5], los[6]))
+                            last = int(los[9])
                         for i in range(frst, last):
                             fou.write(f"seg {i} {i + 1}\n")
                         fou.write("END\n")
+                logger.info(f"{nm}.gmts processed")
     except Exception as e:
         logger.error(f"Error during gmts_2_mdc conversion: {e}")
         sys.exit(1)
@@ -0,0 +1,72 @@
+"""
+Streaming reader for the GMT text files of the conversion and export stages.
+
+The *_interp.gmt files ogr2ogr writes, and the *.srt, *.gmts and *.gmtsddd files the stages derive
+from them, are read line by line from the buffered file and grouped into typed records, instead of
+being read into a list that is drained from the front. The lines are classified the way the stages
+always did: a line whose first field is a number is a vertex, and consecutive vertices form one
+vertex block, a line holding "@D" is the metadata of a feature, a line starting with ">" starts a
+segment and anything else is a header line. Blank lines are skipped.
+"""
+import re
+from typing import Iterable, Iterator, NamedTuple, Tuple
+
+NUMBER = re.compile('[+-]?([0-9]*[.])?[0-9]+')
+
+HEADER = "header"
+METADATA = "metadata"
+SEGMENT = "segment"
+VERTICES = "vertices"
+
+
+class GmtRecord(NamedTuple):
+    """
+    A record of a GMT file. lines holds the lines of the record without their line end: all the
+    vertices of a vertex block, or the single line of the other kinds of record.
+    """
+    kind: str
+    lines: Tuple[str, ...]
+
+    @property
+    def line(self) -> str:
+        return self.lines[0]
+
+
+def line_kind(line: str) -> str:
+    """
+    Returns the kind of record a non blank GMT line belongs to.
+    """
+    if NUMBER.match(line.split()[0]):
+        return VERTICES
+    if "@D" in line:
+        return METADATA
+    if line.startswith(">"):
+        return SEGMENT
+    return HEADER
+
+
+def gmt_records(lines: Iterable[str]) -> Iterator[GmtRecord]:
+    """
+    Groups the lines of a GMT file into records, lazily, so the lines can come straight from the
+    open file.
+    """
+    block = []
+    for line in lines:
+        line = line.rstrip("\n")
+        if not line.strip():
+            continue
+        kind = line_kind(line)
+        if kind == VERTICES:
+            block.append(line)
+            continue
+        if block:
+            yield GmtRecord(VERTICES, tuple(block))
+            block = []
+        yield GmtRecord(kind, (line,))
+    if block:
+        yield GmtRecord(VERTICES, tuple(block))
+
+
+def read_gmt_records(gmt_file_path) -> Iterator[GmtRecord]:
+    with open(gmt_file_path, "r") as gmt_file:
+        yield from gmt_records(gmt_file)
@@ -0,0 +1,180 @@
+"""
+In memory reader for the *_interp*.shp interpretation shapefiles.
+
+The attribute records and vertex coordinates are read straight from the shapefile with fiona, so
+the met.bdf attribute table can be written without converting the shapefile to GMT text with
+ogr2ogr and scanning the text for its @D lines. The attribute values are formatted the way the
+GDAL GMT driver writes them, so met.bdf is the same either way.
+
+The same records are also written as met.parquet, a typed Arrow table with dictionary encoded
+string columns, which the validation stage reads by column instead of splitting met.bdf lines.
+"""
+import json
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Iterator, List, Optional, Tuple
+
+import fiona
+import numpy as np
+import pyarrow as pa
+import pyarrow.parquet as pq
+
+MET_TABLE_NAME = "met.parquet"
+
+
+@dataclass
+class InterpLayer:
+    """
+    The features of an interpretation shapefile that have a geometry. fields holds the (name,
+    fiona type) pairs of the attribute table, e.g. ("Depth", "float:24.15"), records the
+    attribute values of each feature and parts the vertex array of each part of each feature.
+    """
+    path: Path
+    fields: List[Tuple[str, str]] = field(default_factory=list)
+    records: List[tuple] = field(default_factory=list)
+    parts: List[List[np.ndarray]] = field(default_factory=list)
+
+
+def read_interp_shapefile(shp_file_path) -> InterpLayer:
+    layer = InterpLayer(Path(shp_file_path))
+    with fiona.open(shp_file_path) as src:
+        layer.fields = list(src.schema["properties"].items())
+        names = [name for name, _ in layer.fields]
+        for feature in src:
+            geometry = feature.geometry
+            # the GMT driver refuses features without a geometry, they never reached met.bdf
+            if geometry is None:
+                continue
+            if geometry.type.startswith("Multi"):
+                parts = [np.asarray(part, dtype=np.float64) for part in geometry.coordinates]
+            else:
+                parts = [np.asarray(geometry.coordinates, dtype=np.float64)]
+            layer.records.append(tuple(feature.properties[name] for name in names))
+            layer.parts.append(parts)
+    return layer
+
+
+def gmt_field_value(value, field_type: str) -> str:
+    """
+    Formats an attribute value as the GDAL GMT driver writes it in a @D line.
+    """
+    if value is None:
+        return ""
+    base_type, _, width = field_type.partition(":")
+    if base_type == "float":
+        width, _, precision = width.partition(".")
+        if width and int(width):
+            # fixed width like the DBF field, without the padding
+            text = f"{value:{int(width)}.{int(precision or 0)}f}".lstrip(" ")
+        else:
+            text = f"{value:.15g}"
+    elif base_type in ("int", "int32", "int64"):
+        text = str(int(value))
+    elif base_type == "date":
+        text = str(value).replace("-", "/")
+    else:
+        text = str(value)
+
+    if any(character in text for character in " |\t\n"):
+        escaped = text.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+        return f'"{escaped}"'
+    return text
+
+
+def gmt_data_lines(layer: InterpLayer) -> List[str]:
+    """
+    Returns the "# @D..." metadata line of every feature, as in the GMT text of the shapefile.
+    """
+    if not layer.fields:
+        return []
+    types = [field_type for _, field_type in layer.fields]
+    return ["# @D" + "|".join(gmt_field_value(value, field_type) for value, field_type in zip(record, types))
+            for record in layer.records]
+
+
+def met_bdf_rows(layer: InterpLayer, gmt_file_name: str) -> List[str]:
+    """
+    Returns the met.bdf rows of a layer, the same rows active_gmt_metadata_to_bdf() reads from the
+    layer's GMT file named gmt_file_name.
+    """
+    return [f"{gmt_file_name}|{counter}|{line}\n" for counter, line in enumerate(gmt_data_lines(layer))]
+
+
+def write_met_bdf(layer: InterpLayer, gmt_file_name: str, bdf_file_path, mode) -> None:
+    with open(bdf_file_path, mode) as out_bdf_file:
+        out_bdf_file.writelines(met_bdf_rows(layer, gmt_file_name))
+
+
+def _arrow_column(values: list, field_type: str) -> pa.Array:
+    base_type = field_type.partition(":")[0]
+    if base_type == "float":
+        return pa.array(values, pa.float64())
+    if base_type in ("int", "int32", "int64"):
+        return pa.array(values, pa.int64())
+    if base_type == "date":
+        return pa.array(values, pa.string()).cast(pa.date32())
+    return pa.array([None if value is None else str(value) for value in values], pa.string()).dictionary_encode()
+
+
+def met_table(layers: List[Tuple[str, InterpLayer]]) -> Optional[pa.Table]:
+    """
+    Returns the met.bdf rows of the (GMT file name, layer) pairs as an Arrow table with a file and
+    fid column followed by the attribute columns, or None when the layers do not share one attribute
+    table. The fiona field types are kept in the schema metadata.
+    """
+    layers = [(gmt_file_name, layer) for gmt_file_name, layer in layers if layer.fields]
+    if not layers or any(layer.fields != layers[0][1].fields for _, layer in layers):
+        return None
+    fields = layers[0][1].fields
+    columns = {
+        "file": pa.array([gmt_file_name for gmt_file_name, layer in layers for _ in layer.records]).dictionary_encode(),
+        "fid": pa.array([counter for _, layer in layers for counter in range(len(layer.records))], pa.int64()),
+    }
+    for index, (name, field_type) in enumerate(fields):
+        columns[name] = _arrow_column([record[index] for _, layer in layers for record in layer.records], field_type)
+    return pa.table(columns, metadata={"fields": json.dumps(fields)})
+
+
+def write_met_table(tables: List[pa.Table], table_path) -> bool:
+    """
+    Writes the met.parquet companion of met.bdf from the met_table() of consecutive shapefiles, or
+    slices of the table of an earlier run. A stale table is removed when they can not be written as
+    one, so readers fall back to met.bdf. Returns whether the table was written.
+    """
+    table = None
+    # the field types in the metadata must agree too, they decide how the values are formatted
+    if tables and all(other.schema.metadata == tables[0].schema.metadata for other in tables):
+        try:
+            table = pa.concat_tables(tables)
+        except pa.ArrowInvalid:
+            pass
+    if table is None:
+        Path(table_path).unlink(missing_ok=True)
+        return False
+    pq.write_table(table, table_path)
+    return True
+
+
+def _column_text(column: pa.ChunkedArray, field_type: str) -> List[str]:
+    # the values repeat a lot, format each distinct one once
+    texts = {}
+    return [texts[value] if value in texts else texts.setdefault(value, gmt_field_value(value, field_type))
+            for value in column.to_pylist()]
+
+
+def met_table_rows(table_path) -> Iterator[Tuple[List[str], str]]:
+    """
+    Yields the fields and the text of every met.bdf row stored in a met.parquet table, with the
+    double quotes removed as validation_remove_quotes() does for met.bdf. The fields are split from
+    the text like validation.met_rows() splits the met.bdf lines, so a value holding a "|" shifts
+    the fields after it the same way.
+    """
+    table = pq.read_table(table_path)
+    fields = json.loads(table.schema.metadata[b"fields"])
+    columns = [[str(value) for value in table.column("file").to_pylist()],
+               [str(value) for value in table.column("fid").to_pylist()]]
+    columns += [_column_text(table.column(index + 2), field_type) for index, (_, field_type) in enumerate(fields)]
+    columns[2] = [f"# @D{text}" for text in columns[2]]
+    for row in zip(*columns):
+        line = "|".join(row).replace('"', '') + "\n"
+        yield line.strip().split("|"), line
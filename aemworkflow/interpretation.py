@@ -1,15 +1,47 @@
 import decimal
-import glob
+import fnmatch
 import os
 import sys
+import time
 import warnings
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
 from pathlib import Path
+from typing import List, Optional
 
-import folium
 import geopandas
-from osgeo import osr
-
-from aemworkflow.utilities import find_geometry_file, get_ogr_path, run_command, validate_file, validate_shapefile
+import numpy as np
+import pyarrow as pa
+import pyarrow.parquet as pq
+import shapely
+
+from aemworkflow import web_map
+from aemworkflow.catalogue import InputCatalogue
+from aemworkflow.crs_registry import gmt_headers, reproject
+from aemworkflow.interp_shapefile import (
+    MET_TABLE_NAME,
+    met_bdf_rows,
+    met_table,
+    read_interp_shapefile,
+    write_met_table,
+)
+from aemworkflow.layer_io import read_layer, write_layer
+from aemworkflow.manifest import file_digest, load_run_manifest, save_manifest
+from aemworkflow.path_files import CHUNK_BYTES, iter_path_tokens, read_path_columns, token_text
+from aemworkflow.utilities import (
+    VALIDATION_CACHE_NAME,
+    find_geometry_file,
+    get_ogr_path,
+    run_command,
+    validate_file,
+    validate_shapefile,
+)
+from aemworkflow.web_preview import write_flatgeobuf, write_previews
+
+MANIFEST_NAME = 'interpretation.manifest.json'
+WATCHED_PATTERNS = ('*_interp*', '*.path.txt', '*.extent.txt')
+POLL_INTERVAL = 2.0
+DEBOUNCE = 5.0
 
 header = 0
 xpo = 0.5
@@ -39,51 +71,268 @@ def active_shp_to_gmt(shp_file_path, gmt_file_path):
     run_command(cmd)
 
 
+def active_extent_lines(extent_file_path):
+    with open(extent_file_path) as extent_file:
+        return [f'{extent_file.readline().strip()}\n']
+
+
+def active_path_gmt_header(crs):
+    headers = gmt_headers(crs)
+    return ["# @VGMT1.0 @GLINESTRING\n",
+            f'# @Jp"{headers["Jp"]}"\n',
+            f'# @Jw"{headers["Jw"]}"\n',
+            "# @Nlinenum\n",
+            "# @Tinteger\n",
+            "# FEATURE_DATA\n"]
+
+
+# the constant pieces of the active_path.gmt text, appended to a path file chunk to gather from
+GMT_SEGMENT = b">\n# @D"
+GMT_PIECES = np.frombuffer(GMT_SEGMENT + b" \n", dtype=np.uint8)
+GMT_SPACE, GMT_NEWLINE = len(GMT_SEGMENT), len(GMT_SEGMENT) + 1
+
+
+def active_path_gmt_block(data, starts, ends, names, previous_name=b""):
+    """
+    Returns the active_path.gmt text of a chunk of a path file, given as by iter_path_tokens() with
+    the token_text() of its line numbers: a segment per run of the same line number, the line
+    numbers and coordinates written as they are in the path file. previous_name is the line number
+    of the last line of the previous chunk.
+    """
+    if not len(starts):
+        return ""
+    new_segment = np.empty(len(names), dtype=bool)
+    new_segment[0] = names[0] != previous_name
+    new_segment[1:] = names[1:] != names[:-1]
+
+    # per line the pieces ">\n# @D", line number, "\n" of a new segment, then x, " ", y, "\n"
+    base = len(data)
+    pieces_start = np.empty((len(starts), 7), dtype=np.int64)
+    pieces_start[:] = [base, 0, base + GMT_NEWLINE, 0, base + GMT_SPACE, 0, base + GMT_NEWLINE]
+    pieces_start[:, 1], pieces_start[:, 3], pieces_start[:, 5] = starts[:, 0], starts[:, 4], starts[:, 5]
+    pieces_length = np.ones((len(starts), 7), dtype=np.int64)
+    pieces_length[:, 0] = new_segment * len(GMT_SEGMENT)
+    pieces_length[:, 1] = new_segment * (ends[:, 0] - starts[:, 0])
+    pieces_length[:, 2] = new_segment
+    pieces_length[:, 3] = ends[:, 4] - starts[:, 4]
+    pieces_length[:, 5] = ends[:, 5] - starts[:, 5]
+    keep = pieces_length.ravel() > 0
+    pieces_start, pieces_length = pieces_start.ravel()[keep], pieces_length.ravel()[keep]
+
+    # the source index of every output byte, counting up within a piece and jumping between them
+    index = np.ones(pieces_length.sum(), dtype=np.int64)
+    index[0] = pieces_start[0]
+    index[np.cumsum(pieces_length[:-1])] = pieces_start[1:] - (pieces_start[:-1] + pieces_length[:-1] - 1)
+    return np.concatenate([data, GMT_PIECES])[np.cumsum(index)].tobytes().decode()
+
+
+def iter_active_path_blocks(path_file_path, chunk_bytes=CHUNK_BYTES):
+    """
+    Yields the active_path.gmt text of every chunk of a path file with the chunk, see
+    active_path_gmt_block().
+    """
+    previous_name = b""
+    for data, starts, ends in iter_path_tokens(path_file_path, chunk_bytes):
+        names = token_text(data, starts[:, 0], ends[:, 0])
+        yield active_path_gmt_block(data, starts, ends, names, previous_name), data, starts, ends, names
+        if len(names):
+            previous_name = names[-1]
+
+
+def active_path_gmt_lines(path_file_path, chunk_bytes=CHUNK_BYTES) -> str:
+    """
+    Returns the active_path.gmt text of a path file below the header.
+    """
+    return "".join(block for block, *_ in iter_active_path_blocks(path_file_path, chunk_bytes))
+
+
+def active_path_outputs(path_file_path, chunk_bytes=CHUNK_BYTES):
+    """
+    Returns the active_path.gmt text below the header and the active_path_lines() of a path file
+    from one read of it.
+    """
+    blocks, line_numbers, coordinates = [], [], []
+    for block, data, starts, ends, names in iter_active_path_blocks(path_file_path, chunk_bytes):
+        blocks.append(block)
+        line_numbers.append(names.astype(np.float64).astype(np.int64))
+        coordinates.append(np.column_stack([token_text(data, starts[:, 4], ends[:, 4]).astype(np.float64),
+                                            token_text(data, starts[:, 5], ends[:, 5]).astype(np.float64)]))
+    if not blocks:
+        return "", []
+    return "".join(blocks), line_runs(np.concatenate(line_numbers), np.concatenate(coordinates))
+
+
 def active_extent_control_file(extent_file_path, path_file_path,
                                output_file_path, out_active_extent_path,
                                crs, gis, mode):
     try:
-        proj = osr.SpatialReference()
-        proj.ImportFromEPSG(int(crs))
-        result_wkt = proj.ExportToWkt()
-        result_wkt = result_wkt.replace('"', '\\"')
-        result_proj = proj.ExportToProj4()
-        # print(f'epsg resutl is: {result_wkt}')
-        # print(f'proj string is: {result_proj}')
-        del proj
-
         with open(out_active_extent_path, mode) as out_active_ext_file:
-            with open(extent_file_path) as extent_file:
-                extent_line = extent_file.readline().strip()
-                out_active_ext_file.write(f'{extent_line}\n')
+            out_active_ext_file.writelines(active_extent_lines(extent_file_path))
 
         with open(output_file_path, mode) as out_file:
             if mode == 'w':
-                out_file.write("# @VGMT1.0 @GLINESTRING\n")
-                out_file.write(f'# @Jp"{result_proj}"\n')
-                out_file.write(f'# @Jw"{result_wkt}"\n')
-                out_file.write("# @Nlinenum\n")
-                out_file.write("# @Tinteger\n")
-                out_file.write("# FEATURE_DATA\n")
-
-            line_name = None
-
-            with open(path_file_path) as path_file:
-                for path_line in path_file:
-                    path_line = path_line.strip().split()
+                out_file.writelines(active_path_gmt_header(crs))
+            out_file.write(active_path_gmt_lines(path_file_path))
+    except Exception as e:
+        print(f"Error processing extent or path file: {e}", file=sys.stderr)
+        sys.exit(1)
 
-                    if line_name != path_line[0]:
-                        line_name = path_line[0]
-                        out_file.write(">\n")
-                        out_file.write(f"# @D{line_name}\n")
 
-                    out_file.write(f"{path_line[4]} {path_line[5]}\n")
+def active_path_lines(path_file_path):
+    """
+    Returns the (line number, coordinates) pairs of a path file, one per run of the same line
+    number, the same LineStrings active_extent_control_file() writes to active_path.gmt.
+    """
+    columns = read_path_columns(path_file_path, ("nm", "coordx", "coordy"))
+    return line_runs(columns["nm"], np.column_stack([columns["coordx"], columns["coordy"]]))
+
+
+def line_runs(line_numbers, coordinates):
+    starts = np.flatnonzero(np.diff(line_numbers, prepend=np.nan) != 0)
+    ends = np.append(starts[1:], len(coordinates))
+    return [(int(line_numbers[start]), coordinates[start:end]) for start, end in zip(starts, ends)]
+
+
+@dataclass
+class LineOutputs:
+    """
+    The part one interpretation shapefile, with its extent and path file, has in each of the
+    aggregate outputs: the met.bdf rows and their met.parquet table, the active_extent.txt lines,
+    the active_path.gmt text below the header and the active_path LineStrings.
+    """
+    met: List[str]
+    extent: List[str]
+    path: str
+    line_numbers: List[int]
+    geometry: np.ndarray
+    table: Optional[pa.Table] = None
+    skipped: List[int] = field(default_factory=list)
+
+    def counts(self):
+        return {"met": len(self.met), "extent": len(self.extent), "path": self.path.count("\n"),
+                "lines": len(self.line_numbers)}
+
+
+def read_line_inputs(shp_file_path, extent_file_path, path_file_path, gmt_file_path):
+    """
+    Reads the interpretation shapefile, extent and path file of a line into its LineOutputs. Runs in
+    the interpretation thread pool.
+    """
+    layer = read_interp_shapefile(shp_file_path)
+    gmt_file_name = Path(gmt_file_path).name
+    try:
+        extent_lines = active_extent_lines(extent_file_path)
+        path_text, path_lines = active_path_outputs(path_file_path)
     except Exception as e:
         print(f"Error processing extent or path file: {e}", file=sys.stderr)
         sys.exit(1)
 
-
-def main(input_directory, output_directory, crs=28349, gis="esri_arcmap_0.5", lines=10, lines_increment=30):
+    # single point runs make no LineString, they are left out of the active_path layers
+    line_numbers, coordinates, skipped = [], [], []
+    for line_number, line_coordinates in path_lines:
+        if len(line_coordinates) < 2:
+            skipped.append(line_number)
+        else:
+            line_numbers.append(line_number)
+            coordinates.append(line_coordinates)
+    counts = [len(line_coordinates) for line_coordinates in coordinates]
+    geometry = shapely.linestrings(np.concatenate(coordinates) if coordinates else np.empty((0, 2)),
+                                   indices=np.repeat(np.arange(len(counts)), counts))
+    return LineOutputs(met_bdf_rows(layer, gmt_file_name), extent_lines, path_text, line_numbers,
+                       np.asarray(geometry, dtype=object), met_table([(gmt_file_name, layer)]), skipped)
+
+
+def input_fingerprint(files, previous=None):
+    """
+    Returns the fingerprint of the input files of a line, {key: [sha256, size, mtime_ns]} for the
+    {key: path} given. The digest of the previous fingerprint is reused for a file whose size and
+    mtime did not change, so unchanged inputs are not read again.
+    """
+    fingerprint = {}
+    for key, path in files.items():
+        stat = os.stat(path)
+        previous_file = (previous or {}).get(key)
+        if previous_file is not None and previous_file[1:] == [stat.st_size, stat.st_mtime_ns]:
+            fingerprint[key] = previous_file
+        else:
+            fingerprint[key] = [file_digest(path), stat.st_size, stat.st_mtime_ns]
+    return fingerprint
+
+
+def same_inputs(fingerprint, other):
+    # a file saved again with the same content is unchanged
+    return {key: value[0] for key, value in fingerprint.items()} == {key: value[0] for key, value in other.items()}
+
+
+def previous_line_outputs(output_directory, entries, crs):
+    """
+    Splits the aggregate outputs of the last run into the LineOutputs of each shapefile, using the
+    row counts of the manifest entries. Returns None when the outputs are missing or do not add up
+    to the counts, the run then rebuilds every line.
+    """
+    interp_dir = os.path.join(output_directory, 'interp')
+    try:
+        with open(os.path.join(interp_dir, 'met.bdf')) as met_file:
+            met = met_file.readlines()
+        with open(os.path.join(interp_dir, 'active_extent.txt')) as extent_file:
+            extent = extent_file.readlines()
+        with open(os.path.join(interp_dir, 'active_path.gmt')) as path_file:
+            path = path_file.readlines()[len(active_path_gmt_header(crs)):]
+        active_path = read_layer(os.path.join(interp_dir, 'active_path.shp'))
+    except Exception as e:
+        print(f"Rebuilding all lines, the outputs of the last run can not be read: {e}", file=sys.stderr)
+        return None
+    try:
+        table = pq.read_table(os.path.join(interp_dir, MET_TABLE_NAME))
+    except Exception:
+        table = None
+
+    totals = {key: sum(counts[key] for _, _, counts in entries) for key in ("met", "extent", "path", "lines")}
+    if totals != {"met": len(met), "extent": len(extent), "path": len(path), "lines": len(active_path)}:
+        print("Rebuilding all lines, the outputs of the last run do not match its manifest", file=sys.stderr)
+        return None
+    if table is not None and table.num_rows != len(met):
+        table = None
+
+    line_numbers = active_path["linenum"].tolist()
+    geometry = np.asarray(active_path.geometry.values, dtype=object)
+    outputs = {}
+    offsets = dict.fromkeys(totals, 0)
+    for name, _, counts in entries:
+        start = dict(offsets)
+        offsets = {key: offsets[key] + counts[key] for key in offsets}
+        outputs[name] = LineOutputs(met[start["met"]:offsets["met"]],
+                                    extent[start["extent"]:offsets["extent"]],
+                                    "".join(path[start["path"]:offsets["path"]]),
+                                    line_numbers[start["lines"]:offsets["lines"]],
+                                    geometry[start["lines"]:offsets["lines"]],
+                                    None if table is None else table.slice(start["met"], counts["met"]))
+    return outputs
+
+
+def write_active_path(line_numbers, geometry, output_directory, crs, flatgeobuf=False):
+    """
+    Writes the active_path shapefile and its EPSG:4326 GeoJSON copy in one write each, and records
+    the shapefile for the map stage. Returns the EPSG:4326 GeoDataFrame.
+    """
+    active_shp_out_file_path = os.path.join(output_directory, 'interp', 'active_path.shp')
+    active_path_geojson_path = os.path.join(output_directory, 'interp', 'active_path.geojson')
+
+    active_path_interp_shp = geopandas.GeoDataFrame({"linenum": np.asarray(line_numbers, dtype=np.int32)},
+                                                    geometry=geometry, crs=f"EPSG:{crs}")
+    write_layer(active_path_interp_shp, active_shp_out_file_path)
+    print(active_path_interp_shp.crs)
+    active_path_interp_shp = active_path_interp_shp.set_geometry(reproject(geometry, crs), crs="EPSG:4326")
+    print(active_path_interp_shp.crs)
+    write_layer(active_path_interp_shp, active_path_geojson_path, driver='GeoJSON')
+    if flatgeobuf:
+        write_flatgeobuf(active_path_interp_shp, active_path_geojson_path)
+    web_map.record_layer(output_directory, "interp")
+    return active_path_interp_shp
+
+
+def main(input_directory, output_directory, crs=28349, gis="esri_arcmap_0.5", lines=10, lines_increment=30,
+         flatgeobuf=False, emit_gmt=False, jobs=1, fast_validate=False, incremental=False, build_map=True):
     with warnings.catch_warnings():
         warnings.simplefilter("ignore")
         print("create AEM interp box and ground level ghost profiles", file=sys.stderr)
@@ -92,88 +341,139 @@ def main(input_directory, output_directory, crs=28349, gis="esri_arcmap_0.5", li
         Path(fr'{output_directory}{os.sep}interp').mkdir(exist_ok=True)
         active_extent_out_file_path = os.path.join(output_directory, 'interp', 'active_extent.txt')
         active_gmt_out_file_path = os.path.join(output_directory, 'interp', 'active_path.gmt')
-        active_shp_out_file_path = os.path.join(output_directory, 'interp', 'active_path.shp')
-        ogr2ogr_active_gmt_log = os.path.join(output_directory, 'interp', 'gdal_active.log')
 
         shp_dir = input_directory
-        shp_list = sorted(glob.glob(os.path.join(shp_dir, '*_interp*.shp')))
+        catalogue = InputCatalogue(shp_dir)
+        shp_list = [str(entry.path) for entry in catalogue.glob('*_interp*.shp')]
 
         if not shp_list:
             print("Error: Interpretation shape files not found in project directory.", file=sys.stderr)
             return
 
-        if not validate_shapefile(shp_dir):
+        cache_path = os.path.join(output_directory, 'interp', VALIDATION_CACHE_NAME) if fast_validate else None
+        if not validate_shapefile(shp_dir, catalogue=catalogue, jobs=jobs, cache_path=cache_path):
             print("Error: Invalid shapefile in input directory.", file=sys.stderr)
             return
 
-        mode = 'w'
-
+        line_inputs = []
         for shp in shp_list:
             fname = Path(shp).stem
             prefix = fname.split("_")[0]
-            extent_file_path, extent_suffix = find_geometry_file(shp_dir, prefix, "extent")
-            path_file_path, path_suffix = find_geometry_file(shp_dir, prefix, "path")
-            active_extent_control_file(extent_file_path,
-                                       path_file_path,
-                                       active_gmt_out_file_path,
-                                       active_extent_out_file_path,
-                                       crs,
-                                       gis,
-                                       mode)
-
+            extent_file_path, extent_suffix = find_geometry_file(shp_dir, prefix, "extent", catalogue=catalogue)
+            path_file_path, path_suffix = find_geometry_file(shp_dir, prefix, "path", catalogue=catalogue)
             gmt_file_path = os.path.join(output_directory, 'interp', f'{prefix}{extent_suffix}_interp.gmt')
-            active_shp_to_gmt(shp, gmt_file_path)
-
-            bdf_file_path = os.path.join(output_directory, 'interp', 'met.bdf')
-            active_gmt_metadata_to_bdf(gmt_file_path, bdf_file_path, mode)
-
-            mode = 'a'
-
-            cmd = [
-                get_ogr_path(),
-                "-f", "ESRI Shapefile",
-                active_shp_out_file_path,
-                active_gmt_out_file_path,
-                "--config", "CPL_DEBUG", "ON",
-                "--config", "CPL_LOG", ogr2ogr_active_gmt_log
-            ]
-            if not validate_file(active_gmt_out_file_path):
-                return
-            run_command(cmd)
-
-            # Create the active path interp geojson file for display on map.
-            active_path_interp_shp: geopandas.GeoDataFrame = geopandas.read_file(active_shp_out_file_path)
-            print(active_path_interp_shp.crs)
-            active_path_interp_shp = active_path_interp_shp.to_crs(epsg=4326)
-            print(active_path_interp_shp.crs)
-            active_path_interp_shp.to_file(os.path.join(output_directory,
-                                                        'interp',
-                                                        'active_path.geojson'), driver='GeoJSON')
-
-            # Create the folium map for the all_lines and update the map html file.
-            def style_func(x):
-                return {
-                    'fillColor': 'red',
-                    'color': 'red',
-                    'opacity': 0.50,
-                    'weight': 2,
-                }
-
-            m = folium.Map(location=[-30.80, 141.264160], zoom_start=5)
-            folium.GeoJson(data=open(os.path.join(output_directory,
-                                                  'interp',
-                                                  'active_path.geojson'), 'r').read(),
-                           name="interp", style_function=style_func).add_to(m)
-
-            layer = folium.GeoJson(data=open(os.path.join(output_directory,
-                                   'all_lines',
-                                             'all_lines.geojson'), 'r').read(), name="all-lines").add_to(m)
-            print(f'bounds are: {layer.get_bounds()}')
-
-        folium.LayerControl().add_to(m)
-        map_path = os.path.normpath(f"{output_directory}{os.sep}map.html")
-        m.save(map_path)
-        print('completed updating map')
+            line_inputs.append((shp, extent_file_path, path_file_path, gmt_file_path))
+
+        # the manifest of the last run, dropped when any parameter changed since then
+        manifest_path = os.path.join(output_directory, MANIFEST_NAME)
+        params = {"crs": str(crs), "gis": gis}
+        previous = load_run_manifest(manifest_path, params, incremental)
+        previous_fingerprints = {name: fingerprint for name, fingerprint, _ in previous.get("shapefiles", [])}
+        names = [Path(shp).name for shp, *_ in line_inputs]
+        fingerprints = {Path(shp).name: input_fingerprint({"shp": shp,
+                                                           "dbf": f'{os.path.splitext(shp)[0]}.dbf',
+                                                           "extent": extent_file_path,
+                                                           "path": path_file_path},
+                                                          previous_fingerprints.get(Path(shp).name))
+                        for shp, extent_file_path, path_file_path, _ in line_inputs} if incremental else {}
+        outputs = previous_line_outputs(output_directory, previous["shapefiles"], crs) if previous else None
+        outputs = outputs or {}
+
+        changed = [(shp, extent_file_path, path_file_path, gmt_file_path)
+                   for shp, extent_file_path, path_file_path, gmt_file_path in line_inputs
+                   if Path(shp).name not in outputs
+                   or not same_inputs(previous_fingerprints[Path(shp).name], fingerprints[Path(shp).name])
+                   or (emit_gmt and not os.path.isfile(gmt_file_path))]
+        if incremental:
+            print(f"Interpretation shapefiles to rebuild:{len(changed)}:{len(line_inputs)}", file=sys.stderr)
+
+        # the pool reads the changed lines, the aggregate outputs are written here in shapefile order
+        with ThreadPoolExecutor(max_workers=jobs) as executor:
+            futures = [executor.submit(read_line_inputs, *line_input) for line_input in changed]
+            for (shp, *_), future in zip(changed, futures):
+                outputs[Path(shp).name] = line_outputs = future.result()
+                for line_number in line_outputs.skipped:
+                    print(f"Skipping single point active path of line {line_number}", file=sys.stderr)
+        if emit_gmt:
+            # shapefiles sharing a prefix share a GMT file, written once from the last of them in order
+            gmt_shapefiles = {gmt_file_path: shp for shp, _, _, gmt_file_path in line_inputs}
+            for gmt_file_path in dict.fromkeys(gmt_file_path for *_, gmt_file_path in changed):
+                active_shp_to_gmt(gmt_shapefiles[gmt_file_path], gmt_file_path)
+        outputs = [outputs[name] for name in names]
+
+        with open(os.path.join(output_directory, 'interp', 'met.bdf'), 'w') as bdf_file:
+            bdf_file.writelines(row for line_outputs in outputs for row in line_outputs.met)
+        with open(active_extent_out_file_path, 'w') as active_extent_file:
+            active_extent_file.writelines(line for line_outputs in outputs for line in line_outputs.extent)
+        with open(active_gmt_out_file_path, 'w') as active_gmt_file:
+            active_gmt_file.writelines(active_path_gmt_header(crs))
+            active_gmt_file.writelines(line_outputs.path for line_outputs in outputs)
+
+        # met.parquet can only be spliced when the last run wrote it for every line that has rows
+        tables = [line_outputs.table for line_outputs in outputs if line_outputs.met]
+        if not write_met_table(tables if all(table is not None for table in tables) else [],
+                               os.path.join(output_directory, 'interp', MET_TABLE_NAME)):
+            print("met.parquet not written, the interpretation shapefiles differ in their attributes", file=sys.stderr)
+
+        if not validate_file(active_gmt_out_file_path):
+            return
+
+        # Create the active path interp shapefile and geojson file for display on map.
+        line_numbers = [line_number for line_outputs in outputs for line_number in line_outputs.line_numbers]
+        geometry = np.concatenate([line_outputs.geometry for line_outputs in outputs])
+        active_path_interp_shp = write_active_path(line_numbers, geometry, output_directory, crs, flatgeobuf)
+        if incremental:
+            save_manifest(manifest_path, {"params": params,
+                                          "shapefiles": [[name, fingerprints[name], line_outputs.counts()]
+                                                         for name, line_outputs in zip(names, outputs)]})
+
+        # Create the folium map for the all_lines and update the map html file.
+        if build_map:
+            active_path_geojson_path = os.path.join(output_directory, 'interp', 'active_path.geojson')
+            web_map.main(output_directory, {"interp": write_previews(active_path_interp_shp, active_path_geojson_path)})
+
+
+def input_snapshot(input_directory):
+    """
+    Returns the size and mtime of the input files interpretation reads, keyed by file name.
+    """
+    with os.scandir(input_directory) as entries:
+        return {entry.name: (entry.stat().st_size, entry.stat().st_mtime_ns) for entry in entries
+                if entry.is_file() and any(fnmatch.fnmatch(entry.name, pattern) for pattern in WATCHED_PATTERNS)}
+
+
+def watch(input_directory, output_directory, poll_interval=POLL_INTERVAL, debounce=DEBOUNCE, **options):
+    """
+    Runs an incremental interpretation, then polls the input directory every poll_interval seconds
+    and runs it again once the inputs changed and have not changed for debounce seconds, so a burst
+    of saves leads to one run. The other options are passed on to main(). Stops on Ctrl+C.
+    """
+    options["incremental"] = True
+
+    def run():
+        try:
+            main(input_directory, output_directory, **options)
+        except (Exception, SystemExit) as e:
+            # a shapefile caught half saved fails to read, the next save triggers another run
+            print(f"Error during interpretation, waiting for the next change: {e!r}", file=sys.stderr)
+
+    # taken before the first run, so saves made while it runs trigger the next one
+    snapshot = input_snapshot(input_directory)
+    run()
+    changed_at = None
+    print(f"Watching {input_directory} for changes, press Ctrl+C to stop", file=sys.stderr)
+    try:
+        while True:
+            time.sleep(poll_interval)
+            current = input_snapshot(input_directory)
+            if current != snapshot:
+                snapshot = current
+                changed_at = time.monotonic()
+            elif changed_at is not None and time.monotonic() - changed_at >= debounce:
+                changed_at = None
+                run()
+    except KeyboardInterrupt:
+        print("Stopped watching", file=sys.stderr)
 
 
 if __name__ == "__main__":
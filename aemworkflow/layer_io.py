@@ -0,0 +1,24 @@
+"""
+Bulk reading and writing of the vector layers the workflow stages produce.
+
+The layers go through pyogrio's Arrow path, which hands GDAL whole columns instead of one feature
+at a time. GDAL builds older than 3.8 can not write from Arrow, so they fall back to the default
+per feature path; the files written are the same either way.
+"""
+import geopandas
+import pyogrio
+
+# pyogrio (0.10 as pinned, through 0.13) writes from Arrow only with GDAL >= 3.8, reads need 3.6
+USE_ARROW = pyogrio.__gdal_version__ >= (3, 8, 0)
+
+
+def read_layer(path) -> geopandas.GeoDataFrame:
+    return geopandas.read_file(path, engine="pyogrio", use_arrow=USE_ARROW)
+
+
+def write_layer(gdf: geopandas.GeoDataFrame, path, driver=None, **layer_options) -> None:
+    """
+    Writes a GeoDataFrame in one bulk write. The driver is guessed from the file extension when
+    not given, the layer creation options are passed on to GDAL.
+    """
+    gdf.to_file(path, driver=driver, engine="pyogrio", use_arrow=USE_ARROW, **layer_options)
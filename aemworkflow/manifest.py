@@ -0,0 +1,64 @@
+"""
+Run manifests that let a workflow stage skip the inputs it has already processed.
+
+A manifest is a small JSON file in the output directory holding the content hashes of the inputs
+and the parameters of the last run. A stage compares them with the current inputs and only
+rebuilds the outputs whose inputs changed.
+"""
+import hashlib
+import json
+import os
+from pathlib import Path
+
+from loguru import logger
+
+MANIFEST_VERSION = 1
+
+
+def file_digest(file_path) -> str:
+    """
+    Returns the SHA-256 hex digest of a file's content.
+    """
+    with open(file_path, "rb") as file:
+        return hashlib.file_digest(file, "sha256").hexdigest()
+
+
+def load_manifest(manifest_path, logger_session=logger) -> dict:
+    """
+    Returns the manifest stored at manifest_path, or an empty dict when there is none or it can not
+    be used, in which case the stage rebuilds everything.
+    """
+    try:
+        with open(manifest_path) as manifest_file:
+            manifest = json.load(manifest_file)
+    except FileNotFoundError:
+        return {}
+    except (OSError, ValueError) as e:
+        logger_session.warning(f"Ignoring unreadable manifest {manifest_path}: {e}")
+        return {}
+    if not isinstance(manifest, dict) or manifest.get("version") != MANIFEST_VERSION:
+        return {}
+    return manifest
+
+
+def load_run_manifest(manifest_path, params: dict, incremental: bool, logger_session=logger) -> dict:
+    """
+    Returns the manifest of the last run of a stage for an --incremental run, or an empty dict when
+    any parameter changed since then. Without incremental the manifest is removed instead, the
+    inputs are not hashed then and a manifest of an earlier run would go stale.
+    """
+    if not incremental:
+        Path(manifest_path).unlink(missing_ok=True)
+        return {}
+    previous = load_manifest(manifest_path, logger_session)
+    return previous if previous.get("params") == params else {}
+
+
+def save_manifest(manifest_path, manifest: dict) -> None:
+    """
+    Writes the manifest atomically, so an interrupted run never leaves a half written file behind.
+    """
+    tmp_path = f"{manifest_path}.{os.getpid()}.tmp"
+    with open(tmp_path, "w") as manifest_file:
+        json.dump({**manifest, "version": MANIFEST_VERSION}, manifest_file, indent=1)
+    os.replace(tmp_path, manifest_path)
@@ -0,0 +1,157 @@
+"""
+Shared reader for the *.path.txt flight path files.
+
+A path file holds nine whitespace separated columns per fiducial:
+line number, fiducial, pixel x, pixel y, easting, northing, two unused columns and ground level.
+The file is memory mapped and parsed in chunks of whole lines into typed NumPy arrays, so the
+text of a long line is never held in memory at once. interpolate_fiducials() places positions given
+as fractional fiducials along the path, all of a flight line's at once.
+"""
+import mmap
+import os
+from typing import Dict, Iterator, Sequence, Tuple
+
+import numpy as np
+import pandas as pd
+
+PATH_COLUMNS = ("nm", "fid", "pix_x", "pix_y", "coordx", "coordy", "col7", "col8", "gl")
+INTEGER_COLUMNS = ("nm", "fid")
+CHUNK_BYTES = 1 << 22
+
+
+def _parse_chunk(block: bytes, columns: Sequence[str], path_file_path) -> Dict[str, np.ndarray]:
+    tokens = block.split()
+    if len(tokens) % len(PATH_COLUMNS):
+        raise ValueError(f"{path_file_path}: expected {len(PATH_COLUMNS)} columns on every line")
+    table = np.array(tokens).reshape(-1, len(PATH_COLUMNS))
+    chunk = {}
+    for column in columns:
+        values = table[:, PATH_COLUMNS.index(column)].astype(np.float64)
+        chunk[column] = values.astype(np.int64) if column in INTEGER_COLUMNS else values
+    return chunk
+
+
+def _iter_blocks(path_file_path, chunk_bytes: int = CHUNK_BYTES) -> Iterator[bytes]:
+    with open(path_file_path, "rb") as path_file:
+        size = os.fstat(path_file.fileno()).st_size
+        if size == 0:
+            return
+        with mmap.mmap(path_file.fileno(), 0, access=mmap.ACCESS_READ) as text:
+            start = 0
+            while start < size:
+                end = min(start + chunk_bytes, size)
+                if end < size:
+                    # cut after the last complete line, or after the first one when it is longer
+                    newline = text.rfind(b"\n", start, end)
+                    if newline < 0:
+                        newline = text.find(b"\n", end)
+                    end = size if newline < 0 else newline + 1
+                yield text[start:end]
+                start = end
+
+
+def iter_path_chunks(path_file_path, columns: Sequence[str] = PATH_COLUMNS,
+                     chunk_bytes: int = CHUNK_BYTES) -> Iterator[Dict[str, np.ndarray]]:
+    """
+    Yields the requested columns of a path file as dicts of NumPy arrays, one dict per chunk of
+    about chunk_bytes of text. nm and fid are int64, the other columns float64.
+    """
+    for block in _iter_blocks(path_file_path, chunk_bytes):
+        yield _parse_chunk(block, columns, path_file_path)
+
+
+def iter_path_tokens(path_file_path,
+                     chunk_bytes: int = CHUNK_BYTES) -> Iterator[Tuple[np.ndarray, np.ndarray, np.ndarray]]:
+    """
+    Yields the text of a path file in chunks of whole lines as (bytes, starts, ends), the uint8
+    array of the chunk and the offsets of the first and past the last byte of every token in it,
+    one row per line. Writers that copy the values verbatim gather them from the bytes without
+    making a Python object per token. The number of columns is taken from the first line, so the
+    files only need the columns up to the last one a writer uses.
+    """
+    width = None
+    for block in _iter_blocks(path_file_path, chunk_bytes):
+        data = np.frombuffer(block, dtype=np.uint8)
+        # not one of the bytes bytes.split() splits on, " " and "\t" to "\r"
+        token = np.zeros(len(data) + 2, dtype=np.int8)
+        token[1:-1] = (data != 32) & ((data < 9) | (data > 13))
+        # the token boundaries alternate, a start where a token byte follows whitespace and an end
+        # where whitespace follows a token byte, the chunk being padded with whitespace
+        boundaries = np.flatnonzero(np.diff(token))
+        starts, ends = boundaries[0::2], boundaries[1::2]
+        if width is None:
+            first_line = block.find(b"\n")
+            width = int(np.count_nonzero(starts < first_line)) if first_line >= 0 else len(starts)
+            width = width or len(PATH_COLUMNS)
+        if len(starts) % width:
+            raise ValueError(f"{path_file_path}: expected {width} columns on every line")
+        yield data, starts.reshape(-1, width), ends.reshape(-1, width)
+
+
+def token_text(data: np.ndarray, starts: np.ndarray, ends: np.ndarray) -> np.ndarray:
+    """
+    Returns the tokens of a chunk from iter_path_tokens() between starts and ends as a fixed width
+    bytes array, which NumPy parses into numbers with one astype().
+    """
+    if not len(starts):
+        return np.empty(0, dtype="S1")
+    length = ends - starts
+    columns = np.arange(max(int(length.max()), 1))
+    padded = np.concatenate([data, np.zeros(len(columns), dtype=np.uint8)])
+    text = padded[starts[:, None] + columns] * (columns < length[:, None])
+    return text.view(f"S{len(columns)}").ravel()
+
+
+def read_path_columns(path_file_path, columns: Sequence[str] = PATH_COLUMNS,
+                      chunk_bytes: int = CHUNK_BYTES) -> Dict[str, np.ndarray]:
+    """
+    Returns the requested columns of a whole path file as a dict of NumPy arrays.
+    """
+    chunks = list(iter_path_chunks(path_file_path, columns, chunk_bytes))
+    return {column: np.concatenate([chunk[column] for chunk in chunks]) if chunks
+            else np.empty(0, dtype=np.int64 if column in INTEGER_COLUMNS else np.float64)
+            for column in columns}
+
+
+def read_path_file(path_file_path, columns: Sequence[str] = PATH_COLUMNS,
+                   chunk_bytes: int = CHUNK_BYTES) -> pd.DataFrame:
+    """
+    Returns the requested columns of a path file as a DataFrame, the table the conversion
+    functions used to get from pd.read_csv.
+    """
+    return pd.DataFrame(read_path_columns(path_file_path, columns, chunk_bytes), columns=list(columns))
+
+
+def interpolate_fiducials(fiducials, frst, last, tdf: pd.DataFrame) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """
+    Returns the x, y and ground level arrays at positions along a path, given as fractional
+    fiducials minus 1 like the first column of the *_interp.gmt vertices. frst and last are the
+    first and last fiducial of the path file table tdf, minus 1.
+
+    Positions from frst up to last are interpolated linearly between the two fiducials around
+    them, found with a binary search. Positions whose integer part is at most frst are extrapolated
+    from the first two fiducials, positions from last on from the last two, with the arithmetic of
+    the per vertex interpol() functions so the values are the same to the last bit.
+    """
+    fiducials = np.asarray(fiducials, dtype=np.float64)
+    if not len(fiducials):
+        return tuple(np.empty(0) for _ in range(3))
+    cdp = tdf["fid"].to_numpy() - 1
+    values = np.column_stack([tdf["coordx"].to_numpy(np.float64), tdf["coordy"].to_numpy(np.float64),
+                              tdf["gl"].to_numpy(np.float64)])
+
+    inside = (frst <= fiducials) & (fiducials < last)
+    left = ~inside & (np.trunc(fiducials) <= frst)
+    right = ~inside & ~left & (fiducials >= last)
+    segment = np.searchsorted(cdp, fiducials, side="right") - 1
+    if np.any(inside & ((segment < 0) | (segment >= len(cdp) - 1))) or not np.all(inside | left | right):
+        raise ValueError(f"Fiducials outside of the path between {frst} and {last}")
+
+    first = np.where(inside, segment, np.where(right, len(cdp) - 2, 0))
+    start, end = values[first], values[first + 1]
+    length = cdp[first + 1] - cdp[first]
+    # the right extrapolation continues the last segment from its end
+    ratio = (fiducials - np.where(right, cdp[-1], cdp[first])) / length
+    origin = np.where(right[:, None], end, start)
+    result = origin + (end - start) * ratio[:, None]
+    return result[:, 0], result[:, 1], result[:, 2]
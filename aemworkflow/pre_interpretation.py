@@ -1,29 +1,38 @@
 import decimal
-import glob
+import math
 import os
+import struct
 import sys
 import warnings
+from concurrent.futures import ProcessPoolExecutor
+from fractions import Fraction
 from pathlib import Path
 
-import folium
 import geopandas
-from osgeo import osr
-
-from aemworkflow.utilities import get_ogr_path, run_command, validate_file
+import numpy as np
+import pandas as pd
+import shapely
+from osgeo import ogr
+
+from aemworkflow import web_map
+from aemworkflow.catalogue import InputCatalogue
+from aemworkflow.crs_registry import gmt_headers, reproject
+from aemworkflow.layer_io import read_layer, write_layer
+from aemworkflow.manifest import file_digest, load_run_manifest, save_manifest
+from aemworkflow.path_files import read_path_columns
+from aemworkflow.utilities import validate_file
+from aemworkflow.web_preview import write_flatgeobuf, write_previews
 
 decimal.getcontext().rounding = decimal.ROUND_HALF_UP
 
+MANIFEST_NAME = 'pre_interpretation.manifest.json'
+
 
 def all_lines(path_file_path, output_file_path, crs, gis, mode):
     try:
-        proj = osr.SpatialReference()
-        proj.ImportFromEPSG(int(crs))
-        result_wkt = proj.ExportToWkt()
-        result_wkt = result_wkt.replace('"', '\\"')
-        result_proj = proj.ExportToProj4()
-        # print(f'epsg resutl is: {result_wkt}')
-        # print(f'proj string is: {result_proj}')
-        del proj
+        headers = gmt_headers(crs)
+        result_wkt = headers["Jw"]
+        result_proj = headers["Jp"]
 
         with open(output_file_path, mode) as out_file:
             if mode == 'w':
@@ -49,31 +58,139 @@ def all_lines(path_file_path, output_file_path, crs, gis, mode):
         sys.exit(1)
 
 
-def print_boxes(pl, pt, pr, pb, out_file, xpo, ypo):
-    try:
-        out_file.write(">\n")
-        out_file.write("# @Dextent\n")
-        out_file.write(f"{pl - xpo} {pt + ypo}\n")
-        out_file.write(f"{pr - xpo} {pt + ypo}\n")
-        out_file.write(f"{pr - xpo} {pb + ypo}\n")
-        out_file.write(f"{pl - xpo} {pb + ypo}\n")
-        out_file.write(f"{pl - xpo} {pt + ypo}\n")
+def all_lines_frame(line_numbers, geometry, crs) -> geopandas.GeoDataFrame:
+    """
+    Returns the all_lines attribute table for one LineString per flight line. Only linenum is
+    populated, the other columns match the all_lines.gmt header.
+    """
+    missing = [None] * len(line_numbers)
+    return geopandas.GeoDataFrame({
+        "linenum": pd.array(line_numbers, dtype="Int64"),
+        "flightnum": pd.array(missing, dtype="Int64"),
+        "date": pd.array(missing, dtype="Int64"),
+        "Survey": pd.array(missing, dtype="string"),
+        "Company": pd.array(missing, dtype="string"),
+        "Status": pd.array(missing, dtype="string"),
+    }, geometry=geometry, crs=crs)
+
+
+def read_line_paths(path_files_list):
+    """
+    Reads the line number and the coordinate columns of each path file. Returns the names of the
+    path files read, their line numbers and an array with one LineString per path file. A path file
+    with fewer than two fiducials makes no LineString and is left out.
+    """
+    names = []
+    line_numbers = []
+    coordinates = []
+    for path_file_path in path_files_list:
+        columns = read_path_columns(path_file_path, ("nm", "coordx", "coordy"))
+        if len(columns["nm"]) < 2:
+            print(f"Skipping single point path file {path_file_path}", file=sys.stderr)
+            continue
+        names.append(os.path.basename(path_file_path))
+        line_numbers.append(int(columns["nm"][0]))
+        coordinates.append(np.column_stack([columns["coordx"], columns["coordy"]]))
+
+    if not coordinates:
+        return names, line_numbers, np.empty(0, dtype=object)
+    counts = [len(coords) for coords in coordinates]
+    geometry = shapely.linestrings(np.concatenate(coordinates), indices=np.repeat(np.arange(len(counts)), counts))
+    return names, line_numbers, geometry
+
+
+def build_all_lines(path_files_list, shp_output_file_path, geojson_output_file_path, crs):
+    """
+    Builds one LineString per flight line from the coordinate columns of the path files and writes
+    the all_lines shapefile and its EPSG:4326 GeoJSON copy in one write each. Returns the EPSG:4326
+    GeoDataFrame for the map and the names of the path files of its rows.
+    """
+    names, line_numbers, geometry = read_line_paths(path_files_list)
+    all_lines_shp = all_lines_frame(line_numbers, geometry, f"EPSG:{crs}")
+
+    write_layer(all_lines_shp, shp_output_file_path)
+    all_lines_shp = all_lines_shp.set_geometry(reproject(geometry, crs), crs="EPSG:4326")
+    write_layer(all_lines_shp, geojson_output_file_path, driver='GeoJSON')
+    return all_lines_shp, names
+
+
+def patch_all_lines(path_files_list, previous_rows, changed, shp_output_file_path, geojson_output_file_path, crs):
+    """
+    Updates the all_lines shapefile and GeoJSON written by an earlier run. previous_rows names the
+    path file of each existing row, in row order. Only the path files named in changed, or not in
+    previous_rows, are read and reprojected, the other rows are copied from the existing layers.
+    Returns the EPSG:4326 GeoDataFrame for the map and the names of the path files of its rows.
+    """
+    existing = read_layer(shp_output_file_path)
+    existing_4326 = read_layer(geojson_output_file_path)
+    if not len(existing) == len(existing_4326) == len(previous_rows):
+        return build_all_lines(path_files_list, shp_output_file_path, geojson_output_file_path, crs)
+
+    names = [os.path.basename(path_file_path) for path_file_path in path_files_list]
+    rebuilt = [path_file_path for path_file_path, name in zip(path_files_list, names)
+               if name in changed or name not in previous_rows]
+    fresh_names, fresh_line_numbers, fresh_geometry = read_line_paths(rebuilt)
+    fresh_geometry_4326 = reproject(fresh_geometry, crs)
+    fresh_rows = {name: i for i, name in enumerate(fresh_names)}
+    existing_rows = {name: i for i, name in enumerate(previous_rows)}
+    rebuilt_names = {os.path.basename(path_file_path) for path_file_path in rebuilt}
+
+    rows = []
+    line_numbers = []
+    geometry = []
+    geometry_4326 = []
+    for name in names:
+        if name in fresh_rows:
+            i = fresh_rows[name]
+            line_numbers.append(fresh_line_numbers[i])
+            geometry.append(fresh_geometry[i])
+            geometry_4326.append(fresh_geometry_4326[i])
+        elif name not in rebuilt_names:
+            i = existing_rows[name]
+            line_numbers.append(int(existing["linenum"].iloc[i]))
+            geometry.append(existing.geometry.iloc[i])
+            geometry_4326.append(existing_4326.geometry.iloc[i])
+        else:
+            # read again, but left out for its single fiducial
+            continue
+        rows.append(name)
+
+    write_layer(all_lines_frame(line_numbers, geometry, f"EPSG:{crs}"), shp_output_file_path)
+    all_lines_shp = all_lines_frame(line_numbers, geometry_4326, "EPSG:4326")
+    write_layer(all_lines_shp, geojson_output_file_path, driver='GeoJSON')
+    return all_lines_shp, rows
+
+
+def box_outlines(pl, pt, pr, pb, xpo, ypo):
+    """
+    Returns the extent, upper_left and lower_right marker rings of a box as (name, vertices) pairs.
+    """
+    return [
+        ("extent", [(pl - xpo, pt + ypo),
+                    (pr - xpo, pt + ypo),
+                    (pr - xpo, pb + ypo),
+                    (pl - xpo, pb + ypo),
+                    (pl - xpo, pt + ypo)]),
+        ("upper_left", [(pl - xpo, pt + ypo),
+                        (pl + 1 - xpo, pt + ypo),
+                        (pl + 1 - xpo, pt - 1 + ypo),
+                        (pl - xpo, pt - 1 + ypo),
+                        (pl - xpo, pt + ypo)]),
+        ("lower_right", [(pr - xpo, pb + ypo),
+                         (pr - 1 - xpo, pb + ypo),
+                         (pr - 1 - xpo, pb + 1 + ypo),
+                         (pr - xpo, pb + 1 + ypo),
+                         (pr - xpo, pb + ypo)]),
+    ]
 
-        out_file.write(">\n")
-        out_file.write("# @Dupper_left\n")
-        out_file.write(f"{pl - xpo} {pt + ypo}\n")
-        out_file.write(f"{pl + 1 - xpo} {pt + ypo}\n")
-        out_file.write(f"{pl + 1 - xpo} {pt - 1 + ypo}\n")
-        out_file.write(f"{pl - xpo} {pt - 1 + ypo}\n")
-        out_file.write(f"{pl - xpo} {pt + ypo}\n")
 
-        out_file.write(">\n")
-        out_file.write("# @Dlower_right\n")
-        out_file.write(f"{pr - xpo} {pb + ypo}\n")
-        out_file.write(f"{pr - 1 - xpo} {pb + ypo}\n")
-        out_file.write(f"{pr - 1 - xpo} {pb + 1 + ypo}\n")
-        out_file.write(f"{pr - xpo} {pb + 1 + ypo}\n")
-        out_file.write(f"{pr - xpo} {pb + ypo}\n")
+def print_boxes(pl, pt, pr, pb, out_file, xpo, ypo):
+    try:
+        for name, vertices in box_outlines(pl, pt, pr, pb, xpo, ypo):
+            out_file.write(">\n")
+            out_file.write(f"# @D{name}\n")
+            for x, y in vertices:
+                out_file.write(f"{x} {y}\n")
 
         out_file.write(">\n")
         out_file.write("# @Dground_level\n")
@@ -82,13 +199,212 @@ def print_boxes(pl, pt, pr, pb, out_file, xpo, ypo):
         sys.exit(1)
 
 
-def box_elevation(extent_file_path, path_file_path, output_file_path, depth_lines, line_increments, xpo, ypo):
+def round_half_up(values, places=4, from_repr=False):
+    """
+    Rounds an array of floats to the given number of decimal places with the same result as
+    round(decimal.Decimal(value), places) under ROUND_HALF_UP. The result is returned as signed
+    counts of 10**-places so it can be formatted without further float error. With from_repr the
+    decimal value is taken from str(value), matching decimal.Decimal(str(value)).
+    """
+    values = np.asarray(values, dtype=float)
+    scaled = values * 10 ** places
+    magnitude = np.abs(scaled)
+    units = np.copysign(np.floor(magnitude + 0.5), scaled)
+
+    # The scaled float can land either side of a .5 boundary, settle those few values with Decimal.
+    near_tie = np.abs(magnitude - np.floor(magnitude) - 0.5) <= 16 * np.spacing(magnitude)
+    quantum = decimal.Decimal(1).scaleb(-places)
+    for i in np.flatnonzero(near_tie):
+        value = float(values.flat[i])
+        exact = decimal.Decimal(repr(value)) if from_repr else decimal.Decimal(value)
+        units.flat[i] = float(exact.quantize(quantum, rounding=decimal.ROUND_HALF_UP).scaleb(places))
+    return units
+
+
+def add_half_up(units, offset, places=4):
+    """
+    Adds a float offset to counts of 10**-places and rounds the sum back to whole counts, as
+    round(decimal.Decimal(...) + decimal.Decimal(offset), places) does under ROUND_HALF_UP.
+    """
+    if offset == 0:
+        return units + offset
+
+    scaled = Fraction(offset) * 10 ** places
+    whole = math.floor(scaled)
+    remainder = scaled - whole
+    if remainder == 0:
+        return units + whole
+    if remainder == Fraction(1, 2):
+        # a tie on every value, which rounds away from zero
+        return np.where(units + whole + 0.5 > 0, units + whole + 1, units + whole)
+    return units + math.floor(scaled + Fraction(1, 2))
+
+
+def format_normalized(units, places=4):
+    """
+    Formats counts of 10**-places the way str(decimal.Decimal(...).normalize()) prints the value.
+    """
+    text = np.char.mod(f"%.{places}f", units / 10 ** places)
+    text = np.char.rstrip(np.char.rstrip(text, "0"), ".").astype(object)
+
+    # normalize() moves the trailing zeros of whole numbers into an exponent, e.g. 1E+2
+    whole = units / 10 ** places
+    exponent = (units % 10 ** places == 0) & (whole % 10 == 0) & (units != 0)
+    for i in np.flatnonzero(exponent):
+        text[i] = str(decimal.Decimal(int(whole[i])).normalize())
+    return text
+
+
+def write_profile(out_file, index, units):
+    """
+    Writes one ghost profile as a single block of "index value" lines.
+    """
+    if index.size == 0:
+        return
+    lines = index.astype(str).astype(object) + " " + format_normalized(units)
+    out_file.write("\n".join(lines) + "\n")
+
+
+def ghost_lines_decimal(out_file, path_file_path, y_of, y_fact, lines, depth, ypo):
+    last = None
+    yy = []
+    depth_line_increments = depth
+
+    with open(path_file_path) as path_file:
+        for line in path_file:
+            path_fields = line.strip().split()
+
+            if len(path_fields) > 0:
+                ppt = int(path_fields[1])
+                py = (y_of - float(path_fields[8])) / y_fact
+                out_file.write(f"{int(path_fields[1]) - 1} "
+                               f"{round(decimal.Decimal((-py + ypo) - (2 / y_fact)), 4).normalize()}\n")
+                yy.insert(ppt - 1, py * -1)
+                last = ppt
+
+    for j in range(1, lines + 1):
+        out_file.write(">\n")
+        out_file.write(f"# @D{depth}\n")
+
+        for i in range(0, last):
+            # ly=(yy[i]-(ddd/y_fact))
+            # print i-1" "ly+ypo
+
+            ly = round(decimal.Decimal(str(yy[i] - (depth / y_fact) - (2 / y_fact))), 4).normalize()
+            out_file.write(f'{i} {round(ly + decimal.Decimal(ypo), 4).normalize()}\n')
+
+        depth += depth_line_increments
+
+
+def ghost_profiles(path_file_path, y_of, y_fact, lines, depth, ypo):
+    """
+    Computes the ground level and all depth ghost lines of a path file in one pass. Returns
+    (name, index, units) triples, the values being counts of 10**-4 rounded exactly as the
+    Decimal version of box_elevation() rounds them.
+    """
+    columns = read_path_columns(path_file_path, ("fid", "gl"))
+    fid = columns["fid"]
+    py = (y_of - columns["gl"]) / y_fact
+    profiles = [("ground_level", fid - 1, round_half_up((-py + ypo) - (2 / y_fact)))]
+
+    order = np.arange(fid.size)
+    if not np.array_equal(fid, order + 1):
+        # keep the list.insert() placement of the Decimal version for gapped or unsorted fids
+        slots = []
+        for k, ppt in enumerate(fid.tolist()):
+            slots.insert(ppt - 1, k)
+        order = np.asarray(slots, dtype=np.int64)
+    last = int(fid[-1])
+    if last > order.size:
+        raise IndexError("list index out of range")
+    yy = (py * -1)[order[:max(last, 0)]]
+
+    depths = depth * np.arange(1, lines + 1)
+    ly = round_half_up(yy - (depths[:, None] / y_fact) - (2 / y_fact), from_repr=True)
+    index = np.arange(yy.size)
+    for layer_depth, units in zip(depths.tolist(), add_half_up(ly, ypo)):
+        profiles.append((str(layer_depth), index, units))
+    return profiles
+
+
+def ghost_lines_numpy(out_file, path_file_path, y_of, y_fact, lines, depth, ypo):
+    """
+    Array equivalent of ghost_lines_decimal(), each profile is written as one block and the
+    output is byte for byte the same as the Decimal version.
+    """
+    for name, index, units in ghost_profiles(path_file_path, y_of, y_fact, lines, depth, ypo):
+        if name != "ground_level":
+            out_file.write(">\n")
+            out_file.write(f"# @D{name}\n")
+        write_profile(out_file, index, units)
+
+
+def linestring_wkb(x, y):
+    """
+    Packs a 2D LINESTRING as little endian WKB straight from coordinate arrays.
+    """
+    vertices = np.column_stack([x, y]).astype("<f8")
+    return struct.pack("<BII", 1, ogr.wkbLineString, len(vertices)) + vertices.tobytes()
+
+
+def write_line_shapefile(shp_output_file_path, features):
+    """
+    Writes (name, x, y) line features to an ESRI Shapefile with a single linename field,
+    the same layout ogr2ogr produces from a .box.gmt file.
+    """
+    driver = ogr.GetDriverByName("ESRI Shapefile")
+    if os.path.exists(shp_output_file_path):
+        driver.DeleteDataSource(shp_output_file_path)
+    data_source = driver.CreateDataSource(shp_output_file_path)
+    if data_source is None:
+        raise OSError(f"Could not create {shp_output_file_path}")
+
+    layer = data_source.CreateLayer(Path(shp_output_file_path).stem, geom_type=ogr.wkbLineString)
+    layer.CreateField(ogr.FieldDefn("linename", ogr.OFTString))
+    layer_defn = layer.GetLayerDefn()
+
+    for name, x, y in features:
+        feature = ogr.Feature(layer_defn)
+        feature.SetField("linename", name)
+        feature.SetGeometry(ogr.CreateGeometryFromWkb(linestring_wkb(x, y)))
+        layer.CreateFeature(feature)
+    data_source = None
+
+
+def box_elevation_shp(extent_file_path, path_file_path, shp_output_file_path, depth_lines, line_increments,
+                      xpo, ypo):
+    """
+    Builds the box, corner markers, ground level and depth ghost lines in memory and writes
+    them directly to a .box.shp, without the .box.gmt and ogr2ogr round trip.
+    """
     try:
-        last = None
-        yy = []
+        features = []
+        with open(extent_file_path) as file:
+            for line in file:
+                fields = line.strip().split()
+                if len(fields) > 0:
+                    pt, pl, pr, pb, nr2, dt, nr3, db = map(float, fields[1:])
+                    y_of = dt
+                    y_fact = (db - dt) / (pb - pt)
+                    for name, vertices in box_outlines(pl, pt, pr, pb, xpo, ypo):
+                        x, y = zip(*vertices)
+                        features.append((name, x, y))
+
+        for name, index, units in ghost_profiles(path_file_path, y_of, y_fact, int(depth_lines),
+                                                 int(line_increments), ypo):
+            features.append((name, index, units / 10 ** 4))
+
+        write_line_shapefile(shp_output_file_path, features)
+    except Exception as e:
+        print(f"Error writing box shapefile: {e}", file=sys.stderr)
+        sys.exit(1)
+
 
+def box_elevation(extent_file_path, path_file_path, output_file_path, depth_lines, line_increments, xpo, ypo,
+                  engine="numpy"):
+    try:
         lines = int(depth_lines)
-        depth = depth_line_increments = int(line_increments)  # Set initial value for depth
+        depth = int(line_increments)  # Set initial value for depth
 
         # This function will be modified to do the following:
         # - Look for all path and extent files in folder
@@ -115,110 +431,152 @@ def box_elevation(extent_file_path, path_file_path, output_file_path, depth_line
 
                         print_boxes(pl, pt, pr, pb, out_file, xpo, ypo)
 
-            with open(path_file_path) as path_file:
-                for line in path_file:
-                    path_fields = line.strip().split()
+            if engine == "decimal":
+                ghost_lines_decimal(out_file, path_file_path, y_of, y_fact, lines, depth, ypo)
+            else:
+                ghost_lines_numpy(out_file, path_file_path, y_of, y_fact, lines, depth, ypo)
+    except Exception as e:
+        print(f"Error processing box elevation: {e}", file=sys.stderr)
+        sys.exit(1)
 
-                    if len(path_fields) > 0:
-                        ppt = int(path_fields[1])
-                        py = (y_of - float(path_fields[8])) / y_fact
-                        out_file.write(f"{int(path_fields[1]) - 1} "
-                                       f"{round(decimal.Decimal((-py + ypo) - (2 / y_fact)), 4).normalize()}\n")
-                        yy.insert(ppt - 1, py * -1)
-                        last = ppt
 
-            for j in range(1, lines + 1):
-                out_file.write(">\n")
-                out_file.write(f"# @D{depth}\n")
+def build_line_box(path_file_path, extent_file_path, output_directory, lines, lines_increment, xpo, ypo,
+                   emit_gmt=False):
+    """
+    Builds the .box.shp ghost profiles for one flight line, and the .box.gmt text when emit_gmt is set.
+    Returns False when the GMT file was requested but not produced.
+    """
+    file_path = os.path.basename(path_file_path)
+    flight_path_number = file_path.split('.')[0]
+    gmt_ouput_file_path = os.path.join(output_directory, 'box', f'{flight_path_number}.box.gmt')
+    shp_output_file_path = os.path.join(output_directory, 'box', f'{flight_path_number}.box.shp')
 
-                for i in range(0, last):
-                    # ly=(yy[i]-(ddd/y_fact))
-                    # print i-1" "ly+ypo
+    if emit_gmt:
+        box_elevation(extent_file_path, path_file_path, gmt_ouput_file_path, lines, lines_increment, xpo, ypo)
+        if not validate_file(gmt_ouput_file_path):
+            return False
 
-                    ly = round(decimal.Decimal(str(yy[i] - (depth / y_fact) - (2 / y_fact))), 4).normalize()
-                    out_file.write(f'{i} {round(ly + decimal.Decimal(ypo), 4).normalize()}\n')
+    box_elevation_shp(extent_file_path, path_file_path, shp_output_file_path, lines, lines_increment, xpo, ypo)
+    return True
 
-                depth += depth_line_increments
-    except Exception as e:
-        print(f"Error processing box elevation: {e}", file=sys.stderr)
-        sys.exit(1)
 
+def line_box_built(build, path_file_path) -> bool:
+    """
+    Returns whether build(), running build_line_box() for a path file, built its box profile. A
+    failure is reported on stderr instead of stopping the other lines.
+    """
+    try:
+        if build():
+            return True
+        print(f"Error: box profile not created for {path_file_path}", file=sys.stderr)
+    except (Exception, SystemExit) as e:
+        print(f"Error processing line {path_file_path}: {e!r}", file=sys.stderr)
+    return False
 
-def main(input_directory, output_directory, crs="28349", gis="esri_arcmap_0.5", lines=10, lines_increment=30):
+
+def box_outputs_exist(path_file_name, output_directory, emit_gmt=False):
+    flight_path_number = path_file_name.split('.')[0]
+    suffixes = ['shp', 'gmt'] if emit_gmt else ['shp']
+    return all(os.path.isfile(os.path.join(output_directory, 'box', f'{flight_path_number}.box.{suffix}'))
+               for suffix in suffixes)
+
+
+def main(input_directory, output_directory, crs="28349", gis="esri_arcmap_0.5", lines=10, lines_increment=30,
+         jobs=1, emit_gmt=False, flatgeobuf=False, incremental=False, build_map=True):
     with warnings.catch_warnings():
         warnings.simplefilter("ignore")
 
         print("create AEM interp box and ground level ghost profiles", file=sys.stderr)
         print("layer interval", lines_increment, file=sys.stderr)
         print("layer count", lines, file=sys.stderr)
-        extent_files_list = sorted(glob.glob(os.path.join(input_directory, '*.extent.txt')))
-        path_files_list = sorted(glob.glob(os.path.join(input_directory, '*.path.txt')))
+        catalogue = InputCatalogue(input_directory, recursive=False)
+        extent_files_list = [str(entry.path) for entry in catalogue.glob('*.extent.txt')]
+        path_files_list = [str(entry.path) for entry in catalogue.glob('*.path.txt')]
         all_lines_shp_output_path = os.path.join(output_directory, 'all_lines', 'all_lines.shp')
+        all_lines_geojson_output_path = os.path.join(output_directory, 'all_lines', 'all_lines.geojson')
 
-        Path(os.path.join(output_directory, 'all_lines')).mkdir(exist_ok=True)
+        # the manifest of the last run, dropped when any parameter changed since then
+        manifest_path = os.path.join(output_directory, MANIFEST_NAME)
+        params = {"crs": str(crs), "gis": gis, "lines": int(lines), "lines_increment": int(lines_increment)}
+        previous = load_run_manifest(manifest_path, params, incremental)
+        manifest = {"params": params, "boxes": {}, "all_lines": []}
+        path_digests = {os.path.basename(path_file_path): file_digest(path_file_path)
+                        for path_file_path in path_files_list} if incremental else {}
 
-        mode = 'w'
-        for path_file_path in path_files_list:
-            all_lines_gmt_output_file_path = os.path.join(output_directory, 'all_lines', 'all_lines.gmt')
-            all_lines(path_file_path, all_lines_gmt_output_file_path, crs, gis, mode)
-            mode = 'a'
+        Path(os.path.join(output_directory, 'all_lines')).mkdir(exist_ok=True)
 
-        # After the loop, process the all_lines_gmt_output_file_path
-        ogr2ogr_all_lines_log = os.path.join(output_directory, 'all_lines', 'gdal_all_lines.log')
+        if emit_gmt:
+            mode = 'w'
+            for path_file_path in path_files_list:
+                all_lines_gmt_output_file_path = os.path.join(output_directory, 'all_lines', 'all_lines.gmt')
+                all_lines(path_file_path, all_lines_gmt_output_file_path, crs, gis, mode)
+                mode = 'a'
 
         Path(fr'{output_directory}{os.sep}box').mkdir(exist_ok=True)
-        if len(extent_files_list) != len(path_files_list):
+        line_pairs, unmatched = catalogue.line_pairs()
+        if unmatched:
             print(f"Path and Extent numbers not matching up:{len(path_files_list)}:{len(extent_files_list)}")
+            for entry in unmatched:
+                print(f"Error: no matching path/extent file for {entry.path.name}", file=sys.stderr)
         else:
             print(f"Path and Extent numbers are matching up:{len(path_files_list)}:{len(extent_files_list)}")
-            ogr2ogr_gmt_log = os.path.join(output_directory, 'box', 'gdal_gmt.log')
-
-            for path_file_path, extent_file_path in zip(path_files_list, extent_files_list):
-                file_path = os.path.basename(path_file_path)
-                flight_path_number = file_path.split('.')[0]
-                gmt_ouput_file_path = os.path.join(output_directory, 'box', f'{flight_path_number}.box.gmt')
-
-                xpo = ypo = float(gis.split('_')[-1])
-                box_elevation(extent_file_path, path_file_path, gmt_ouput_file_path, lines, lines_increment, xpo, ypo)
-
-                shp_output_file_path = os.path.join(output_directory, 'box', f'{flight_path_number}.box.shp')
-                cmd = [get_ogr_path(),
-                       "-f",
-                       "ESRI Shapefile",
-                       shp_output_file_path,
-                       gmt_ouput_file_path,
-                       "--config",
-                       "CPL_LOG",
-                       ogr2ogr_gmt_log]
-                if not validate_file(gmt_ouput_file_path):
-                    return
-                run_command(cmd)
-
-        cmd = [
-            get_ogr_path(),
-            "-f", "ESRI Shapefile",
-            all_lines_shp_output_path,
-            all_lines_gmt_output_file_path,
-            "--config", "CPL_DEBUG", "ON",
-            "--config", "CPL_LOG", ogr2ogr_all_lines_log
-        ]
-        if not validate_file(all_lines_gmt_output_file_path):
+        if line_pairs:
+            xpo = ypo = float(gis.split('_')[-1])
+            line_files = []
+            for path_entry, extent_entry in line_pairs:
+                path_file_path, extent_file_path = str(path_entry.path), str(extent_entry.path)
+                name = path_entry.path.name
+                box = {"path": path_digests[name], "extent": file_digest(extent_file_path)} if incremental else None
+                unchanged = incremental and previous.get("boxes", {}).get(name) == box
+                if unchanged and box_outputs_exist(name, output_directory, emit_gmt):
+                    manifest["boxes"][name] = box
+                else:
+                    line_files.append((path_file_path, extent_file_path, box))
+            if incremental:
+                print(f"Box profiles to rebuild:{len(line_files)}:{len(path_files_list)}")
+
+            # a failed line is reported and left out of the manifest, the other lines carry on
+            if jobs <= 1:
+                for path_file_path, extent_file_path, box in line_files:
+                    if line_box_built(lambda: build_line_box(path_file_path, extent_file_path, output_directory,
+                                                             lines, lines_increment, xpo, ypo, emit_gmt),
+                                      path_file_path):
+                        manifest["boxes"][os.path.basename(path_file_path)] = box
+            else:
+                with ProcessPoolExecutor(max_workers=jobs) as executor:
+                    futures = [executor.submit(build_line_box, path_file_path, extent_file_path, output_directory,
+                                               lines, lines_increment, xpo, ypo, emit_gmt)
+                               for path_file_path, extent_file_path, _ in line_files]
+                    # report in input order so the log reads the same whichever worker finishes first
+                    for (path_file_path, _, box), future in zip(line_files, futures):
+                        if line_box_built(future.result, path_file_path):
+                            manifest["boxes"][os.path.basename(path_file_path)] = box
+
+        if not path_files_list:
             return
-        run_command(cmd)
 
-        # Create the all_lines geojson file for display on map.
-        all_lines_shp: geopandas.GeoDataFrame = geopandas.read_file(all_lines_shp_output_path)
-        print(all_lines_shp.crs)
-        all_lines_shp = all_lines_shp.to_crs(epsg=4326)
-        print(all_lines_shp.crs)
-        all_lines_shp.to_file(os.path.join(output_directory, 'all_lines', 'all_lines.geojson'), driver='GeoJSON')
+        # Create the all_lines shapefile and the geojson file for display on map, patching the layers
+        # of the last run when only some of the path files changed.
+        previous_rows = dict(previous.get("all_lines", []))
+        changed = {name for name, digest in path_digests.items() if previous_rows.get(name) != digest}
+        if previous_rows and os.path.isfile(all_lines_shp_output_path) and os.path.isfile(
+                all_lines_geojson_output_path):
+            all_lines_shp, rows = patch_all_lines(path_files_list, list(previous_rows), changed,
+                                                  all_lines_shp_output_path, all_lines_geojson_output_path, crs)
+        else:
+            all_lines_shp, rows = build_all_lines(path_files_list, all_lines_shp_output_path,
+                                                  all_lines_geojson_output_path, crs)
+        if incremental:
+            manifest["all_lines"] = [[name, path_digests[name]] for name in rows]
+            save_manifest(manifest_path, manifest)
+
+        if flatgeobuf:
+            write_flatgeobuf(all_lines_shp, all_lines_geojson_output_path)
+        web_map.record_layer(output_directory, "all-lines")
 
         # Create the folium map for the all_lines and update the map html file.
-        m = folium.Map(location=[-30.80, 141.264160], zoom_start=5)
-        layer = folium.GeoJson(data=open(os.path.join(output_directory,
-                               'all_lines',
-                                         'all_lines.geojson'), 'r').read(), name="all-lines").add_to(m)
-        print(f'bounds are: {layer.get_bounds()}')
+        if build_map:
+            web_map.main(output_directory, {"all-lines": write_previews(all_lines_shp, all_lines_geojson_output_path)})
 
 
 if __name__ == "__main__":
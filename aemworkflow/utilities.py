@@ -1,15 +1,23 @@
 import os
 import shutil
+import struct
 import subprocess  # nosec B404: subprocess usage is controlled and arguments are not user-supplied
 import sys
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
-from typing import List, Tuple
+from typing import List, Optional, TextIO, Tuple
 
 import fiona
 from fiona.errors import DriverError
 from loguru import logger
 
+from aemworkflow.manifest import load_manifest, save_manifest
+
 BASE_SUFFIX = ("", "_high", "_mid", "_low")
+SHAPEFILE_CODE = 9994
+MAX_OPEN_WRITERS = 64
+VALIDATION_CACHE_NAME = "shapefile_validation.json"
 
 
 def get_ogr_path():
@@ -26,41 +34,136 @@ def validate_file(filepath: str, logger_session=logger) -> bool:
     return True
 
 
-def validate_shapefile(root_dir: str, logger_session=logger) -> bool:
+def shapefile_record_counts(shp_path: str) -> Optional[Tuple[int, int]]:
     """
-    Validates that the provided shapefile path is a valid shapefile and not any file with .shp extension
+    Reads the record counts of a shapefile from the .shx and .dbf headers, without opening it with
+    OGR. Returns None when the .shp or .shx header is not that of a shapefile.
     """
-    for dirpath, _, filenames in os.walk(root_dir):
-        for fname in filenames:
-            if not fname.lower().endswith('.shp'):
-                continue
-
-            shp_path = os.path.join(dirpath, fname)
-            logger_session.info(f'Validating shapefile: {shp_path}')
-
-            # check for minimum requirement for shape file (.shp + .shx + dbf)
-            base, _ = os.path.splitext(shp_path)
-            shx_path = f'{base}.shx'
-            dbf_path = f'{base}.dbf'
-
-            for path in (shx_path, dbf_path):
-                if not os.path.exists(path):
-                    logger_session.error(f'Shapefile {os.path.basename(shp_path)} is missing {os.path.basename(path)}.')
-                    return False
-            try:
-                with fiona.open(shp_path) as src:
-                    if len(src) == 0:
-                        logger_session.error(f'Shapefile {os.path.basename(shp_path)} contains no features.')
-                        return False
-            except DriverError as e:
-                logger_session.error(f'Shapefile {os.path.basename(shp_path)} could not be opened: {e}')
+    base, _ = os.path.splitext(shp_path)
+    headers = []
+    for path, size in ((shp_path, 100), (f'{base}.shx', 100), (f'{base}.dbf', 32)):
+        with open(path, 'rb') as header_file:
+            headers.append(header_file.read(size))
+    shp_header, shx_header, dbf_header = headers
+    if len(shp_header) < 100 or len(shx_header) < 100 or len(dbf_header) < 32:
+        return None
+    if any(struct.unpack('>i', header[:4])[0] != SHAPEFILE_CODE for header in (shp_header, shx_header)):
+        return None
+    # the .shx holds a 100 byte header and one 8 byte record per shape, its length is in 16 bit words
+    shx_count = (struct.unpack('>i', shx_header[24:28])[0] * 2 - 100) // 8
+    return shx_count, struct.unpack('<I', dbf_header[4:8])[0]
+
+
+def _validate_shapefile_file(shp_path: str, exists, logger_session=logger, fast=False) -> bool:
+    logger_session.info(f'Validating shapefile: {shp_path}')
+
+    # check for minimum requirement for shape file (.shp + .shx + dbf)
+    base, _ = os.path.splitext(shp_path)
+    shx_path = f'{base}.shx'
+    dbf_path = f'{base}.dbf'
+
+    for path in (shx_path, dbf_path):
+        if not exists(path):
+            logger_session.error(f'Shapefile {os.path.basename(shp_path)} is missing {os.path.basename(path)}.')
+            return False
+    if fast:
+        try:
+            counts = shapefile_record_counts(shp_path)
+        except OSError:
+            counts = None
+        # headers that do not agree are left to OGR, for its error message
+        if counts is not None and counts[0] == counts[1]:
+            if counts[0] <= 0:
+                logger_session.error(f'Shapefile {os.path.basename(shp_path)} contains no features.')
                 return False
-            except Exception as e:
-                logger_session.error(f'Error reading shapefile {os.path.basename(shp_path)}: {e}')
+            return True
+    try:
+        with fiona.open(shp_path) as src:
+            if len(src) == 0:
+                logger_session.error(f'Shapefile {os.path.basename(shp_path)} contains no features.')
                 return False
+    except DriverError as e:
+        logger_session.error(f'Shapefile {os.path.basename(shp_path)} could not be opened: {e}')
+        return False
+    except Exception as e:
+        logger_session.error(f'Error reading shapefile {os.path.basename(shp_path)}: {e}')
+        return False
     return True
 
 
+def _shapefile_signature(shp_path: str, catalogue=None) -> Optional[list]:
+    # [size, mtime_ns] of the .shp, .shx and .dbf, None when one of them is missing
+    base, _ = os.path.splitext(shp_path)
+    signature = []
+    for path in (shp_path, f'{base}.shx', f'{base}.dbf'):
+        entry = catalogue.get(os.path.relpath(path, catalogue.input_directory)) if catalogue is not None else None
+        if entry is None:
+            try:
+                stat = os.stat(path)
+            except OSError:
+                return None
+            signature.append([stat.st_size, stat.st_mtime_ns])
+        else:
+            signature.append([entry.size, entry.mtime_ns])
+    return signature
+
+
+def validate_shapefile(root_dir: str, logger_session=logger, catalogue=None, jobs=1, cache_path=None) -> bool:
+    """
+    Validates that the provided shapefile path is a valid shapefile and not any file with .shp extension.
+    With an InputCatalogue of root_dir the directory is not listed again. With jobs > 1 the shapefiles
+    are opened by a pool of that many threads, GDAL releases the GIL while it reads.
+
+    With a cache_path the validation is fast: the record counts are read from the .shx and .dbf
+    headers, and the shapefiles that passed are recorded in the cache file with the size and mtime
+    of their files, so unchanged shapefiles are not validated again on the next run.
+    """
+    if catalogue is None:
+        shp_paths = [os.path.join(dirpath, fname)
+                     for dirpath, _, filenames in os.walk(root_dir)
+                     for fname in filenames if fname.lower().endswith('.shp')]
+        exists = os.path.exists
+    else:
+        shp_paths = [str(entry.path) for name, entry in sorted(catalogue.files.items())
+                     if name.lower().endswith('.shp')]
+        exists = catalogue.exists_path
+
+    signatures = {}
+    if cache_path is not None:
+        cached = load_manifest(cache_path, logger_session).get("shapefiles", {})
+        signatures = {shp_path: _shapefile_signature(shp_path, catalogue) for shp_path in shp_paths}
+        valid = {shp_path for shp_path in shp_paths
+                 if signatures[shp_path] is not None and cached.get(shp_path) == signatures[shp_path]}
+        if valid:
+            logger_session.info(f'Skipping {len(valid)} unchanged shapefiles')
+        shp_paths = [shp_path for shp_path in shp_paths if shp_path not in valid]
+    else:
+        valid = set()
+
+    def validate(shp_path):
+        return _validate_shapefile_file(shp_path, exists, logger_session, fast=cache_path is not None)
+
+    passed = True
+    if jobs <= 1:
+        for shp_path in shp_paths:
+            if not validate(shp_path):
+                passed = False
+                break
+            valid.add(shp_path)
+    else:
+        with ThreadPoolExecutor(max_workers=jobs) as executor:
+            for shp_path, result in zip(shp_paths, executor.map(validate, shp_paths)):
+                if result:
+                    valid.add(shp_path)
+                else:
+                    passed = False
+
+    if cache_path is not None:
+        save_manifest(cache_path, {"shapefiles": {shp_path: signatures[shp_path] for shp_path in sorted(valid)
+                                                  if signatures[shp_path] is not None}})
+    return passed
+
+
 def run_command(cmd: List[str], logger_session=logger) -> None:
     """
     A helper function to run subprocess commands with error handling.
@@ -112,7 +215,47 @@ def get_make_srt_dir(wrk_dir: str, logger_session=logger) -> None:
         sys.exit()
 
 
-def find_geometry_file(shp_dir, prefix, geometryfile, logger_session=logger) -> Tuple[Path, str]:
+class WriterPool:
+    """
+    Buffered append mode writers keyed by output path, for stages that write their lines to many
+    files in turn. A file stays open between writes instead of being opened and closed for each
+    line, and at most max_open files are open at once: the least recently written one is closed to
+    make room and opened again, in append mode, when it is written next. Use it as a context
+    manager, so all the writers are closed when the block ends.
+    """
+
+    def __init__(self, max_open=MAX_OPEN_WRITERS):
+        self.max_open = max_open
+        self._writers: "OrderedDict[str, TextIO]" = OrderedDict()
+
+    def write(self, path, text: str) -> None:
+        key = str(path)
+        writer = self._writers.get(key)
+        if writer is None:
+            if len(self._writers) >= self.max_open:
+                _, oldest = self._writers.popitem(last=False)
+                oldest.close()
+            writer = self._writers[key] = open(key, mode="a")
+        else:
+            self._writers.move_to_end(key)
+        writer.write(text)
+
+    def close(self) -> None:
+        while self._writers:
+            _, writer = self._writers.popitem(last=False)
+            writer.close()
+
+    def __enter__(self) -> "WriterPool":
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.close()
+
+
+def find_geometry_file(shp_dir, prefix, geometryfile, logger_session=logger, catalogue=None) -> Tuple[Path, str]:
+    if catalogue is not None:
+        return catalogue.geometry_file(prefix, geometryfile, logger_session)
+
     required_suffix = '.path.txt' if geometryfile == 'path' else '.extent.txt'
     for base_suffix in BASE_SUFFIX:
         geometry_file_path = Path(shp_dir) / f'{prefix}{base_suffix}{required_suffix}'
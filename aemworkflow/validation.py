@@ -4,6 +4,8 @@ from pathlib import Path
 
 from loguru import logger
 
+from aemworkflow.interp_shapefile import MET_TABLE_NAME, met_table_rows
+
 
 def validation_remove_quotes(bdf_file_path, bdf_out_file_path, logger_session=logger):
     logger_session.info("Running remove quotes validation.")
@@ -17,7 +19,13 @@ def validation_remove_quotes(bdf_file_path, bdf_out_file_path, logger_session=lo
         raise
 
 
-def validation_qc_units(erc_file_path, bdf_2_file_path, validation_dir, logger_session=logger):
+def met_rows(bdf_file_path):
+    with open(bdf_file_path, "r") as interp_file:
+        for line in interp_file:
+            yield line.strip().split("|"), line
+
+
+def validation_qc_units(erc_file_path, bdf_2_file_path, validation_dir, logger_session=logger, met_table_path=None):
     logger_session.info("Running qc_units validation.")
     # Initialize dictionaries to store stratigraphic unit information
     stratno = {}
@@ -41,65 +49,64 @@ def validation_qc_units(erc_file_path, bdf_2_file_path, validation_dir, logger_s
                     stratno[fields[0]] = fields[1]
                     name[fields[0]] = fields[0]
 
-        # Read AusAEM1_Interp.csv and compare unit name-number
-        with open(bdf_2_file_path, "r") as interp_file:
-            with open(fr'{qc_outputs_path}error_list.log', "a") as error_list_file:
-
-                for line in interp_file:
-                    fields = line.strip().split("|")
-                    if len(fields) <= 25:
-                        with open(fr"{qc_outputs_path}short_nf.log", "a") as short_nf_file:
-                            short_nf_file.write(f"{len(fields)} {fields[0]} {fields[1]}\n")
-
-                    if fields[7] == '' and fields[8] == '':
-                        if fields[10] == '' and fields[11] == '':
-                            if fields[13] == '' and fields[14] == '':
-                                units[f"{fields[7]} {fields[8]}"] = f"{fields[7]},{fields[8]}"
-                                count[f"{fields[7]} {fields[8]}"] = count.get(f"{fields[7]} {fields[8]}", 0) + 1
-                                error_list_file.write(f"nulls|{fields[7]}|{fields[8]}|{line}")
-                                continue
-
-                    if (name.get(fields[7]) == fields[7] and stratno.get(fields[7]) == fields[8]) or \
-                        (name.get(fields[10]) == fields[10] and stratno.get(fields[10]) == fields[11]) or \
-                            (name.get(fields[13]) == fields[13] and stratno.get(fields[13]) == fields[14]):
-
-                        if name.get(fields[7]) == fields[7] and stratno.get(fields[7]) == fields[8]:
+        # Read AusAEM1_Interp.csv and compare unit name-number, from the met.parquet columns when there is one
+        interp_rows = met_rows(bdf_2_file_path) if met_table_path is None else met_table_rows(met_table_path)
+        with open(fr'{qc_outputs_path}error_list.log', "a") as error_list_file:
+
+            for fields, line in interp_rows:
+                if len(fields) <= 25:
+                    with open(fr"{qc_outputs_path}short_nf.log", "a") as short_nf_file:
+                        short_nf_file.write(f"{len(fields)} {fields[0]} {fields[1]}\n")
+
+                if fields[7] == '' and fields[8] == '':
+                    if fields[10] == '' and fields[11] == '':
+                        if fields[13] == '' and fields[14] == '':
                             units[f"{fields[7]} {fields[8]}"] = f"{fields[7]},{fields[8]}"
                             count[f"{fields[7]} {fields[8]}"] = count.get(f"{fields[7]} {fields[8]}", 0) + 1
-                        else:
-                            no_unit[f"{fields[7]} {fields[8]}"] = f"{fields[7]},{fields[8]}"
-                            count[f"{fields[7]} {fields[8]}"] = count.get(f"{fields[7]} {fields[8]}", 0) + 1
-                            error_list_file.write(f"over|{fields[7]}|{fields[8]}|{line}")
-
-                        if name.get(fields[10]) == fields[10] and stratno.get(fields[10]) == fields[11]:
-                            units[f"{fields[10]} {fields[11]}"] = f"{fields[10]},{fields[11]}"
-                            count[f"{fields[10]} {fields[11]}"] = count.get(f"{fields[10]} {fields[11]}", 0) + 1
-                        else:
-                            no_unit[f"{fields[10]} {fields[11]}"] = f"{fields[10]},{fields[11]}"
-                            count[f"{fields[10]} {fields[11]}"] = count.get(f"{fields[10]} {fields[11]}", 0) + 1
-                            error_list_file.write(f"under|{fields[10]}|{fields[11]}|{line}")
-
-                        if name.get(fields[13]) == fields[13] and stratno.get(fields[13]) == fields[14]:
-                            units[f"{fields[13]} {fields[14]}"] = f"{fields[13]},{fields[14]}"
-                            count[f"{fields[13]} {fields[14]}"] = count.get(f"{fields[13]} {fields[14]}", 0) + 1
-                        else:
-                            no_unit[f"{fields[13]} {fields[14]}"] = f"{fields[13]},{fields[14]}"
-                            count[f"{fields[13]} {fields[14]}"] = count.get(f"{fields[13]} {fields[14]}", 0) + 1
-                            error_list_file.write(f"within|{fields[13]}|{fields[14]}|{line}")
+                            error_list_file.write(f"nulls|{fields[7]}|{fields[8]}|{line}")
+                            continue
+
+                if (name.get(fields[7]) == fields[7] and stratno.get(fields[7]) == fields[8]) or \
+                    (name.get(fields[10]) == fields[10] and stratno.get(fields[10]) == fields[11]) or \
+                        (name.get(fields[13]) == fields[13] and stratno.get(fields[13]) == fields[14]):
 
+                    if name.get(fields[7]) == fields[7] and stratno.get(fields[7]) == fields[8]:
+                        units[f"{fields[7]} {fields[8]}"] = f"{fields[7]},{fields[8]}"
+                        count[f"{fields[7]} {fields[8]}"] = count.get(f"{fields[7]} {fields[8]}", 0) + 1
                     else:
-                        # No match at all
-                        no_unit[f'{fields[7]} {fields[8]}'] = f'{fields[7]},{fields[8]}'
-                        no_unit[f'{fields[10]} {fields[11]}'] = f'{fields[10]},{fields[11]}'
-                        no_unit[f'{fields[13]} {fields[14]}'] = f'{fields[13]},{fields[14]}'
+                        no_unit[f"{fields[7]} {fields[8]}"] = f"{fields[7]},{fields[8]}"
+                        count[f"{fields[7]} {fields[8]}"] = count.get(f"{fields[7]} {fields[8]}", 0) + 1
+                        error_list_file.write(f"over|{fields[7]}|{fields[8]}|{line}")
 
-                        count[f'{fields[7]} {fields[8]}'] = count.get(f'{fields[7]} {fields[8]}', 0) + 1
-                        count[f'{fields[10]} {fields[11]}'] = count.get(f'{fields[10]} {fields[11]}', 0) + 1
-                        count[f'{fields[13]} {fields[14]}'] = count.get(f'{fields[13]} {fields[14]}', 0) + 1
+                    if name.get(fields[10]) == fields[10] and stratno.get(fields[10]) == fields[11]:
+                        units[f"{fields[10]} {fields[11]}"] = f"{fields[10]},{fields[11]}"
+                        count[f"{fields[10]} {fields[11]}"] = count.get(f"{fields[10]} {fields[11]}", 0) + 1
+                    else:
+                        no_unit[f"{fields[10]} {fields[11]}"] = f"{fields[10]},{fields[11]}"
+                        count[f"{fields[10]} {fields[11]}"] = count.get(f"{fields[10]} {fields[11]}", 0) + 1
+                        error_list_file.write(f"under|{fields[10]}|{fields[11]}|{line}")
+
+                    if name.get(fields[13]) == fields[13] and stratno.get(fields[13]) == fields[14]:
+                        units[f"{fields[13]} {fields[14]}"] = f"{fields[13]},{fields[14]}"
+                        count[f"{fields[13]} {fields[14]}"] = count.get(f"{fields[13]} {fields[14]}", 0) + 1
+                    else:
+                        no_unit[f"{fields[13]} {fields[14]}"] = f"{fields[13]},{fields[14]}"
+                        count[f"{fields[13]} {fields[14]}"] = count.get(f"{fields[13]} {fields[14]}", 0) + 1
+                        error_list_file.write(f"within|{fields[13]}|{fields[14]}|{line}")
 
-                        error_list_file.write(f'over|{fields[7]}|{fields[8]}|{line}')
-                        error_list_file.write(f'under|{fields[10]}|{fields[11]}|{line}')
-                        error_list_file.write(f'within|{fields[13]}|{fields[14]}|{line}')
+                else:
+                    # No match at all
+                    no_unit[f'{fields[7]} {fields[8]}'] = f'{fields[7]},{fields[8]}'
+                    no_unit[f'{fields[10]} {fields[11]}'] = f'{fields[10]},{fields[11]}'
+                    no_unit[f'{fields[13]} {fields[14]}'] = f'{fields[13]},{fields[14]}'
+
+                    count[f'{fields[7]} {fields[8]}'] = count.get(f'{fields[7]} {fields[8]}', 0) + 1
+                    count[f'{fields[10]} {fields[11]}'] = count.get(f'{fields[10]} {fields[11]}', 0) + 1
+                    count[f'{fields[13]} {fields[14]}'] = count.get(f'{fields[13]} {fields[14]}', 0) + 1
+
+                    error_list_file.write(f'over|{fields[7]}|{fields[8]}|{line}')
+                    error_list_file.write(f'under|{fields[10]}|{fields[11]}|{line}')
+                    error_list_file.write(f'within|{fields[13]}|{fields[14]}|{line}')
 
         d = date.today().strftime("%Y%m%d")
         summary_file = fr'{qc_outputs_path}AEM_validation_summary_{d}.txt'
@@ -129,7 +136,12 @@ def main(input_directory, output_directory, asud):
     validation_remove_quotes(bdf_file_path, bdf_out_file_path)
     erc_file_path = os.path.join(input_directory, asud)
 
-    validation_qc_units(erc_file_path, bdf_out_file_path, output_directory)
+    # met.parquet is written by the same interpretation run as met.bdf, an older one is stale
+    met_table_path = fr'{output_directory}{os.sep}interp{os.sep}{MET_TABLE_NAME}'
+    if not os.path.isfile(met_table_path) or os.path.getmtime(met_table_path) < os.path.getmtime(bdf_file_path):
+        met_table_path = None
+
+    validation_qc_units(erc_file_path, bdf_out_file_path, output_directory, met_table_path=met_table_path)
 
 
 if __name__ == "__main__":
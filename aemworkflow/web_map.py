@@ -0,0 +1,114 @@
+"""
+The map stage, rendering map.html from the EPSG:4326 layers of the other stages.
+
+The pre-interpretation and interpretation stages write their layers in the survey CRS and an
+EPSG:4326 GeoJSON copy, and record a fingerprint of the source layer in map.manifest.json. The map
+stage reuses a GeoJSON copy whose fingerprint still matches its source layer and only reprojects
+the layers that changed or were never recorded, so the stages can skip map building and the map can
+be rendered later, on its own.
+"""
+import os
+from pathlib import Path
+
+import folium
+from loguru import logger
+
+from aemworkflow.crs_registry import reproject
+from aemworkflow.layer_io import read_layer, write_layer
+from aemworkflow.manifest import file_digest, load_manifest, save_manifest
+from aemworkflow.web_preview import PreviewLayer, preview_paths, read_previews, write_previews
+
+MANIFEST_NAME = 'map.manifest.json'
+SOURCE_SUFFIXES = ('.shp', '.shx', '.dbf', '.prj')
+
+
+def interp_style(feature):
+    return {
+        'fillColor': 'red',
+        'color': 'red',
+        'opacity': 0.50,
+        'weight': 2,
+    }
+
+
+# (map layer name, source layer, EPSG:4326 copy, style), relative to the output directory
+MAP_LAYERS = (
+    ("interp", os.path.join('interp', 'active_path.shp'), os.path.join('interp', 'active_path.geojson'),
+     interp_style),
+    ("all-lines", os.path.join('all_lines', 'all_lines.shp'), os.path.join('all_lines', 'all_lines.geojson'),
+     None),
+)
+
+
+def source_fingerprint(shp_path) -> dict:
+    """
+    Returns the SHA-256 digests of the files of a source shapefile, keyed by their suffix.
+    """
+    stem, _ = os.path.splitext(shp_path)
+    return {suffix: file_digest(f"{stem}{suffix}") for suffix in SOURCE_SUFFIXES if os.path.isfile(f"{stem}{suffix}")}
+
+
+def record_layer(output_directory, name) -> None:
+    """
+    Records the fingerprint of the source of a map layer after a stage wrote the layer and its
+    EPSG:4326 copy, so the map stage does not reproject it again.
+    """
+    _, source, _, _ = next(layer for layer in MAP_LAYERS if layer[0] == name)
+    manifest_path = os.path.join(output_directory, MANIFEST_NAME)
+    manifest = load_manifest(manifest_path)
+    layers = manifest.get("layers", {})
+    layers[name] = source_fingerprint(os.path.join(output_directory, source))
+    save_manifest(manifest_path, {"layers": layers})
+
+
+def layer_previews(output_directory, name, layers, logger_session=logger):
+    """
+    Returns the map previews of a layer, reprojecting the source layer when its fingerprint is not
+    the one recorded in layers, which is updated. A GeoJSON copy without its source layer is used as
+    it is. Returns None when the layer was never written.
+    """
+    _, source, target, _ = next(layer for layer in MAP_LAYERS if layer[0] == name)
+    source_path = os.path.join(output_directory, source)
+    target_path = os.path.join(output_directory, target)
+    if not os.path.isfile(source_path):
+        return read_previews(target_path, logger_session=logger_session) if os.path.isfile(target_path) else None
+
+    fingerprint = source_fingerprint(source_path)
+    if layers.get(name) == fingerprint and os.path.isfile(target_path):
+        return read_previews(target_path, logger_session=logger_session)
+
+    logger_session.info(f"Reprojecting {source_path} to EPSG:4326")
+    gdf = read_layer(source_path)
+    gdf = gdf.set_geometry(reproject(gdf.geometry.values, gdf.crs.to_epsg()), crs="EPSG:4326")
+    write_layer(gdf, target_path, driver='GeoJSON')
+    layers[name] = fingerprint
+    return write_previews(gdf, target_path)
+
+
+def main(output_directory, previews=None, logger_session=logger, fetch_previews=False) -> None:
+    """
+    Renders map.html in the output directory. previews holds the map previews a stage has at hand
+    already, by map layer name; the other layers come from the cached EPSG:4326 copies. Every level
+    of the previews is embedded in map.html unless fetch_previews is set, then map.html embeds only
+    the coarsest level and fetches the finer ones from their files, for a map served over HTTP.
+    """
+    previews = previews or {}
+    manifest_path = os.path.join(output_directory, MANIFEST_NAME)
+    layers = load_manifest(manifest_path, logger_session).get("layers", {})
+
+    m = folium.Map(location=[-30.80, 141.264160], zoom_start=5)
+    for name, _, target, style in MAP_LAYERS:
+        layer_preview = previews.get(name) or layer_previews(output_directory, name, layers, logger_session)
+        if layer_preview is None:
+            continue
+        # the preview files sit next to the GeoJSON copy, map.html fetches the finer levels from there
+        urls = [Path(path).as_posix() for path in preview_paths(target)] if fetch_previews else None
+        layer = PreviewLayer(layer_preview, name=name, style_function=style, urls=urls).add_to(m)
+        if name == "all-lines":
+            print(f'bounds are: {layer.get_bounds()}')
+    save_manifest(manifest_path, {"layers": layers})
+
+    folium.LayerControl().add_to(m)
+    map_path = os.path.normpath(f"{output_directory}{os.sep}map.html")
+    m.save(map_path)
+    print('completed updating map')
@@ -0,0 +1,182 @@
+"""
+Level of detail preview layers for the folium web map.
+
+The full resolution EPSG:4326 GeoJSON outputs are left untouched. For the map the geometries are
+simplified at a few tolerances, written next to the full resolution file as <stem>_lod<n>.geojson,
+and only the level that suits the current zoom is shown. map.html embeds every level, so it works
+opened from the file system. A map served over HTTP can embed only the coarsest level instead and
+fetch the finer ones as the map is zoomed in, so it stays small for large surveys.
+"""
+import os
+from pathlib import Path
+
+import folium
+import geopandas
+import shapely
+from branca.element import MacroElement
+from jinja2 import Template
+from loguru import logger
+
+from aemworkflow.layer_io import read_layer, write_layer
+
+# (min zoom, max zoom, simplify tolerance in degrees), coarsest level first
+LEVELS = (
+    (0, 7, 0.01),
+    (8, 10, 0.001),
+    (11, None, 0.0001),
+)
+
+
+def simplify_levels(gdf: geopandas.GeoDataFrame, levels=LEVELS) -> list:
+    """
+    Returns a copy of an EPSG:4326 GeoDataFrame per level with its geometries simplified in one
+    vectorised call each.
+    """
+    geometry = gdf.geometry.values
+    return [gdf.set_geometry(shapely.simplify(geometry, tolerance, preserve_topology=False), crs=gdf.crs)
+            for _, _, tolerance in levels]
+
+
+def preview_paths(geojson_path, levels=LEVELS) -> list:
+    path = Path(geojson_path)
+    return [str(path.with_name(f"{path.stem}_lod{level}.geojson")) for level in range(len(levels))]
+
+
+def write_previews(gdf: geopandas.GeoDataFrame, geojson_path, levels=LEVELS) -> list:
+    """
+    Writes the simplified levels of a GeoDataFrame next to its full resolution GeoJSON file and
+    returns them.
+    """
+    previews = simplify_levels(gdf, levels)
+    for preview, preview_path in zip(previews, preview_paths(geojson_path, levels)):
+        write_layer(preview, preview_path, driver='GeoJSON')
+    return previews
+
+
+def write_flatgeobuf(gdf: geopandas.GeoDataFrame, geojson_path) -> str:
+    """
+    Writes an EPSG:4326 layer as FlatGeobuf with its packed Hilbert R-tree next to the full
+    resolution GeoJSON file, so a web page can fetch only the features inside its viewport with
+    HTTP range requests. Returns the path of the FlatGeobuf file.
+    """
+    fgb_path = str(Path(geojson_path).with_suffix(".fgb"))
+    write_layer(gdf, fgb_path, driver="FlatGeobuf", SPATIAL_INDEX="YES")
+    return fgb_path
+
+
+def read_previews(geojson_path, levels=LEVELS, logger_session=logger) -> list:
+    """
+    Returns the simplified levels of a full resolution GeoJSON file, regenerating the preview files
+    when any of them is missing or older than the GeoJSON file.
+    """
+    paths = preview_paths(geojson_path, levels)
+    source_mtime = os.path.getmtime(geojson_path)
+    if all(os.path.isfile(path) and os.path.getmtime(path) >= source_mtime for path in paths):
+        return [read_layer(path) for path in paths]
+    logger_session.info(f"Writing map previews for {geojson_path}")
+    return write_previews(read_layer(geojson_path), geojson_path, levels)
+
+
+class _ZoomSwitch(MacroElement):
+    _template = Template("""
+        {% macro script(this, kwargs) %}
+        (function() {
+            var group = {{ this.group.get_name() }};
+            var map = {{ this.map.get_name() }};
+            var coarsest = {{ this.layers[0].get_name() }};
+            var levels = [
+                {%- for min_zoom, max_zoom, layer, url in this.levels %}
+                {layer: {{ layer.get_name() if layer is not none else "null" }}, url: {{ url|tojson }},
+                 minZoom: {{ min_zoom }}, maxZoom: {{ max_zoom if max_zoom is not none else "Infinity" }}},
+                {%- endfor %}
+            ];
+            function load(level) {
+                if (level.layer !== null || level.failed) {
+                    return level.layer;
+                }
+                if (!level.loading) {
+                    level.loading = true;
+                    fetch(level.url).then(function(response) {
+                        if (!response.ok) {
+                            throw new Error(response.statusText);
+                        }
+                        return response.json();
+                    }).then(function(data) {
+                        // the levels hold the same features in the same order, keep the ids the styles are keyed on
+                        var ids = coarsest.getLayers().map(function(layer) { return layer.feature.id; });
+                        data.features.forEach(function(feature, i) {
+                            if (feature.id === undefined) {
+                                feature.id = ids[i];
+                            }
+                        });
+                        level.layer = L.geoJson(data, {{ this.style_options }});
+                        update();
+                    }).catch(function(error) {
+                        // e.g. map.html opened from the file system, keep showing the coarsest level
+                        console.warn("Could not load " + level.url + ": " + error);
+                        level.failed = true;
+                    });
+                }
+                return null;
+            }
+            function update() {
+                var zoom = map.getZoom();
+                var shown = coarsest;
+                // the level of the zoom, or the finest loaded level below it until that one is loaded
+                levels.forEach(function(level) {
+                    if (zoom >= level.minZoom) {
+                        shown = (zoom <= level.maxZoom ? load(level) : level.layer) || shown;
+                    }
+                });
+                levels.forEach(function(level) {
+                    if (level.layer === shown) {
+                        group.addLayer(level.layer);
+                    } else if (level.layer !== null) {
+                        group.removeLayer(level.layer);
+                    }
+                });
+            }
+            map.on("zoomend", update);
+            update();
+        })();
+        {% endmacro %}
+    """)
+
+    def __init__(self, group, layers, levels, urls, styled=False):
+        super().__init__()
+        self._name = "ZoomSwitch"
+        self.group = group
+        self.layers = layers
+        self.styled = styled
+        self.levels = [(min_zoom, max_zoom, layer, url)
+                       for (min_zoom, max_zoom, _), layer, url in zip(levels, layers + [None] * len(levels), urls)]
+
+    def render(self, **kwargs):
+        self.map = self.group._parent
+        # the fetched levels take the styles of the embedded coarsest level
+        self.style_options = f"{{style: {self.layers[0].get_name()}_styler}}" if self.styled else "{}"
+        super().render(**kwargs)
+
+
+class PreviewLayer(folium.FeatureGroup):
+    """
+    A single named map layer showing the simplified level matching the map zoom. Without urls every
+    level is embedded. With the urls of the written preview files, relative to the map page, only the
+    coarsest level is embedded and the finer levels are fetched the first time the zoom reaches them,
+    which needs the page to be served over HTTP.
+    """
+
+    def __init__(self, previews, name, style_function=None, levels=LEVELS, urls=None):
+        super().__init__(name=name)
+        embedded = previews[:1] if urls else previews
+        self.layers = [folium.GeoJson(data=preview, name=f"{name}-lod{level}",
+                                      style_function=style_function).add_to(self)
+                       for level, preview in enumerate(embedded)]
+        self.add_child(_ZoomSwitch(self, self.layers, levels, urls or [None] * len(levels),
+                                   styled=style_function is not None))
+        # the finest level keeps the extent of the full resolution geometries
+        min_x, min_y, max_x, max_y = previews[-1].total_bounds
+        self.bounds = [[float(min_y), float(min_x)], [float(max_y), float(max_x)]]
+
+    def get_bounds(self):
+        return self.bounds
@@ -0,0 +1,16 @@
+import pytest
+
+from aemworkflow import crs_registry
+
+
+@pytest.fixture(autouse=True)
+def cache_file(monkeypatch, tmp_path):
+    """
+    Keeps the CRS cache of every test in its own temporary directory, instead of the cache in the
+    home directory of whoever runs the tests.
+    """
+    cache_file = tmp_path / "crs_registry.json"
+    monkeypatch.setattr(crs_registry, "CACHE_FILE", cache_file)
+    monkeypatch.setattr(crs_registry, "_registry", None)
+    monkeypatch.setattr(crs_registry, "_transformers", {})
+    return cache_file
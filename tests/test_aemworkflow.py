@@ -0,0 +1,11 @@
+import pytest
+from click.testing import CliRunner
+
+from aemworkflow.aemworkflow import cli
+
+
+@pytest.mark.parametrize("command", ["pre-interpret", "interpret", "convert"])
+def test_jobs_must_be_positive(tmp_path, command):
+    result = CliRunner().invoke(cli, [command, "--i", str(tmp_path), "--o", str(tmp_path), "--jobs", "0"])
+    assert result.exit_code == 2
+    assert "Invalid value for '--jobs'" in result.output
@@ -0,0 +1,56 @@
+from unittest import mock
+
+import pytest
+
+from aemworkflow import catalogue, utilities
+
+logger_session = mock.MagicMock()
+
+
+@pytest.fixture
+def input_dir(tmp_path):
+    for name in ("1001.path.txt", "1001.extent.txt", "1002_low.path.txt", "1002_low.extent.txt",
+                 "1002_high.extent.txt", "1003.path.txt", "1001_interp_001.shp", ".hidden.path.txt"):
+        (tmp_path / name).write_text(name)
+    (tmp_path / "nested").mkdir()
+    (tmp_path / "nested" / "1004.path.txt").write_text("nested")
+    return tmp_path
+
+
+def test_catalogue_indexes_lines(input_dir):
+    cat = catalogue.InputCatalogue(input_dir, logger_session=logger_session)
+
+    assert sorted(cat.lines) == ["1001", "1002", "1003"]
+    assert set(cat.lines["1002"].extent) == {"_low", "_high"}
+    assert [entry.path.name for entry in cat.lines["1001"].interp] == ["1001_interp_001.shp"]
+    entry = cat.get("1001.path.txt")
+    assert (entry.size, entry.path) == (len("1001.path.txt"), input_dir / "1001.path.txt")
+    assert cat.exists("nested/1004.path.txt")
+    assert cat.exists_path(input_dir / "nested" / "1004.path.txt")
+    assert not catalogue.InputCatalogue(input_dir, recursive=False).exists("nested/1004.path.txt")
+
+
+def test_glob_matches_glob_module(input_dir):
+    cat = catalogue.InputCatalogue(input_dir)
+    assert [entry.path.name for entry in cat.glob("*.path.txt")] == [
+        "1001.path.txt", "1002_low.path.txt", "1003.path.txt"]
+
+
+def test_line_pairs_keyed_by_name(input_dir):
+    pairs, unmatched = catalogue.InputCatalogue(input_dir).line_pairs()
+    assert [(p.path.name, e.path.name) for p, e in pairs] == [
+        ("1001.path.txt", "1001.extent.txt"), ("1002_low.path.txt", "1002_low.extent.txt")]
+    assert [entry.path.name for entry in unmatched] == ["1002_high.extent.txt", "1003.path.txt"]
+
+
+@pytest.mark.parametrize("prefix, geometryfile", [("1001", "path"), ("1002", "extent"), ("1002", "path")])
+def test_geometry_file_same_as_find_geometry_file(input_dir, prefix, geometryfile):
+    cat = catalogue.InputCatalogue(input_dir)
+    with mock.patch("pathlib.Path.is_file", side_effect=AssertionError("no stat expected")):
+        found = utilities.find_geometry_file(input_dir, prefix, geometryfile, logger_session, catalogue=cat)
+    assert found == utilities.find_geometry_file(input_dir, prefix, geometryfile, logger_session)
+
+
+def test_geometry_file_missing(input_dir):
+    with pytest.raises(FileNotFoundError):
+        catalogue.InputCatalogue(input_dir).geometry_file("1003", "extent", logger_session)
@@ -127,7 +127,8 @@ def test_zedfix_gmt_returns_path_identifiers(tmp_path):
         "frame_top": [4, 5],
     })
     df2 = pd.DataFrame({"fid": [1, 2], "gl": [5.0, 15.0]})
-    with mock.patch("aemworkflow.commands.pd.read_csv", side_effect=[df, df2, df2]):
+    with mock.patch("aemworkflow.commands.pd.read_csv", return_value=df), \
+            mock.patch("aemworkflow.commands.read_path_file", return_value=df2):
         names = commands.zedfix_gmt(str(wrk_dir), "path_dir", "ext_file")
         assert names == [filo_1, filo_2]
 
@@ -185,13 +186,12 @@ def test_fourth_writes_s2_file_to_sort_dir(tmp_path):
     PVRTX x x 1 1 {col_5_extrapolate_left}\n
     PVRTX x x 1 1 {col_5_extrapolate_right}\n>"
     """)
-    df = pd.DataFrame({"fid": [1, 2], "coordx": [10.0, 20.0], "coordy": [100.0, 200.0], "gl": [5.0, 15.0]})
-    with mock.patch("aemworkflow.commands.pd.read_csv", return_value=df):
-        commands.fourth(str(wrk_dir), str(srt_dir), [name])
-        s2_file = (srt_dir / f"{name}.s2").read_text()
-        assert "PVRTX x 16.000000 160.000000 0.600000 1.000000 1.000000 11.000000 -10.400000" in s2_file
-        assert "PVRTX x 10.000000 100.000000 0.000000 1.000000 1.000000 5.000000 -5.000000" in s2_file
-        assert "PVRTX x 40.000000 400.000000 3.000000 1.000000 1.000000 35.000000 -32.000000" in s2_file
+    (srt_dir / f"{name}.path.txt").write_text("1 1 0 0 10.0 100.0 0 0 5.0\n1 2 0 0 20.0 200.0 0 0 15.0\n")
+    commands.fourth(str(wrk_dir), str(srt_dir), [name])
+    s2_file = (srt_dir / f"{name}.s2").read_text()
+    assert "PVRTX x 16.000000 160.000000 0.600000 1.000000 1.000000 11.000000 -10.400000" in s2_file
+    assert "PVRTX x 10.000000 100.000000 0.000000 1.000000 1.000000 5.000000 -5.000000" in s2_file
+    assert "PVRTX x 40.000000 400.000000 3.000000 1.000000 1.000000 35.000000 -32.000000" in s2_file
 
 
 def test_fifth_writes_gp_file_to_sort_dir(tmp_path):
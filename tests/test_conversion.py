@@ -1,7 +1,10 @@
 import os
 from unittest import mock
 
+import fiona
+import geopandas
 import pandas as pd
+from shapely.geometry import LineString
 
 import aemworkflow.conversion as conversion
 
@@ -26,11 +29,60 @@ def test_conversion_zedfix_gmt_returns_path_identifiers(tmp_path):
         "frame_top": [4, 5],
     })
     df2 = pd.DataFrame({"fid": [1, 2], "gl": [5.0, 15.0]})
-    with mock.patch("aemworkflow.conversion.pd.read_csv", side_effect=[df, df2, df2]):
-        names = conversion.conversion_zedfix_gmt_to_srt(str(wrk_dir), "path_dir", "ext_file", logger_session)
+    with mock.patch("aemworkflow.conversion.pd.read_csv", return_value=df), \
+            mock.patch("aemworkflow.conversion.read_path_file", return_value=df2):
+        names = conversion.conversion_zedfix_gmt_to_srt(str(wrk_dir), str(wrk_dir), "ext_file", logger_session)
         assert names == [filo_1, filo_2]
 
 
+def test_render_interp_gmt_uses_last_interp_shapefile(tmp_path):
+    for name in ("1001_interp_001.shp", "1001_interp_002.shp", "1002_interp_001.shp"):
+        (tmp_path / name).touch()
+    catalogue = conversion.InputCatalogue(tmp_path, recursive=False)
+    gmt = tmp_path / "1001_interp.gmt"
+    with mock.patch("aemworkflow.conversion.get_ogr_path", return_value="ogr2ogr"), \
+            mock.patch("aemworkflow.conversion.run_command") as mock_run:
+        conversion.render_interp_gmt(catalogue, 1001, gmt, logger_session)
+        conversion.render_interp_gmt(catalogue, 1003, tmp_path / "1003_interp.gmt", logger_session)
+    mock_run.assert_called_once_with(["ogr2ogr", "-f", "GMT", str(gmt), str(tmp_path / "1001_interp_002.shp")])
+
+
+def test_main_rerenders_gmt_older_than_shapefile(tmp_path):
+    (tmp_path / "interp").mkdir()
+    (tmp_path / "interp" / "active_extent.txt").write_text("1001 0 0 10 100 0 0 10 200\n")
+    (tmp_path / "1001.path.txt").write_text("".join(f"1001 {i} 0 0 {10.0 * i} {20.0 * i} 0 0 5.0\n"
+                                                    for i in range(1, 6)))
+    shp_file = tmp_path / "1001_interp.shp"
+    gmt_file = tmp_path / "interp" / "1001_interp.gmt"
+
+    def write_shapefile(unit):
+        geopandas.GeoDataFrame({"Id": [0], "Type": [unit]},
+                               geometry=[LineString([(1.5, 40), (2.5, 45)])]).to_file(shp_file)
+
+    def ogr2ogr(command):
+        # the GMT translation of ogr2ogr -f GMT, the other commands write the ZF_SHP layers
+        if command[1:3] == ["-f", "GMT"]:
+            with fiona.open(command[4]) as src, fiona.open(command[3], "w", driver="OGR_GMT",
+                                                           schema=src.schema) as dst:
+                dst.writerecords(src)
+
+    write_shapefile("top")
+    with mock.patch("aemworkflow.conversion.run_command", side_effect=ogr2ogr):
+        conversion.main(str(tmp_path), str(tmp_path), "28349")
+        assert "# @D0|3DPolyline|top" in (tmp_path / "SORT" / "1001.gmtsddd").read_text()
+
+        # the shapefile saved after the GMT file of an earlier --emit-gmt run
+        write_shapefile("edited")
+        shp_mtime_ns = shp_file.stat().st_mtime_ns
+        os.utime(gmt_file, ns=(shp_mtime_ns - 10 ** 9, shp_mtime_ns - 10 ** 9))
+        conversion.main(str(tmp_path), str(tmp_path), "28349")
+
+    gmtsddd = (tmp_path / "SORT" / "1001.gmtsddd").read_text()
+    assert "# @D0|3DPolyline|edited" in gmtsddd
+    assert "|top" not in gmtsddd
+    assert "# @D0|edited" in gmt_file.read_text()
+
+
 def test_sort_gmtp_3d_creates_dirs_and_writes_gmtsddd_file(tmp_path):
     name = "name"
     wrk_dir = tmp_path
@@ -110,3 +162,51 @@ def test_main():
             conversion.main("input_dir", "output_dir", crs="4326")
             mock_conversion_zedfix.assert_called()
             mock_conversion_sort_gmtp_3d.assert_called()
+
+
+def test_main_fused_matches_sort_files(tmp_path):
+    gmt = "\n".join(["# @VGMT1.0 @GLINESTRING", "# @R0/1/0/1", "# @NId|Type", "# @Tinteger|string", "# FEATURE_DATA",
+                     ">", "# @D0|top", "1.5 40", "2.5 45", ">", "# @D0|base", "0.5 60", ">", "# @D0|top", "3 50",
+                     ">", "# @D0|Annotations", "1 1"]) + "\n"
+    outputs = {}
+    for keep_intermediates in (False, True):
+        output_dir = tmp_path / str(keep_intermediates)
+        (output_dir / "interp").mkdir(parents=True)
+        (output_dir / "interp" / "1001_interp.gmt").write_text(gmt)
+        # a path with two *_interp*.shp files has two extent rows
+        (output_dir / "interp" / "active_extent.txt").write_text("1001 0 0 10 100 0 0 10 200\n" * 2)
+        (output_dir / "1001.path.txt").write_text("".join(f"1001 {i} 0 0 {10.0 * i} {20.0 * i} 0 0 5.0\n"
+                                                          for i in range(1, 6)))
+        with mock.patch("aemworkflow.conversion.run_command"):
+            conversion.main(str(output_dir), str(output_dir), "28349", keep_intermediates)
+        outputs[keep_intermediates] = (output_dir / "SORT" / "1001.gmtsddd").read_text()
+        assert (output_dir / "SORT" / "1001_top.srt").exists() is keep_intermediates
+        if keep_intermediates:
+            assert (output_dir / "SORT" / "1001_top.srt").read_text().count(">") == 2
+        assert len((output_dir / "SORT" / "met.bdf").read_text().splitlines()) == 4
+
+    assert outputs[False] == outputs[True]
+    assert [line.split()[-2:] for line in outputs[False].splitlines() if line[0].isdigit()] == \
+        [["1", "1"], ["1", "1"], ["2", "1"], ["3", "2"]]
+
+
+def test_main_jobs_matches_sequential(tmp_path):
+    gmt = "\n".join(["# @VGMT1.0 @GLINESTRING", "# @R0/1/0/1", "# @NId|Type", "# @Tinteger|string", "# FEATURE_DATA",
+                     ">", "# @D0|top", "1.5 40", "2.5 45", ">", "# @D0|base", "0.5 60"]) + "\n"
+    outputs = {}
+    for jobs in (1, 2):
+        output_dir = tmp_path / str(jobs)
+        (output_dir / "interp").mkdir(parents=True)
+        for nm in (1001, 1002):
+            (output_dir / "interp" / f"{nm}_interp.gmt").write_text(gmt)
+            (output_dir / f"{nm}.path.txt").write_text("".join(f"{nm} {i} 0 0 {10.0 * i} {20.0 * i} 0 0 5.0\n"
+                                                               for i in range(1, 6)))
+        (output_dir / "interp" / "active_extent.txt").write_text("1002 0 0 10 100 0 0 10 200\n"
+                                                                 "1001 0 0 10 100 0 0 10 200\n")
+        with mock.patch("aemworkflow.conversion.run_command"):
+            conversion.main(str(output_dir), str(output_dir), "28349", jobs=jobs)
+        outputs[jobs] = {path.name: path.read_text() for path in (output_dir / "SORT").iterdir()}
+
+    assert outputs[1] == outputs[2]
+    assert not [name for name in outputs[2] if name.endswith(".met.bdf")]
+    assert [line.split("_")[0] for line in outputs[2]["met.bdf"].splitlines()] == ["1002", "1002", "1001", "1001"]
@@ -0,0 +1,61 @@
+import json
+from unittest import mock
+
+import pytest
+import shapely
+
+from aemworkflow import crs_registry
+
+
+def test_gmt_headers_memoized_and_persisted(cache_file):
+    with mock.patch.object(crs_registry.osr, "SpatialReference", wraps=crs_registry.osr.SpatialReference) as srs:
+        headers = crs_registry.gmt_headers("28349")
+        assert crs_registry.gmt_headers(28349) is headers
+        assert srs.call_count == 1
+
+    assert headers["Je"] == "28349"
+    assert "+proj=utm" in headers["Jp"]
+    assert '\\"' in headers["Jw"]
+    assert json.loads(cache_file.read_text())["gmt_headers"]["28349"] == headers
+
+
+def test_gmt_headers_read_from_cache_file(cache_file, monkeypatch):
+    crs_registry.gmt_headers(28349)
+    monkeypatch.setattr(crs_registry, "_registry", None)
+
+    with mock.patch.object(crs_registry.osr, "SpatialReference") as srs:
+        assert crs_registry.gmt_headers(28349)["Je"] == "28349"
+        srs.assert_not_called()
+
+
+def test_gmt_headers_ignores_cache_from_other_gdal(cache_file):
+    cache_file.write_text(json.dumps({"gdal_version": "0.0", "gmt_headers": {"28349": {"Je": "stale"}}}))
+    assert crs_registry.gmt_headers(28349)["Je"] == "28349"
+
+
+def test_transformer_ignores_pipelines_from_other_pyproj(cache_file):
+    cache_file.write_text(json.dumps({"gdal_version": crs_registry.osgeo.__version__, "pyproj_version": "0.0/0.0",
+                                      "gmt_headers": {"28349": {"Je": "cached"}},
+                                      "pipelines": {"28349:4326": "+proj=noop"}}))
+    assert crs_registry.gmt_headers(28349)["Je"] == "cached"
+    assert crs_registry.transformer(28349).transform(500000.0, 7000000.0) == pytest.approx((111.0, -27.1224696))
+
+
+def test_transformer_pipeline_cached(cache_file, monkeypatch):
+    to_wgs84 = crs_registry.transformer(28349)
+    assert crs_registry.transformer(28349) is to_wgs84
+    x, y = to_wgs84.transform(500000.0, 7000000.0)
+
+    monkeypatch.setattr(crs_registry, "_registry", None)
+    monkeypatch.setattr(crs_registry, "_transformers", {})
+    with mock.patch.object(crs_registry, "TransformerGroup") as group:
+        assert crs_registry.transformer(28349).transform(500000.0, 7000000.0) == pytest.approx((x, y))
+        group.assert_not_called()
+
+
+def test_reproject(cache_file):
+    line = shapely.linestrings([[500000.0, 7000000.0], [500100.0, 7000100.0]])
+    result = crs_registry.reproject([line], 28349)
+    lon, lat = shapely.get_coordinates(result)[0]
+    assert lon == pytest.approx(111.0)
+    assert lat == pytest.approx(-27.1224696)
@@ -0,0 +1,24 @@
+from aemworkflow import gmt_records
+from aemworkflow.gmt_records import HEADER, METADATA, SEGMENT, VERTICES, GmtRecord
+
+
+def test_gmt_records_groups_vertex_blocks():
+    lines = ["# @VGMT1.0 @GLINESTRING\n", "# FEATURE_DATA\n", ">\n", "# @D0|base|1\n", "12.5 30.0\n",
+             "-3 31.0\n", "\n", ".5 32.0\n", ">@D1|top|2\n", "7 8"]
+    records = list(gmt_records.gmt_records(lines))
+    assert records == [GmtRecord(HEADER, ("# @VGMT1.0 @GLINESTRING",)),
+                       GmtRecord(HEADER, ("# FEATURE_DATA",)),
+                       GmtRecord(SEGMENT, (">",)),
+                       GmtRecord(METADATA, ("# @D0|base|1",)),
+                       GmtRecord(VERTICES, ("12.5 30.0", "-3 31.0", ".5 32.0")),
+                       GmtRecord(METADATA, (">@D1|top|2",)),
+                       GmtRecord(VERTICES, ("7 8",))]
+    assert records[3].line == "# @D0|base|1"
+
+
+def test_read_gmt_records_keeps_leading_spaces(tmp_path):
+    srt = tmp_path / "1001_base.srt"
+    srt.write_text(">\n# @D0|base\n  1.000000 2.000000 1 0\n")
+    records = list(gmt_records.read_gmt_records(srt))
+    assert [record.kind for record in records] == [SEGMENT, METADATA, VERTICES]
+    assert records[2].lines == ("  1.000000 2.000000 1 0",)
@@ -0,0 +1,92 @@
+import datetime
+
+import fiona
+import pyarrow.parquet as pq
+import pytest
+
+from aemworkflow import interp_shapefile
+from aemworkflow.interpretation import active_gmt_metadata_to_bdf
+from aemworkflow.validation import met_rows, validation_remove_quotes
+
+SCHEMA = {"geometry": "LineString",
+          "properties": {"Type": "str:20", "Depth": "float:24.15", "Code": "int:9", "Note": "str:40"}}
+RECORDS = [
+    ({"Type": "base", "Depth": 12.5, "Code": 3, "Note": "a|b"}, [(0.0, 0.0), (1.0, 1.0)]),
+    ({"Type": "top", "Depth": None, "Code": -1, "Note": 'say "hi"'}, [(1.0, 1.0), (2.5, 0.5), (3.0, 2.0)]),
+]
+
+
+def write_shapefile(shp_file_path, records=RECORDS):
+    with fiona.open(shp_file_path, "w", driver="ESRI Shapefile", schema=SCHEMA) as dst:
+        for properties, coordinates in records:
+            dst.write({"geometry": {"type": "LineString", "coordinates": coordinates}, "properties": properties})
+
+
+def test_read_interp_shapefile(tmp_path):
+    shp = tmp_path / "1001_interp_001.shp"
+    write_shapefile(shp)
+    layer = interp_shapefile.read_interp_shapefile(shp)
+    assert [name for name, _ in layer.fields] == ["Type", "Depth", "Code", "Note"]
+    assert layer.records[1] == ("top", None, -1, 'say "hi"')
+    assert layer.parts[1][0].tolist() == [[1.0, 1.0], [2.5, 0.5], [3.0, 2.0]]
+
+
+def test_gmt_field_value():
+    assert interp_shapefile.gmt_field_value(None, "float:24.15") == ""
+    assert interp_shapefile.gmt_field_value(1.25, "float:8.2") == "1.25"
+    assert interp_shapefile.gmt_field_value(1.25, "float") == "1.25"
+    assert interp_shapefile.gmt_field_value(7, "int:9") == "7"
+    assert interp_shapefile.gmt_field_value(datetime.date(2024, 3, 1), "date") == "2024/03/01"
+    assert interp_shapefile.gmt_field_value('fault "A" zone', "str") == '"fault \\"A\\" zone"'
+
+
+def test_write_met_bdf_matches_gmt_text(tmp_path):
+    if fiona.supported_drivers.get("OGR_GMT", "") != "rw":
+        pytest.skip("GDAL GMT driver not available")
+    shp = tmp_path / "1001_interp_001.shp"
+    write_shapefile(shp)
+    gmt = tmp_path / "1001_interp.gmt"
+    with fiona.open(shp) as src, fiona.open(gmt, "w", driver="OGR_GMT", schema=src.schema) as dst:
+        dst.writerecords(src)
+
+    expected = tmp_path / "expected.bdf"
+    active_gmt_metadata_to_bdf(str(gmt), str(expected), "w")
+    bdf = tmp_path / "met.bdf"
+    interp_shapefile.write_met_bdf(interp_shapefile.read_interp_shapefile(shp), gmt.name, bdf, "w")
+    assert bdf.read_text() == expected.read_text()
+
+
+def test_met_table_rows_match_met_bdf(tmp_path):
+    shp = tmp_path / "1001_interp_001.shp"
+    write_shapefile(shp)
+    layer = interp_shapefile.read_interp_shapefile(shp)
+    bdf = tmp_path / "met.bdf"
+    interp_shapefile.write_met_bdf(layer, "1001_interp.gmt", bdf, "w")
+    interp_shapefile.write_met_bdf(layer, "1002_interp.gmt", bdf, "a")
+    table_path = tmp_path / interp_shapefile.MET_TABLE_NAME
+    tables = [interp_shapefile.met_table([(name, layer)]) for name in ("1001_interp.gmt", "1002_interp.gmt")]
+    assert interp_shapefile.write_met_table(tables, table_path)
+
+    rows = list(interp_shapefile.met_table_rows(table_path))
+    bdf_2 = tmp_path / "met_2.bdf"
+    validation_remove_quotes(bdf, bdf_2)
+    # the same fields, line for line, as validation reads from met.bdf
+    assert rows == list(met_rows(bdf_2))
+    assert rows[1][0][:5] == ["1001_interp.gmt", "1", "# @Dtop", "", "-1"]
+    assert any(fields[-2:] == ["a", "b"] for fields, _ in rows)
+    assert str(pq.read_schema(table_path).field("Type").type) == "dictionary<values=string, indices=int32, ordered=0>"
+
+
+def test_write_met_table_removes_stale_table(tmp_path):
+    table_path = tmp_path / interp_shapefile.MET_TABLE_NAME
+    table_path.write_text("stale")
+    layers = [("a.gmt", interp_shapefile.InterpLayer(tmp_path / "a.shp", [("A", "int:9")], [(1,)])),
+              ("b.gmt", interp_shapefile.InterpLayer(tmp_path / "b.shp", [("B", "int:9")], [(2,)])),
+              ("c.gmt", interp_shapefile.InterpLayer(tmp_path / "c.shp", [("A", "int:4")], [(3,)]))]
+    assert interp_shapefile.met_table(layers) is None
+    tables = [interp_shapefile.met_table([layer]) for layer in layers]
+    assert interp_shapefile.write_met_table([tables[0], tables[1]], table_path) is False
+    assert not table_path.exists()
+    # same columns, but the field widths differ and with them the met.bdf text
+    assert interp_shapefile.write_met_table([tables[0], tables[2]], table_path) is False
+    assert interp_shapefile.write_met_table([tables[0], tables[0].slice(0, 0)], table_path) is True
@@ -1,8 +1,14 @@
 import builtins
 import io
 import sys
+from pathlib import Path
 
-from aemworkflow import interpretation
+import geopandas
+import pytest
+from shapely.geometry import LineString
+
+from aemworkflow import interpretation, web_map
+from aemworkflow.interp_shapefile import met_table_rows
 
 
 def test_active_gmt_metadata_to_bdf(tmp_path):
@@ -64,7 +70,28 @@ def test_active_extent_control_file(tmp_path):
     assert out_active_extent.read_text().strip() == "123 456 789 012"
 
 
-def test_main_creates_outputs(monkeypatch, tmp_path):
+@pytest.mark.parametrize("chunk_bytes", [16, 1 << 22])
+def test_active_path_outputs_match_line_by_line_text(tmp_path, chunk_bytes):
+    path_file = tmp_path / "path.txt"
+    path_file.write_text("  7 1 0 0 500000.10 7000000.5 0 0 5\n7 2 0 0\t500001   7000001.250 0 0 5\n"
+                         "17 1 0 0 1e3 2E-1 0 0 5\r\n7 1 0 0 8 9 0 0 1")
+    expected = []
+    line_name = None
+    for path_line in path_file.read_text().splitlines():
+        path_line = path_line.split()
+        if line_name != path_line[0]:
+            line_name = path_line[0]
+            expected += [">\n", f"# @D{line_name}\n"]
+        expected.append(f"{path_line[4]} {path_line[5]}\n")
+
+    text, lines = interpretation.active_path_outputs(path_file, chunk_bytes)
+    assert text == interpretation.active_path_gmt_lines(path_file, chunk_bytes) == "".join(expected)
+    assert [(line_number, coordinates.tolist()) for line_number, coordinates in lines] == [
+        (line_number, coordinates.tolist()) for line_number, coordinates in interpretation.active_path_lines(path_file)]
+
+
+@pytest.mark.parametrize("jobs", [1, 3])
+def test_main_creates_outputs(monkeypatch, tmp_path, jobs):
     # Setup fake input directory and files
     input_dir = tmp_path / "inputs"
     output_dir = tmp_path / "outputs"
@@ -75,19 +102,26 @@ def test_main_creates_outputs(monkeypatch, tmp_path):
     interp_dir.mkdir()
     all_lines_dir.mkdir()
 
-    # Create a fake .shp file and corresponding .extent.txt, .path.txt and .gmt files
-    shp_file = input_dir / "LN1_interp_001.shp"
-    shp_file.touch()
+    # Create the interpretation shapefiles and corresponding .extent.txt, .path.txt and .gmt files
+    geopandas.GeoDataFrame({"Type": ["base", "top"], "Depth": [12.5, 3.0]},
+                           geometry=[LineString([(0, 0), (1, 1)]), LineString([(1, 1), (2, 0)])],
+                           ).to_file(input_dir / "LN1_interp_001.shp")
     extent_file = input_dir / "LN1.extent.txt"
     extent_file.write_text("100 200 300 400")
     path_file = input_dir / "LN1.path.txt"
-    path_file.touch()
+    path_file.write_text("1 1 0 0 500000 7000000 0 0 5\n1 2 0 0 500100 7000100 0 0 6\n")
     gmt_file = interp_dir / "LN1_interp.gmt"
     gmt_file.touch()
+    geopandas.GeoDataFrame({"Type": ["fault zone"], "Depth": [7.25]},
+                           geometry=[LineString([(0, 0), (1, 1)])]).to_file(input_dir / "LN2_interp_001.shp")
+    (input_dir / "LN2.extent.txt").write_text("100 200 300 400")
+    (input_dir / "LN2.path.txt").write_text("2 1 0 0 500200 7000200 0 0 5\n2 2 0 0 500300 7000300 0 0 6\n")
+    (interp_dir / "LN2_interp.gmt").touch()
 
-    # Create a dummy all_lines.geojson for folium
+    # Create a small all_lines.geojson for the map
     all_lines_geojson = all_lines_dir / "all_lines.geojson"
-    all_lines_geojson.write_text('{"type": "FeatureCollection", "features": []}')
+    geopandas.GeoDataFrame({"linenum": [1]}, geometry=[LineString([(121.0, -30.0), (121.1, -30.1)])],
+                           crs="EPSG:4326").to_file(all_lines_geojson, driver="GeoJSON")
 
     # Patch get_ogr_path to return a dummy string
     monkeypatch.setattr(interpretation, "get_ogr_path", lambda: "ogr2ogr")
@@ -98,42 +132,15 @@ def test_main_creates_outputs(monkeypatch, tmp_path):
     # Patch validate_shapefile to pass validation
     monkeypatch.setattr(interpretation, "validate_shapefile", lambda *a, **k: True)
 
-    # Patch geopandas.read_file to return a dummy GeoDataFrame
-    class DummyGeoDF:
-        crs = "epsg:28349"
-
-        def to_crs(self, epsg=None):
-            self.crs = f"epsg:{epsg}"
-            return self
-
-        def to_file(self, *a, **k):
-            # Write a minimal geojson file for folium
-            with open(a[0], "w") as f:
-                f.write('{"type": "FeatureCollection", "features": []}')
-
-    monkeypatch.setattr(interpretation.geopandas, "read_file", lambda *a, **k: DummyGeoDF())
-
-    # Patch folium.Map and folium.GeoJson to dummy classes
-    class DummyLayer:
-        def get_bounds(self):
-            return [[0, 0], [1, 1]]
-
-        def add_to(self, m):
-            return self
+    # Count the maps built, there must be one for the whole run
+    maps = []
+    folium_map = web_map.folium.Map
 
-    class DummyMap:
-        def __init__(self, *a, **k):
-            self.saved = False
+    def counting_map(*a, **k):
+        maps.append(folium_map(*a, **k))
+        return maps[-1]
 
-        def save(self, path):
-            self.saved = True
-
-        def add_to(self, m):
-            return self
-
-    monkeypatch.setattr(interpretation.folium, "Map", DummyMap)
-    monkeypatch.setattr(interpretation.folium, "GeoJson", lambda *a, **k: DummyLayer())
-    monkeypatch.setattr(interpretation.folium, "LayerControl", lambda: DummyLayer())
+    monkeypatch.setattr(web_map.folium, "Map", counting_map)
 
     # Patch open for folium.GeoJson to read geojson
     orig_open = builtins.open
@@ -151,16 +158,200 @@ def test_main_creates_outputs(monkeypatch, tmp_path):
     monkeypatch.setattr(sys, "stdout", output)
 
     # Run main
-    interpretation.main(str(input_dir), str(output_dir))
+    interpretation.main(str(input_dir), str(output_dir), flatgeobuf=True, jobs=jobs)
 
     # Check that output files were created
     assert (interp_dir / "active_extent.txt").exists()
     assert (interp_dir / "active_path.gmt").exists()
-    assert (interp_dir / "met.bdf").exists()
+    assert (interp_dir / "met.bdf").read_text().splitlines() == [
+        "LN1_interp.gmt|0|# @Dbase|12.500000000000000", "LN1_interp.gmt|1|# @Dtop|3.000000000000000",
+        'LN2_interp.gmt|0|# @D"fault zone"|7.250000000000000']
+    assert (interp_dir / "met.parquet").exists()
     assert (interp_dir / "active_path.geojson").exists()
+    assert len(maps) == 1
+    active_path = geopandas.read_file(interp_dir / "active_path.shp")
+    assert list(active_path["linenum"]) == [1, 2]
+    assert active_path.geometry.iloc[1].coords[0] == (500200, 7000200)
+    assert (interp_dir / "active_path_lod0.geojson").exists()
+    assert (interp_dir / "active_path.fgb").exists()
+    assert (all_lines_dir / "all_lines_lod2.geojson").exists()
+    map_html = (output_dir / "map.html").read_text()
+    assert 'map.on("zoomend", update)' in map_html
     # Check that output contains expected prints
     out = output.getvalue()
     assert "create AEM interp box" in out
     assert "layer interval" in out
     assert "layer count" in out
     assert "completed updating map" in out
+
+
+def test_active_path_lines_split_on_line_number(tmp_path):
+    path_file = tmp_path / "path.txt"
+    path_file.write_text("1 1 0 0 1.0 2.0 0 0 5\n1 2 0 0 3.0 4.0 0 0 5\n7 3 0 0 5.0 6.0 0 0 5\n")
+    lines = interpretation.active_path_lines(path_file)
+    assert [line_number for line_number, _ in lines] == [1, 7]
+    assert lines[0][1].tolist() == [[1.0, 2.0], [3.0, 4.0]]
+    assert lines[1][1].tolist() == [[5.0, 6.0]]
+
+
+def test_main_emit_gmt_writes_shared_gmt_file_once(monkeypatch, tmp_path):
+    input_dir = tmp_path / "inputs"
+    output_dir = tmp_path / "outputs"
+    input_dir.mkdir()
+    (output_dir / "all_lines").mkdir(parents=True)
+    geopandas.GeoDataFrame({"linenum": [1]}, geometry=[LineString([(121.0, -30.0), (121.1, -30.1)])],
+                           crs="EPSG:4326").to_file(output_dir / "all_lines" / "all_lines.geojson")
+    for part in ("001", "002"):
+        geopandas.GeoDataFrame({"Type": [part]}, geometry=[LineString([(0, 0), (1, 1)])]).to_file(
+            input_dir / f"LN1_interp_{part}.shp")
+    (input_dir / "LN1.extent.txt").write_text("1 200 300 400\n")
+    (input_dir / "LN1.path.txt").write_text("1 1 0 0 500100 7000000 0 0 5\n1 2 0 0 500150 7000100 0 0 6\n")
+
+    emitted = []
+    monkeypatch.setattr(interpretation, "active_shp_to_gmt", lambda shp, gmt: emitted.append((Path(shp).name, gmt)))
+    interpretation.main(str(input_dir), str(output_dir), emit_gmt=True, jobs=2, build_map=False)
+
+    # the last shapefile in order wins, as when each shapefile was converted in turn
+    assert emitted == [("LN1_interp_002.shp", str(output_dir / "interp" / "LN1_interp.gmt"))]
+
+
+def test_main_incremental_rebuilds_changed_shapefiles_only(monkeypatch, tmp_path):
+    input_dir = tmp_path / "inputs"
+    input_dir.mkdir()
+    for nm in ("1", "2", "3"):
+        geopandas.GeoDataFrame({"Type": [f"unit{nm}"], "Depth": [float(nm)]},
+                               geometry=[LineString([(0, 0), (1, 1)])]).to_file(input_dir / f"LN{nm}_interp.shp")
+        (input_dir / f"LN{nm}.extent.txt").write_text(f"{nm} 200 300 400\n")
+        (input_dir / f"LN{nm}.path.txt").write_text(f"{nm} 1 0 0 500{nm}00 7000000 0 0 5\n"
+                                                    f"{nm} 2 0 0 500{nm}50 7000100 0 0 6\n")
+    for output_dir in (tmp_path / "incremental", tmp_path / "full"):
+        (output_dir / "all_lines").mkdir(parents=True)
+        geopandas.GeoDataFrame({"linenum": [1]}, geometry=[LineString([(121.0, -30.0), (121.1, -30.1)])],
+                               crs="EPSG:4326").to_file(output_dir / "all_lines" / "all_lines.geojson")
+
+    read = []
+    read_line_inputs = interpretation.read_line_inputs
+
+    def counting_read_line_inputs(shp_file_path, *args):
+        read.append(Path(shp_file_path).name)
+        return read_line_inputs(shp_file_path, *args)
+
+    monkeypatch.setattr(interpretation, "read_line_inputs", counting_read_line_inputs)
+
+    def run(output_dir, incremental=True):
+        read.clear()
+        interpretation.main(str(input_dir), str(output_dir), incremental=incremental)
+        return list(read)
+
+    assert run(tmp_path / "incremental") == ["LN1_interp.shp", "LN2_interp.shp", "LN3_interp.shp"]
+    assert run(tmp_path / "incremental") == []
+
+    geopandas.GeoDataFrame({"Type": ["edited", "added"], "Depth": [2.5, 4.0]},
+                           geometry=[LineString([(0, 0), (1, 1)])] * 2).to_file(input_dir / "LN2_interp.shp")
+    (input_dir / "LN3.path.txt").write_text("3 1 0 0 503000 7000000 0 0 5\n3 2 0 0 503070 7000200 0 0 6\n")
+    assert run(tmp_path / "incremental") == ["LN2_interp.shp", "LN3_interp.shp"]
+
+    # the spliced outputs are the ones a full run writes
+    run(tmp_path / "full", incremental=False)
+    for name in ("met.bdf", "active_extent.txt", "active_path.gmt"):
+        assert ((tmp_path / "incremental" / "interp" / name).read_text()
+                == (tmp_path / "full" / "interp" / name).read_text())
+    assert "LN2_interp.gmt|1|# @Dadded|4.000000000000000" in (tmp_path / "full" / "interp" / "met.bdf").read_text()
+    assert (list(met_table_rows(tmp_path / "incremental" / "interp" / "met.parquet"))
+            == list(met_table_rows(tmp_path / "full" / "interp" / "met.parquet")))
+    incremental_path = geopandas.read_file(tmp_path / "incremental" / "interp" / "active_path.shp")
+    full_path = geopandas.read_file(tmp_path / "full" / "interp" / "active_path.shp")
+    assert list(incremental_path["linenum"]) == list(full_path["linenum"]) == [1, 2, 3]
+    assert incremental_path.geometry.equals(full_path.geometry)
+    assert full_path.geometry.iloc[2].coords[-1] == (503070, 7000200)
+
+    # outputs that no longer match the manifest are rebuilt in full
+    with open(tmp_path / "incremental" / "interp" / "active_extent.txt", "a") as active_extent:
+        active_extent.write("extra\n")
+    assert len(run(tmp_path / "incremental")) == 3
+
+    # a run without --incremental hashes nothing and drops the manifest
+    with monkeypatch.context() as patch:
+        patch.setattr(interpretation, "input_fingerprint", None)
+        assert len(run(tmp_path / "incremental", incremental=False)) == 3
+    assert not (tmp_path / "incremental" / interpretation.MANIFEST_NAME).exists()
+    assert len(run(tmp_path / "incremental")) == 3
+
+
+def test_watch_debounces_save_bursts(monkeypatch, tmp_path):
+    (tmp_path / "LN1_interp.shp").write_text("1")
+    (tmp_path / "notes.txt").write_text("ignored")
+    runs = []
+
+    def fake_main(input_directory, output_directory, **options):
+        runs.append(options)
+        if len(runs) == 2:
+            raise SystemExit(1)
+
+    clock = [0.0]
+    edits = {1: ("LN1_interp.shp", "12"), 2: ("LN1_interp.dbf", "1"), 5: ("notes.txt", "still ignored")}
+    sleeps = []
+
+    def fake_sleep(seconds):
+        sleeps.append(seconds)
+        clock[0] += seconds
+        if len(sleeps) in edits:
+            name, text = edits[len(sleeps)]
+            (tmp_path / name).write_text(text)
+        if len(sleeps) == 10:
+            raise KeyboardInterrupt
+
+    monkeypatch.setattr(interpretation, "main", fake_main)
+    monkeypatch.setattr(interpretation.time, "sleep", fake_sleep)
+    monkeypatch.setattr(interpretation.time, "monotonic", lambda: clock[0])
+
+    interpretation.watch(str(tmp_path), str(tmp_path / "out"), poll_interval=2.0, debounce=5.0, jobs=2)
+    # the first run, then one run for the two saves, 6 seconds after the last of them
+    assert runs == [{"jobs": 2, "incremental": True}] * 2
+    assert sleeps == [2.0] * 10
+
+
+def test_watch_reruns_for_saves_during_first_run(monkeypatch, tmp_path):
+    (tmp_path / "LN1_interp.shp").write_text("1")
+    runs = []
+
+    def fake_main(input_directory, output_directory, **options):
+        runs.append(options)
+        if len(runs) == 1:
+            (tmp_path / "LN1_interp.shp").write_text("saved while running")
+
+    clock = [0.0]
+
+    def fake_sleep(seconds):
+        clock[0] += seconds
+        if clock[0] >= 10.0:
+            raise KeyboardInterrupt
+
+    monkeypatch.setattr(interpretation, "main", fake_main)
+    monkeypatch.setattr(interpretation.time, "sleep", fake_sleep)
+    monkeypatch.setattr(interpretation.time, "monotonic", lambda: clock[0])
+
+    interpretation.watch(str(tmp_path), str(tmp_path / "out"), poll_interval=2.0, debounce=3.0)
+    assert len(runs) == 2
+
+
+def test_main_without_map_leaves_it_to_the_map_stage(monkeypatch, tmp_path):
+    input_dir = tmp_path / "inputs"
+    output_dir = tmp_path / "outputs"
+    input_dir.mkdir()
+    output_dir.mkdir()
+    geopandas.GeoDataFrame({"Type": ["unit"], "Depth": [1.0]},
+                           geometry=[LineString([(0, 0), (1, 1)])]).to_file(input_dir / "LN1_interp.shp")
+    (input_dir / "LN1.extent.txt").write_text("1 200 300 400\n")
+    (input_dir / "LN1.path.txt").write_text("1 1 0 0 500100 7000000 0 0 5\n1 2 0 0 500150 7000100 0 0 6\n")
+
+    interpretation.main(str(input_dir), str(output_dir), build_map=False)
+    assert (output_dir / "interp" / "active_path.geojson").exists()
+    assert not (output_dir / "interp" / "active_path_lod0.geojson").exists()
+    assert not (output_dir / "map.html").exists()
+
+    # the active path was recorded with its EPSG:4326 copy, the map stage does not reproject it
+    monkeypatch.setattr(web_map, "reproject", None)
+    web_map.main(str(output_dir))
+    assert (output_dir / "interp" / "active_path_lod0.geojson").exists()
+    assert (output_dir / "map.html").exists()
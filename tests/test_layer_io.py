@@ -0,0 +1,22 @@
+import geopandas
+import numpy as np
+from shapely.geometry import LineString
+
+from aemworkflow import layer_io
+
+
+def test_write_layer_matches_per_feature_write(tmp_path):
+    gdf = geopandas.GeoDataFrame({"linenum": np.array([1, 2], dtype=np.int32)},
+                                 geometry=[LineString([(121.123456789, -30.1), (121.2, -30.2)]),
+                                           LineString([(122.0, -31.0), (122.5, -31.5)])], crs="EPSG:4326")
+    (tmp_path / "bulk").mkdir()
+    (tmp_path / "feature").mkdir()
+    layer_io.write_layer(gdf, tmp_path / "bulk" / "lines.geojson", driver="GeoJSON")
+    gdf.to_file(tmp_path / "feature" / "lines.geojson", driver="GeoJSON", engine="pyogrio", use_arrow=False)
+    assert ((tmp_path / "bulk" / "lines.geojson").read_text()
+            == (tmp_path / "feature" / "lines.geojson").read_text())
+
+    layer_io.write_layer(gdf, tmp_path / "bulk" / "lines.shp")
+    lines = layer_io.read_layer(tmp_path / "bulk" / "lines.shp")
+    assert list(lines["linenum"]) == [1, 2]
+    assert lines.geometry.equals(gdf.geometry)
@@ -0,0 +1,36 @@
+import hashlib
+import json
+
+from aemworkflow import manifest
+
+
+def test_file_digest(tmp_path):
+    path = tmp_path / "1.path.txt"
+    path.write_bytes(b"1 1 1 1 100.0 200.0\n")
+    assert manifest.file_digest(path) == hashlib.sha256(b"1 1 1 1 100.0 200.0\n").hexdigest()
+
+
+def test_save_and_load_manifest(tmp_path):
+    path = tmp_path / "manifest.json"
+    manifest.save_manifest(path, {"params": {"lines": 10}})
+    assert manifest.load_manifest(path) == {"params": {"lines": 10}, "version": manifest.MANIFEST_VERSION}
+    assert list(tmp_path.iterdir()) == [path]
+
+
+def test_load_manifest_missing_or_unusable(tmp_path):
+    path = tmp_path / "manifest.json"
+    assert manifest.load_manifest(path) == {}
+    path.write_text("{not json")
+    assert manifest.load_manifest(path) == {}
+    path.write_text(json.dumps({"version": manifest.MANIFEST_VERSION + 1, "params": {}}))
+    assert manifest.load_manifest(path) == {}
+
+
+def test_load_run_manifest(tmp_path):
+    path = tmp_path / "manifest.json"
+    manifest.save_manifest(path, {"params": {"lines": 10}, "boxes": {}})
+    assert manifest.load_run_manifest(path, {"lines": 10}, True)["boxes"] == {}
+    assert manifest.load_run_manifest(path, {"lines": 20}, True) == {}
+    assert path.exists()
+    assert manifest.load_run_manifest(path, {"lines": 10}, False) == {}
+    assert not path.exists()
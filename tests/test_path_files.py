@@ -0,0 +1,80 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from aemworkflow import path_files
+
+PATH_TEXT = (
+    "1001 1 0 0 500000.25 7000000.5 0 0 12.3\n"
+    "1001 2 1 1 500010.25 7000010.5 0 0 12.35\n"
+    "\n"
+    "1001 3 2 2 500020.25 7000020.5 0 0 -0.1\n"
+)
+
+
+def test_read_path_columns_typed(tmp_path):
+    path_file = tmp_path / "1001.path.txt"
+    path_file.write_text(PATH_TEXT)
+    columns = path_files.read_path_columns(path_file, ("fid", "coordx", "gl"))
+
+    assert list(columns) == ["fid", "coordx", "gl"]
+    assert columns["fid"].dtype == np.int64
+    assert columns["fid"].tolist() == [1, 2, 3]
+    assert columns["coordx"].tolist() == [500000.25, 500010.25, 500020.25]
+    assert columns["gl"].tolist() == [12.3, 12.35, -0.1]
+
+
+@pytest.mark.parametrize("chunk_bytes", [1, 20, 60, 1 << 22])
+def test_chunks_split_on_whole_lines(tmp_path, chunk_bytes):
+    path_file = tmp_path / "1001.path.txt"
+    path_file.write_text(PATH_TEXT)
+    chunks = list(path_files.iter_path_chunks(path_file, ("fid",), chunk_bytes))
+    assert np.concatenate([chunk["fid"] for chunk in chunks]).tolist() == [1, 2, 3]
+    assert len(chunks) == 1 if chunk_bytes > len(PATH_TEXT) else len(chunks) >= 3
+
+
+@pytest.mark.parametrize("chunk_bytes", [1, 20, 1 << 22])
+def test_path_tokens_match_split(tmp_path, chunk_bytes):
+    path_file = tmp_path / "1001.path.txt"
+    path_file.write_text(PATH_TEXT.replace(" 0 0 ", "\t0  0\t"))
+    tokens = []
+    for data, starts, ends in path_files.iter_path_tokens(path_file, chunk_bytes):
+        assert starts.shape[1:] == (len(path_files.PATH_COLUMNS),)
+        tokens += [data[start:end].tobytes() for start, end in zip(starts.ravel(), ends.ravel())]
+        if len(starts):
+            assert path_files.token_text(data, starts[:, 4], ends[:, 4]).astype(np.float64).tolist() == [
+                float(data[start:end].tobytes()) for start, end in zip(starts[:, 4], ends[:, 4])]
+    assert tokens == path_file.read_bytes().split()
+
+
+def test_read_path_file_matches_read_csv(tmp_path):
+    path_file = tmp_path / "1001.path.txt"
+    path_file.write_text(PATH_TEXT)
+    expected = pd.read_csv(path_file, sep=r"\s+", names=path_files.PATH_COLUMNS, header=None, index_col=False)
+    # pixel columns come back as float64 whatever their text looks like
+    pd.testing.assert_frame_equal(path_files.read_path_file(path_file, chunk_bytes=50), expected, check_dtype=False)
+
+
+def test_read_path_file_empty_and_malformed(tmp_path):
+    path_file = tmp_path / "1001.path.txt"
+    path_file.write_text("")
+    assert path_files.read_path_file(path_file).empty
+    path_file.write_text("1001 1 0 0 500000.25\n")
+    with pytest.raises(ValueError, match="expected 9 columns"):
+        path_files.read_path_columns(path_file)
+
+
+def test_interpolate_fiducials_keeps_extrapolation_rules():
+    tdf = pd.DataFrame({"fid": [1, 2, 3], "coordx": [10.0, 20.0, 40.0], "coordy": [100.0, 200.0, 200.0],
+                        "gl": [5.0, 15.0, 10.0]})
+    x, y, gl = path_files.interpolate_fiducials([0.5, 1.25, 2.0, -0.5, 3.0], 0, 2, tdf)
+    assert x.tolist() == [15.0, 25.0, 40.0, 5.0, 60.0]
+    assert y.tolist() == [150.0, 200.0, 200.0, 50.0, 200.0]
+    assert gl.tolist() == [10.0, 13.75, 10.0, 0.0, 5.0]
+    assert [values.tolist() for values in path_files.interpolate_fiducials([], 0, 2, tdf)] == [[], [], []]
+
+
+def test_interpolate_fiducials_rejects_positions_off_the_path():
+    tdf = pd.DataFrame({"fid": [3, 4], "coordx": [1.0, 2.0], "coordy": [1.0, 2.0], "gl": [1.0, 2.0]})
+    with pytest.raises(ValueError):
+        path_files.interpolate_fiducials([0.5], 0, 3, tdf)
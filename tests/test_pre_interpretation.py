@@ -1,5 +1,11 @@
+import decimal
+import json
+import os
+
+import fiona
 import folium
 import geopandas as gpd
+import numpy as np
 import pytest
 
 from aemworkflow import pre_interpretation
@@ -23,6 +29,53 @@ def test_all_lines_creates_gmt_file(tmp_path):
     assert "110.0 210.0" in content
 
 
+def test_build_all_lines_one_linestring_per_path_file(tmp_path):
+    path_1 = tmp_path / "1001.path.txt"
+    path_1.write_text("1001 1 0 0 500000.0 7000000.0 0 0 9\n1001 2 0 0 500010.0 7000010.0 0 0 9\n")
+    path_2 = tmp_path / "1002.path.txt"
+    path_2.write_text("1002 1 0 0 500100.0 7000100.0 0 0 9\n1002 2 0 0 500110.0 7000110.0 0 0 9\n"
+                      "1002 3 0 0 500120.0 7000120.0 0 0 9\n")
+    shp_file = tmp_path / "all_lines.shp"
+    geojson_file = tmp_path / "all_lines.geojson"
+
+    result, rows = pre_interpretation.build_all_lines([str(path_1), str(path_2)], str(shp_file), str(geojson_file),
+                                                      28349)
+
+    assert result.crs.to_epsg() == 4326
+    assert rows == ["1001.path.txt", "1002.path.txt"]
+    written = gpd.read_file(shp_file)
+    assert written.crs.to_epsg() == 28349
+    assert written["linenum"].tolist() == [1001, 1002]
+    assert [len(g.coords) for g in written.geometry] == [2, 3]
+    assert list(written.geometry[1].coords)[2] == (500120.0, 7000120.0)
+    assert {"flightnum", "date", "Survey", "Company", "Status"} <= set(written.columns)
+    assert gpd.read_file(geojson_file).crs.to_epsg() == 4326
+
+
+def test_all_lines_skip_single_point_path_files(tmp_path, capsys):
+    paths = {nm: tmp_path / f"{nm}.path.txt" for nm in ("1001", "1002", "1003")}
+    paths["1001"].write_text("1001 1 0 0 500000.0 7000000.0 0 0 9\n1001 2 0 0 500010.0 7000010.0 0 0 9\n")
+    paths["1002"].write_text("1002 1 0 0 500100.0 7000100.0 0 0 9\n")
+    paths["1003"].write_text("1003 1 0 0 500200.0 7000200.0 0 0 9\n1003 2 0 0 500210.0 7000210.0 0 0 9\n")
+    path_files = [str(path) for path in paths.values()]
+    shp_file = tmp_path / "all_lines.shp"
+    geojson_file = tmp_path / "all_lines.geojson"
+
+    _, rows = pre_interpretation.build_all_lines(path_files, str(shp_file), str(geojson_file), 28349)
+    assert rows == ["1001.path.txt", "1003.path.txt"]
+    assert gpd.read_file(shp_file)["linenum"].tolist() == [1001, 1003]
+    assert f"Skipping single point path file {paths['1002']}" in capsys.readouterr().err
+
+    # the single point line gains a fiducial, the other one loses one
+    paths["1002"].write_text("1002 1 0 0 500100.0 7000100.0 0 0 9\n1002 2 0 0 500110.0 7000110.0 0 0 9\n")
+    paths["1003"].write_text("1003 1 0 0 500200.0 7000200.0 0 0 9\n")
+    _, rows = pre_interpretation.patch_all_lines(path_files, rows, {"1003.path.txt"}, str(shp_file),
+                                                 str(geojson_file), 28349)
+    assert rows == ["1001.path.txt", "1002.path.txt"]
+    assert gpd.read_file(shp_file)["linenum"].tolist() == [1001, 1002]
+    assert gpd.read_file(geojson_file)["linenum"].tolist() == [1001, 1002]
+
+
 def test_print_boxes_writes_box(tmp_path):
     out_file_path = tmp_path / "box.txt"
     with open(out_file_path, "w") as out_file:
@@ -56,6 +109,77 @@ def test_box_elevation_creates_box_gmt(tmp_path):
     assert ">\n" in content
 
 
+@pytest.mark.parametrize("ypo", [0.5, 0.0, 0.03125])
+def test_box_elevation_numpy_matches_decimal(tmp_path, ypo):
+    extent_file = tmp_path / "test.extent.txt"
+    extent_file.write_text("1 0 10 30 400 2 -150 3 450\n")
+    path_file = tmp_path / "test.path.txt"
+    ground = [120, 100.00005, 150.03125, 0, -12.34565, 300.5, 87.654321, 250]
+    path_file.write_text("".join(f"1 {i} 0 0 0 0 0 0 {gl}\n" for i, gl in enumerate(ground, 1)))
+
+    decimal_file = tmp_path / "decimal.box.gmt"
+    numpy_file = tmp_path / "numpy.box.gmt"
+    pre_interpretation.box_elevation(str(extent_file), str(path_file), str(decimal_file), 10, 30, ypo, ypo,
+                                     engine="decimal")
+    pre_interpretation.box_elevation(str(extent_file), str(path_file), str(numpy_file), 10, 30, ypo, ypo)
+
+    assert numpy_file.read_bytes() == decimal_file.read_bytes()
+
+
+def test_round_half_up_matches_decimal():
+    values = [0.03125, -0.03125, 1.00005, 2.5, -0.00001, 100.0, 120.0]
+    for from_repr in (False, True):
+        units = pre_interpretation.round_half_up(np.array(values), from_repr=from_repr)
+        expected = [str(round(decimal.Decimal(repr(v) if from_repr else v), 4).normalize()) for v in values]
+        assert list(pre_interpretation.format_normalized(units)) == expected
+
+
+def test_box_elevation_shp_matches_gmt_text(tmp_path):
+    extent_file = tmp_path / "test.extent.txt"
+    extent_file.write_text("1 20 10 30 40 2 100 3 200\n")
+    path_file = tmp_path / "test.path.txt"
+    path_file.write_text("0 1 0 0 0 0 0 0 120\n0 2 0 0 0 0 0 0 140.00005\n0 3 0 0 0 0 0 0 150\n")
+    gmt_file = tmp_path / "test.box.gmt"
+    shp_file = tmp_path / "test.box.shp"
+
+    pre_interpretation.box_elevation(str(extent_file), str(path_file), str(gmt_file), 3, 30, 0.5, 0.5)
+    pre_interpretation.box_elevation_shp(str(extent_file), str(path_file), str(shp_file), 3, 30, 0.5, 0.5)
+
+    expected = []
+    for segment in gmt_file.read_text().split(">\n")[1:]:
+        rows = segment.splitlines()
+        expected.append((rows[0][len("# @D"):], [tuple(float(v) for v in row.split()) for row in rows[1:]]))
+
+    with fiona.open(shp_file) as src:
+        written = [(f["properties"]["linename"], [tuple(c) for c in f["geometry"]["coordinates"]]) for f in src]
+    assert written == expected
+    assert [name for name, _ in written] == ["extent", "upper_left", "lower_right", "ground_level", "30", "60", "90"]
+
+
+def test_box_elevation_shp_matches_ogr2ogr_output(tmp_path):
+    pytest.importorskip("osgeo.ogr")
+    extent_file = tmp_path / "test.extent.txt"
+    extent_file.write_text("1 20 10 30 40 2 100 3 200\n")
+    path_file = tmp_path / "test.path.txt"
+    path_file.write_text("0 1 0 0 0 0 0 0 120\n0 2 0 0 0 0 0 0 140.00005\n0 3 0 0 0 0 0 0 150\n")
+    gmt_file = tmp_path / "test.box.gmt"
+    old_shp_file = tmp_path / "old" / "test.box.shp"
+    shp_file = tmp_path / "test.box.shp"
+    old_shp_file.parent.mkdir()
+
+    # the .box.gmt to .box.shp translation ogr2ogr made before the shapefile was written directly
+    pre_interpretation.box_elevation(str(extent_file), str(path_file), str(gmt_file), 3, 30, 0.5, 0.5)
+    with fiona.open(gmt_file) as src, fiona.open(old_shp_file, "w", driver="ESRI Shapefile", schema=src.schema,
+                                                 crs=src.crs) as dst:
+        dst.writerecords(src)
+    pre_interpretation.box_elevation_shp(str(extent_file), str(path_file), str(shp_file), 3, 30, 0.5, 0.5)
+
+    with fiona.open(old_shp_file) as old, fiona.open(shp_file) as new:
+        assert new.schema == old.schema == {"properties": {"linename": "str:80"}, "geometry": "LineString"}
+        old_features = [(f["properties"]["linename"], f["geometry"]["coordinates"]) for f in old]
+        assert [(f["properties"]["linename"], f["geometry"]["coordinates"]) for f in new] == old_features
+
+
 def test_all_lines_appends_when_mode_a(tmp_path):
     path_file = tmp_path / "test2.path.txt"
     path_file.write_text("1 2 3 4 120.0 220.0 7 8 9\n")
@@ -98,39 +222,124 @@ def test_main_prints_bounds(monkeypatch, tmp_path, capsys):
     # Create minimal path and extent files
     (input_dir / "1.path.txt").write_text("1 1 1 1 100.0 200.0 7 8 9\n1 1 4 5 110.0 210.0 8 9 10\n")
     (input_dir / "1.extent.txt").write_text("1 20 10 30 40 2 100 3 200\n")
-    # Patch run_command to avoid actually running ogr2ogr
-    monkeypatch.setattr(pre_interpretation, "run_command", lambda *a, **k: None)
-    # Patch get_ogr_path to return a dummy string
-    monkeypatch.setattr(pre_interpretation, "get_ogr_path", lambda: "ogr2ogr")
-    # Patch geopandas.read_file to return a dummy GeoDataFrame
-    dummy_gdf = gpd.GeoDataFrame({"geometry": []}, geometry="geometry", crs="EPSG:4326")
-    monkeypatch.setattr(gpd, "read_file", lambda *a, **k: dummy_gdf)
-    # Patch GeoDataFrame.to_crs to just return self
-    monkeypatch.setattr(dummy_gdf, "to_crs", lambda *a, **k: dummy_gdf)
-    # Patch folium.Map and folium.GeoJson to avoid file IO
-
-    class DummyMap:
-        def __init__(self, *a, **k):
-            pass
-
-        def save(self, *a, **k):
-            pass
+    # Patch folium.GeoJson to avoid serialising the layers
 
-    class DummyGeoJson:
+    class DummyGeoJson(folium.FeatureGroup):
         def __init__(self, *a, **k):
-            pass
-
-        def add_to(self, m):
-            return self
+            super().__init__()
 
         def get_bounds(self):
             return [[0, 0], [1, 1]]
 
-    monkeypatch.setattr(folium, "Map", DummyMap)
     monkeypatch.setattr(folium, "GeoJson", DummyGeoJson)
     # Run main and ensure no exception
     pre_interpretation.main(
-        str(input_dir), str(output_dir), crs="4326", gis="esri_arcmap_0.5", lines=2, lines_increment=10
+        str(input_dir), str(output_dir), crs="4326", gis="esri_arcmap_0.5", lines=2, lines_increment=10,
+        flatgeobuf=True
     )
     out = capsys.readouterr().out
-    assert "bounds are: [[0, 0], [1, 1]]" in out
+    assert "bounds are: [[200.0, 100.0], [210.0, 110.0]]" in out
+    assert (output_dir / "all_lines" / "all_lines.fgb").exists()
+    assert (output_dir / "all_lines" / "all_lines.shp").exists()
+    assert (output_dir / "all_lines" / "all_lines.geojson").exists()
+    assert (output_dir / "all_lines" / "all_lines_lod0.geojson").exists()
+    assert (output_dir / "map.html").exists()
+
+
+@pytest.mark.parametrize("jobs", [1, 2])
+def test_main_jobs_report_failed_line(tmp_path, capsys, jobs):
+    input_dir = tmp_path / "input"
+    output_dir = tmp_path / "output"
+    input_dir.mkdir()
+    output_dir.mkdir()
+    for nm in ("1", "2", "3"):
+        (input_dir / f"{nm}.path.txt").write_text(f"{nm} 1 1 1 100.0 200.0 7 8 9\n{nm} 2 4 5 110.0 210.0 8 9 10\n")
+        (input_dir / f"{nm}.extent.txt").write_text(f"{nm} 20 10 30 40 2 100 3 200\n")
+    # a malformed extent file must only fail its own line
+    (input_dir / "2.extent.txt").write_text("2 20 10\n")
+
+    pre_interpretation.main(str(input_dir), str(output_dir), crs="4326", lines=2, lines_increment=10, jobs=jobs,
+                            emit_gmt=True, incremental=True)
+
+    # every line is built whatever the mode, the failures are all reported
+    err = capsys.readouterr().err
+    failed = [line for line in err.splitlines() if line.startswith("Error processing line")]
+    assert len(failed) == 1
+    assert "2.path.txt" in failed[0]
+    assert (output_dir / "box" / "1.box.gmt").read_text().count("# @D") == 6
+    assert (output_dir / "box" / "3.box.gmt").exists()
+    assert (output_dir / "all_lines" / "all_lines.shp").exists()
+    boxes = json.loads((output_dir / pre_interpretation.MANIFEST_NAME).read_text())["boxes"]
+    assert sorted(boxes) == ["1.path.txt", "3.path.txt"]
+
+
+def test_main_incremental_rebuilds_changed_lines_only(monkeypatch, tmp_path):
+    input_dir = tmp_path / "input"
+    output_dir = tmp_path / "output"
+    input_dir.mkdir()
+    output_dir.mkdir()
+    for nm in ("1", "2", "3"):
+        (input_dir / f"{nm}.path.txt").write_text(f"{nm} 1 1 1 100.0 200.0 7 8 9\n{nm} 2 4 5 110.0 210.0 8 9 10\n")
+        (input_dir / f"{nm}.extent.txt").write_text(f"{nm} 20 10 30 40 2 100 3 200\n")
+
+    built = []
+    build_line_box = pre_interpretation.build_line_box
+
+    def counting_build_line_box(path_file_path, *args):
+        built.append(os.path.basename(path_file_path))
+        return build_line_box(path_file_path, *args)
+
+    monkeypatch.setattr(pre_interpretation, "build_line_box", counting_build_line_box)
+
+    def run():
+        built.clear()
+        pre_interpretation.main(str(input_dir), str(output_dir), crs="4326", lines=2, lines_increment=10,
+                                incremental=True)
+        return list(built)
+
+    assert run() == ["1.path.txt", "2.path.txt", "3.path.txt"]
+    assert (output_dir / pre_interpretation.MANIFEST_NAME).exists()
+    assert run() == []
+
+    (input_dir / "2.path.txt").write_text("2 1 1 1 105.0 205.0 7 8 9\n2 2 4 5 115.0 215.0 8 9 10\n")
+    (input_dir / "4.path.txt").write_text("4 1 1 1 120.0 220.0 7 8 9\n4 2 4 5 130.0 230.0 8 9 10\n")
+    (input_dir / "4.extent.txt").write_text("4 20 10 30 40 2 100 3 200\n")
+    assert run() == ["2.path.txt", "4.path.txt"]
+
+    all_lines = gpd.read_file(output_dir / "all_lines" / "all_lines.shp")
+    assert list(all_lines["linenum"]) == [1, 2, 3, 4]
+    assert all_lines.geometry.iloc[1].coords[0] == (105.0, 205.0)
+    assert all_lines.geometry.iloc[3].coords[-1] == (130.0, 230.0)
+    assert len(gpd.read_file(output_dir / "all_lines" / "all_lines.geojson")) == 4
+
+    # a run without --incremental hashes nothing and drops the manifest, the next incremental run rebuilds all
+    with monkeypatch.context() as patch:
+        patch.setattr(pre_interpretation, "file_digest", None)
+        pre_interpretation.main(str(input_dir), str(output_dir), crs="4326", lines=2, lines_increment=10)
+    assert not (output_dir / pre_interpretation.MANIFEST_NAME).exists()
+    assert len(run()) == 4
+
+    # a changed parameter invalidates every line
+    built.clear()
+    pre_interpretation.main(str(input_dir), str(output_dir), crs="4326", lines=3, lines_increment=10,
+                            incremental=True)
+    assert len(built) == 4
+
+
+def test_main_pairs_path_and_extent_files_by_name(tmp_path, capsys):
+    input_dir = tmp_path / "input"
+    output_dir = tmp_path / "output"
+    input_dir.mkdir()
+    output_dir.mkdir()
+    (input_dir / "1.path.txt").write_text("1 1 1 1 100.0 200.0 7 8 9\n1 2 4 5 110.0 210.0 8 9 10\n")
+    (input_dir / "1.extent.txt").write_text("1 20 10 30 40 2 100 3 200\n")
+    (input_dir / "3.path.txt").write_text("3 1 1 1 100.0 200.0 7 8 9\n3 2 4 5 110.0 210.0 8 9 10\n")
+    (input_dir / "2.extent.txt").write_text("2 20 10 30 40 2 100 3 200\n")
+
+    pre_interpretation.main(str(input_dir), str(output_dir), crs="4326", lines=2, lines_increment=10)
+
+    captured = capsys.readouterr()
+    assert "Path and Extent numbers not matching up:2:2" in captured.out
+    assert "no matching path/extent file for 2.extent.txt" in captured.err
+    assert "no matching path/extent file for 3.path.txt" in captured.err
+    assert sorted(path.name for path in (output_dir / "box").glob("*.shp")) == ["1.box.shp"]
@@ -1,10 +1,13 @@
 import subprocess
 from unittest import mock
 
+import geopandas
 import pytest
 from fiona.errors import DriverError
+from shapely.geometry import LineString
 
 import aemworkflow.utilities as utilities
+from aemworkflow.catalogue import InputCatalogue
 
 logger_session = mock.MagicMock()
 
@@ -200,3 +203,72 @@ def test_find_geometry_file(tmp_path):
     with pytest.raises(FileNotFoundError):
         utilities.find_geometry_file(tmp_path, "missing file", "path", logger_session)
     logger_session.error.assert_called()
+
+
+def test_validate_shapefile_with_catalogue(tmp_path):
+    (tmp_path / "a.shp").write_text("")
+    (tmp_path / "a.shx").write_text("")
+    cat = InputCatalogue(tmp_path)
+    with mock.patch("os.walk", side_effect=AssertionError("no listing expected")):
+        assert utilities.validate_shapefile(tmp_path, logger_session, catalogue=cat) is False
+    logger_session.error.assert_called_with("Shapefile a.shp is missing a.dbf.")
+
+
+def test_validate_shapefile_jobs(tmp_path):
+    for name in ("a", "b", "c"):
+        for suffix in (".shp", ".shx", ".dbf"):
+            (tmp_path / f"{name}{suffix}").write_text("")
+    (tmp_path / "c.dbf").unlink()
+    with mock.patch("aemworkflow.utilities.fiona.open") as mock_fiona_open:
+        mock_fiona_open.return_value.__enter__.return_value.__len__.return_value = 1
+        assert utilities.validate_shapefile(tmp_path, logger_session, jobs=3) is False
+        (tmp_path / "c.dbf").write_text("")
+        assert utilities.validate_shapefile(tmp_path, logger_session, jobs=3) is True
+    assert mock_fiona_open.call_count == 5
+
+
+def write_lines(shp_path, count):
+    geopandas.GeoDataFrame({"id": list(range(count))},
+                           geometry=[LineString([(0, 0), (i, 1)]) for i in range(count)]).to_file(shp_path)
+
+
+def test_shapefile_record_counts(tmp_path):
+    write_lines(tmp_path / "a.shp", 3)
+    assert utilities.shapefile_record_counts(str(tmp_path / "a.shp")) == (3, 3)
+    (tmp_path / "a.shx").write_bytes(b"not a shapefile")
+    assert utilities.shapefile_record_counts(str(tmp_path / "a.shp")) is None
+
+
+def test_validate_shapefile_fast_cache(tmp_path):
+    input_dir = tmp_path / "inputs"
+    input_dir.mkdir()
+    write_lines(input_dir / "a.shp", 2)
+    write_lines(input_dir / "b.shp", 1)
+    cache_path = tmp_path / utilities.VALIDATION_CACHE_NAME
+    with mock.patch("aemworkflow.utilities.fiona.open") as mock_fiona_open:
+        assert utilities.validate_shapefile(input_dir, logger_session, cache_path=cache_path) is True
+    mock_fiona_open.assert_not_called()
+    assert sorted(utilities.load_manifest(cache_path)["shapefiles"]) == [str(input_dir / "a.shp"),
+                                                                         str(input_dir / "b.shp")]
+
+    # unchanged files are not read again, a rewritten one is
+    write_lines(input_dir / "b.shp", 0)
+    with mock.patch("aemworkflow.utilities.shapefile_record_counts",
+                    wraps=utilities.shapefile_record_counts) as mock_counts:
+        assert utilities.validate_shapefile(input_dir, logger_session, cache_path=cache_path) is False
+    mock_counts.assert_called_once_with(str(input_dir / "b.shp"))
+    logger_session.error.assert_called_with("Shapefile b.shp contains no features.")
+    assert list(utilities.load_manifest(cache_path)["shapefiles"]) == [str(input_dir / "a.shp")]
+
+
+def test_writer_pool_reopens_evicted_writers_in_append_mode(tmp_path):
+    (tmp_path / "a.srt").write_text("old\n")
+    with mock.patch("builtins.open", wraps=open) as mock_open:
+        with utilities.WriterPool(max_open=2) as writers:
+            for name in ("a", "b", "a", "c", "a", "b"):
+                writers.write(tmp_path / f"{name}.srt", f"{name}\n")
+    # b and then c are the least recently written file when the pool is full, a stays open
+    assert [call.args[0] for call in mock_open.call_args_list] == [str(tmp_path / f"{name}.srt") for name in "abcb"]
+    assert (tmp_path / "a.srt").read_text() == "old\na\na\na\n"
+    assert (tmp_path / "b.srt").read_text() == "b\nb\n"
+    assert (tmp_path / "c.srt").read_text() == "c\n"
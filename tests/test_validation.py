@@ -3,7 +3,7 @@ from unittest import mock
 
 import pytest
 
-from aemworkflow import validation
+from aemworkflow import interp_shapefile, validation
 
 
 class DummyLogger:
@@ -92,4 +92,38 @@ def test_validation_main_removes_quotes_and_validates(tmp_path):
         with mock.patch("aemworkflow.validation.validation_qc_units") as qc_units:
             validation.main(str(input_dir), str(output_dir), "test.asud")
             remove_quotes.assert_called_once_with(bdf_path, os.path.join(output_dir, "qc", "met2.bdf"))
-            qc_units.assert_called_once_with(erc_path, os.path.join(output_dir, "qc", "met2.bdf"), str(output_dir))
+            qc_units.assert_called_once_with(erc_path, os.path.join(output_dir, "qc", "met2.bdf"), str(output_dir),
+                                             met_table_path=None)
+
+
+def test_validation_qc_units_met_table(tmp_path, dummy_logger):
+    validation_dir = tmp_path
+    os.makedirs(os.path.join(validation_dir, "qc"), exist_ok=True)
+    erc_path = os.path.join(validation_dir, "ERC_Stratigraphic_names_Current.txt")
+    with open(erc_path, "w", encoding="utf-8") as f:
+        f.write("|".join(["unit1", "num1"] + ["x"] * 41) + "\n")
+    fields = [(f"F{index}", "str:20") for index in range(23)]
+    records = []
+    for unit, number in (("unit1", "num1"), ("unit 2", "num2")):
+        record = [""] * 23
+        record[5], record[6] = unit, number
+        records.append(tuple(record))
+    layer = interp_shapefile.InterpLayer(tmp_path / "a.shp", fields, records)
+    table_path = tmp_path / "met.parquet"
+    interp_shapefile.write_met_table([interp_shapefile.met_table([("a_interp.gmt", layer)])], table_path)
+    bdf_path = tmp_path / "met.bdf"
+    interp_shapefile.write_met_bdf(layer, "a_interp.gmt", bdf_path, "w")
+    bdf_2_path = os.path.join(validation_dir, "qc", "met2.bdf")
+    validation.validation_remove_quotes(bdf_path, bdf_2_path, dummy_logger)
+
+    validation.validation_qc_units(erc_path, bdf_2_path, validation_dir, dummy_logger)
+    error_list_path = os.path.join(validation_dir, "qc", "error_list.log")
+    with open(error_list_path) as f:
+        from_text = f.read()
+    os.remove(error_list_path)
+    with mock.patch("builtins.open", wraps=open) as mock_open:
+        validation.validation_qc_units(erc_path, bdf_2_path, validation_dir, dummy_logger, met_table_path=table_path)
+    assert bdf_2_path not in [call.args[0] for call in mock_open.call_args_list]
+    with open(error_list_path) as f:
+        assert f.read() == from_text
+    assert "over|unit 2|num2|a_interp.gmt|1|# @D|" in from_text
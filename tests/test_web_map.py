@@ -0,0 +1,68 @@
+import json
+
+import geopandas
+import pytest
+from shapely.geometry import LineString
+
+from aemworkflow import web_map, web_preview
+
+
+def write_all_lines(output_dir, offset=0.0):
+    (output_dir / "all_lines").mkdir(exist_ok=True)
+    gdf = geopandas.GeoDataFrame({"linenum": [1, 2]},
+                                 geometry=[LineString([(400000 + offset, 6600000), (410000, 6610000)]),
+                                           LineString([(420000, 6620000), (430000, 6630000)])],
+                                 crs="EPSG:28349")
+    gdf.to_file(output_dir / "all_lines" / "all_lines.shp")
+    return gdf
+
+
+def test_main_reprojects_only_changed_layers(monkeypatch, tmp_path, capsys):
+    write_all_lines(tmp_path)
+    web_map.main(str(tmp_path))
+
+    geojson = geopandas.read_file(tmp_path / "all_lines" / "all_lines.geojson")
+    assert geojson.crs.to_epsg() == 4326
+    assert geojson.geometry.iloc[0].coords[0] == pytest.approx((109.96, -30.70), abs=0.05)
+    assert (tmp_path / "all_lines" / "all_lines_lod0.geojson").exists()
+    html = (tmp_path / "map.html").read_text()
+    assert 'map.on("zoomend", update)' in html
+    assert "all_lines_lod" not in html
+    assert html.count('"LineString"') == 2 * len(web_preview.LEVELS)
+    manifest = json.loads((tmp_path / web_map.MANIFEST_NAME).read_text())
+    assert list(manifest["layers"]) == ["all-lines"]
+    out = capsys.readouterr().out
+    assert "bounds are:" in out
+    assert "completed updating map" in out
+
+    calls = []
+    reproject = web_map.reproject
+    monkeypatch.setattr(web_map, "reproject", lambda *a: calls.append(a) or reproject(*a))
+    web_map.main(str(tmp_path))
+    assert calls == []
+
+    write_all_lines(tmp_path, offset=500.0)
+    web_map.main(str(tmp_path))
+    assert len(calls) == 1
+    geojson = geopandas.read_file(tmp_path / "all_lines" / "all_lines.geojson")
+    assert geojson.geometry.iloc[0].coords[0][0] > 109.96
+
+
+def test_main_fetch_previews_embeds_coarsest_level(tmp_path):
+    write_all_lines(tmp_path)
+    web_map.main(str(tmp_path), fetch_previews=True)
+
+    html = (tmp_path / "map.html").read_text()
+    assert '"all_lines/all_lines_lod1.geojson"' in html and '"all_lines/all_lines_lod2.geojson"' in html
+    assert html.count('"LineString"') == 2
+
+
+def test_record_layer_skips_reprojection(monkeypatch, tmp_path):
+    gdf = write_all_lines(tmp_path)
+    gdf.to_crs(4326).to_file(tmp_path / "all_lines" / "all_lines.geojson", driver="GeoJSON")
+    web_map.record_layer(str(tmp_path), "all-lines")
+
+    monkeypatch.setattr(web_map, "reproject", None)
+    web_map.main(str(tmp_path))
+    assert (tmp_path / "all_lines" / "all_lines_lod2.geojson").exists()
+    assert (tmp_path / "map.html").exists()
@@ -0,0 +1,83 @@
+import os
+
+import folium
+import geopandas
+import numpy as np
+from shapely.geometry import LineString
+
+from aemworkflow import web_preview
+
+
+def wiggly_lines():
+    x = np.linspace(121.0, 122.0, 1001)
+    y = -30.0 + 0.00005 * np.sin(np.arange(1001))
+    return geopandas.GeoDataFrame({"linenum": [1, 2]},
+                                  geometry=[LineString(np.column_stack([x, y])),
+                                            LineString(np.column_stack([x, y - 0.5]))],
+                                  crs="EPSG:4326")
+
+
+def test_simplify_levels_coarsest_first():
+    gdf = wiggly_lines()
+    previews = web_preview.simplify_levels(gdf)
+    counts = [int(preview.geometry.count_coordinates().sum()) for preview in previews]
+    assert len(previews) == len(web_preview.LEVELS)
+    assert counts == sorted(counts)
+    assert counts[0] == 4
+    assert list(previews[0]["linenum"]) == [1, 2]
+    assert gdf.geometry.count_coordinates().sum() == 2002
+
+
+def test_read_previews_regenerates_stale_files(tmp_path):
+    geojson_path = tmp_path / "all_lines.geojson"
+    wiggly_lines().to_file(geojson_path, driver="GeoJSON")
+
+    previews = web_preview.read_previews(geojson_path)
+    paths = web_preview.preview_paths(geojson_path)
+    assert all(os.path.isfile(path) for path in paths)
+    assert len(previews[0]) == 2
+
+    os.utime(paths[1], (0, 0))
+    os.remove(paths[2])
+    web_preview.read_previews(geojson_path)
+    assert os.path.getmtime(paths[1]) >= os.path.getmtime(geojson_path)
+    assert os.path.isfile(paths[2])
+
+
+def test_preview_layer_switches_level_on_zoom():
+    m = folium.Map(location=[-30.80, 141.264160], zoom_start=5)
+    layer = web_preview.PreviewLayer(web_preview.simplify_levels(wiggly_lines()), name="all-lines").add_to(m)
+    folium.LayerControl().add_to(m)
+    html = m.get_root().render()
+
+    assert np.allclose(layer.get_bounds(), [[-30.5, 121.0], [-30.0, 122.0]], atol=1e-4)
+    assert html.count(f".addTo({layer.get_name()})") == len(web_preview.LEVELS)
+    assert f"{{layer: {layer.layers[2].get_name()}, url: null," in html
+    assert "minZoom: 0, maxZoom: 7}" in html
+    assert "minZoom: 11, maxZoom: Infinity}" in html
+
+
+def test_preview_layer_embeds_only_coarsest_level_with_urls(tmp_path):
+    geojson_path = tmp_path / "all_lines.geojson"
+    previews = web_preview.write_previews(wiggly_lines(), geojson_path)
+    urls = [os.path.relpath(path, tmp_path) for path in web_preview.preview_paths(geojson_path)]
+    m = folium.Map(location=[-30.80, 141.264160], zoom_start=5)
+    layer = web_preview.PreviewLayer(previews, name="all-lines", style_function=lambda feature: {"color": "red"},
+                                     urls=urls).add_to(m)
+    html = m.get_root().render()
+
+    assert len(layer.layers) == 1
+    assert html.count(f".addTo({layer.get_name()})") == 1
+    assert np.allclose(layer.get_bounds(), [[-30.5, 121.0], [-30.0, 122.0]], atol=1e-4)
+    assert '"all_lines_lod1.geojson"' in html and '"all_lines_lod2.geojson"' in html
+    assert f"L.geoJson(data, {{style: {layer.layers[0].get_name()}_styler}})" in html
+    assert html.count('"LineString"') == len(previews[0])
+
+
+def test_write_flatgeobuf_next_to_geojson(tmp_path):
+    fgb_path = web_preview.write_flatgeobuf(wiggly_lines(), tmp_path / "all_lines.geojson")
+    assert fgb_path == str(tmp_path / "all_lines.fgb")
+
+    result = geopandas.read_file(fgb_path, bbox=(121.0, -30.1, 122.0, -29.9))
+    assert list(result["linenum"]) == [1]
+    assert result.crs.to_epsg() == 4326